@@ -0,0 +1,143 @@
+"""
+Compare translate-first retrieval with searching non-English questions directly
+through a multilingual embedding model.
+
+Both paths embed the same FAQ file and answer the same labelled questions:
+
+    translate-first  detect + translate the question to English, embed it with
+                     the English model, search
+    multilingual     embed the original question with the multilingual model,
+                     search
+
+Reported per path: hit@1, hit@3, mean reciprocal rank, the top-1 cosine
+similarity (useful when re-tuning rag.confidence_threshold and
+chat.extractive.max_score for a new model) and per-question latency. The
+translation latency is whatever the configured translation backend costs here.
+
+Usage:
+    python scripts/bench_multilingual_retrieval.py
+    python scripts/bench_multilingual_retrieval.py --queries my_eval.json --faqs data/faqs/my_faqs.json
+
+``--queries`` is a JSON list of {"query": ..., "language": ..., "expected_id": ...}.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+
+from services.shared.embeddings import DEFAULT_MODEL, Embedder
+from services.shared.translation_service import get_translation_service
+
+# Labelled questions for data/faqs/sample_faq.json
+DEFAULT_QUERIES = [
+    {"query": "¿Cómo restablezco mi contraseña?", "language": "es", "expected_id": "faq-001"},
+    {"query": "Olvidé mi contraseña, ¿qué hago?", "language": "es", "expected_id": "faq-001"},
+    {"query": "¿Cuánto cuesta el envío?", "language": "es", "expected_id": "faq-002"},
+    {"query": "¿Puedo devolver un artículo?", "language": "es", "expected_id": "faq-003"},
+    {"query": "¿Cómo contacto con el servicio de atención al cliente?", "language": "es", "expected_id": "faq-004"},
+    {"query": "¿Dónde está mi pedido?", "language": "es", "expected_id": "faq-005"},
+    {"query": "Wie kann ich mein Passwort zurücksetzen?", "language": "de", "expected_id": "faq-001"},
+    {"query": "Was kostet der Versand?", "language": "de", "expected_id": "faq-002"},
+    {"query": "Kann ich einen Artikel zurückschicken?", "language": "de", "expected_id": "faq-003"},
+    {"query": "Wie erreiche ich den Support?", "language": "de", "expected_id": "faq-004"},
+    {"query": "Wie kann ich meine Bestellung verfolgen?", "language": "de", "expected_id": "faq-005"},
+    {"query": "Comment réinitialiser mon mot de passe ?", "language": "fr", "expected_id": "faq-001"},
+    {"query": "Quels sont les frais de livraison ?", "language": "fr", "expected_id": "faq-002"},
+    {"query": "Puis-je retourner un article ?", "language": "fr", "expected_id": "faq-003"},
+    {"query": "Comment contacter le support ?", "language": "fr", "expected_id": "faq-004"},
+    {"query": "Comment suivre ma commande ?", "language": "fr", "expected_id": "faq-005"},
+]
+
+
+class FlatIndex:
+    """Exact cosine search over normalised vectors (what IndexFlatL2 ranks by, for unit vectors)."""
+
+    def __init__(self, embedder, faqs):
+        self.embedder = embedder
+        self.ids = [faq["id"] for faq in faqs]
+        self.vectors = embedder.encode([f"{faq['title']}\n{faq['content']}" for faq in faqs])
+
+    def search(self, query, k):
+        scores = self.vectors @ self.embedder.encode([query])[0]
+        order = np.argsort(-scores)[:k]
+        return [(self.ids[i], float(scores[i])) for i in order]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def evaluate(name, queries, answer, k):
+    hits1 = hits_k = 0
+    reciprocal_ranks, top_scores, latencies = [], [], []
+    for item in queries:
+        started = time.perf_counter()
+        results = answer(item)
+        latencies.append((time.perf_counter() - started) * 1000)
+        ranked = [doc_id for doc_id, _ in results]
+        top_scores.append(results[0][1] if results else 0.0)
+        if ranked[:1] == [item["expected_id"]]:
+            hits1 += 1
+        if item["expected_id"] in ranked[:k]:
+            hits_k += 1
+            reciprocal_ranks.append(1.0 / (ranked.index(item["expected_id"]) + 1))
+        else:
+            reciprocal_ranks.append(0.0)
+    total = len(queries)
+    print(
+        f"{name:<16} {hits1 / total:>6.2f} {hits_k / total:>6.2f} {statistics.mean(reciprocal_ranks):>6.2f} "
+        f"{statistics.mean(top_scores):>9.3f} {statistics.median(latencies):>8.1f} {percentile(latencies, 0.95):>8.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faqs", default="data/faqs/sample_faq.json")
+    parser.add_argument("--queries", help="JSON file of labelled questions (defaults to a built-in es/de/fr set)")
+    parser.add_argument("--english-model", default=DEFAULT_MODEL)
+    parser.add_argument("--multilingual-model", default="paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.faqs) as f:
+        faqs = json.load(f)
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = json.load(f)
+
+    translator = get_translation_service()
+    english_index = FlatIndex(Embedder(args.english_model), faqs)
+    multilingual_index = FlatIndex(Embedder(args.multilingual_model), faqs)
+
+    def translate_first(item):
+        language, _ = translator.detect_language(item["query"])
+        question = item["query"]
+        if language != "en":
+            question = translator.translate(text=question, target_lang="en", source_lang=language)["translated_text"]
+        return english_index.search(question, args.k)
+
+    def multilingual(item):
+        translator.detect_language(item["query"])  # still needed to translate the answer back
+        return multilingual_index.search(item["query"], args.k)
+
+    print(f"{len(queries)} questions over {len(faqs)} FAQs; translation backend: {translator.translation_method}")
+    print(f"{'path':<16} {'hit@1':>6} {'hit@' + str(args.k):>6} {'MRR':>6} {'top1 cos':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for item in queries[:2]:  # warm-up
+        translate_first(item)
+        multilingual(item)
+    evaluate("translate-first", queries, translate_first, args.k)
+    evaluate("multilingual", queries, multilingual, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark chat-orchestrator throughput as the number of worker processes grows.
+
+For each worker count the orchestrator is started under gunicorn (see
+services/chat-orchestrator/gunicorn.conf.py) and driven with concurrent /chat
+requests. The benchmark question is pre-seeded in the response cache, so the
+run measures the orchestrator's own CPU and SQLite work (language detection,
+sentiment, cache lookup, conversation memory) and not LLM latency.
+
+Usage:
+    python scripts/bench_orchestrator_workers.py --workers 1 2 4 --duration 15 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BASE_DIR)
+os.chdir(BASE_DIR)
+
+from services.shared.cache import ResponseCache
+from services.shared.init_db import init_db
+
+BENCH_QUESTION = "What are your opening hours for the benchmark store?"
+
+
+def seed_cache():
+    init_db()
+    ResponseCache(ttl_hours=24).set(
+        query=BENCH_QUESTION,
+        response_data={
+            "answer_text": "We are open 9am-5pm, Monday to Friday.",
+            "citations": [],
+            "confidence": 0.9,
+            "model_id": "benchmark",
+            "provider": "benchmark",
+        },
+    )
+
+
+def start_server(workers, port):
+    env = dict(os.environ, CHAT_WORKERS=str(workers), CHAT_BIND=f"127.0.0.1:{port}", PYTHONPATH=BASE_DIR)
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "services/chat-orchestrator/gunicorn.conf.py",
+         "services.chat-orchestrator.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_healthy(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+async def drive(url, duration, concurrency):
+    latencies = []
+    errors = 0
+    stop_at = time.time() + duration
+
+    async def user(client):
+        nonlocal errors
+        while time.time() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/chat", json={"message": BENCH_QUESTION})
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of load per worker count")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent client connections")
+    parser.add_argument("--port", type=int, default=8102)
+    args = parser.parse_args()
+
+    seed_cache()
+    url = f"http://127.0.0.1:{args.port}"
+    print(f"CPU cores: {os.cpu_count()}  concurrency: {args.concurrency}  duration: {args.duration}s")
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'speedup':>8}")
+
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        server = start_server(workers, args.port)
+        try:
+            if not wait_until_healthy(url):
+                print(f"{workers:>8} orchestrator did not become healthy")
+                continue
+            asyncio.run(drive(url, min(2.0, args.duration), args.concurrency))  # warm-up
+            latencies, errors = asyncio.run(drive(url, args.duration, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        throughput = len(latencies) / args.duration
+        baseline = baseline or throughput
+        print(
+            f"{workers:>8} {throughput:>10.1f} {statistics.median(latencies) if latencies else 0:>9.1f} "
+            f"{percentile(latencies, 0.95):>9.1f} {errors:>7} {throughput / baseline if baseline else 0:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
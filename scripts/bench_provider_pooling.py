@@ -0,0 +1,143 @@
+"""
+Measure the per-call connection overhead that pooled provider clients remove.
+
+Starts a local OpenAI-compatible stub (optionally over TLS with a throwaway
+self-signed certificate) and calls it through LocalLLMProvider two ways:
+
+    per-call client  a new httpx.AsyncClient for every request, as providers
+                     used to do (TCP connect + TLS handshake every time)
+    pooled client    one long-lived client built from llm.http settings, as
+                     LLMRouter now creates per provider
+
+Usage:
+    python scripts/bench_provider_pooling.py --requests 300 --concurrency 1 8 --tls
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'services', 'chat-orchestrator'))
+os.chdir(BASE_DIR)
+
+from llm_provider import HTTPPoolSettings, LocalLLMProvider
+from services.shared.config_utils import load_config
+
+stub = FastAPI()
+
+
+@stub.post("/v1/chat/completions")
+async def completions():
+    return {"choices": [{"message": {"role": "assistant", "content": "Stub answer."}}]}
+
+
+def self_signed_certificate(directory):
+    if not shutil.which("openssl"):
+        raise SystemExit("--tls needs the openssl command line tool")
+    key, cert = os.path.join(directory, "key.pem"), os.path.join(directory, "cert.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost"],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return key, cert
+
+
+def start_stub(port, key=None, cert=None):
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="error",
+                                           ssl_keyfile=key, ssl_certfile=cert))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+class PerCallProvider(LocalLLMProvider):
+    """The old behaviour: open (and tear down) a client for every request."""
+
+    def __init__(self, base_url, model, verify):
+        super().__init__(base_url, model)
+        self.verify = verify
+
+    async def generate_response(self, prompt, system_instruction):
+        async with httpx.AsyncClient(verify=self.verify) as client:
+            self.client = client
+            return await super().generate_response(prompt, system_instruction)
+
+
+async def drive(provider, requests, concurrency):
+    latencies = []
+    queue = iter(range(requests))
+
+    async def worker():
+        for _ in queue:
+            started = time.perf_counter()
+            await provider.generate_response("How do I reset my password?", "Be brief.")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args, base_url, verify):
+    pool = HTTPPoolSettings.from_config(load_config()['llm'], 'local')
+    pooled_client = pool.build_client(verify=verify)
+    providers = {
+        "per-call client": PerCallProvider(base_url, "stub", verify),
+        "pooled client": LocalLLMProvider(base_url, "stub", client=pooled_client),
+    }
+    print(f"{'client':<16} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    try:
+        for concurrency in args.concurrency:
+            for name, provider in providers.items():
+                await drive(provider, min(20, args.requests), concurrency)  # warm-up
+                latencies, elapsed = await drive(provider, args.requests, concurrency)
+                print(f"{name:<16} {concurrency:>5} {len(latencies) / elapsed:>9.1f} "
+                      f"{statistics.median(latencies):>8.2f} {percentile(latencies, 0.95):>8.2f}")
+    finally:
+        await pooled_client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--tls", action="store_true", help="serve the stub over HTTPS to include the TLS handshake")
+    parser.add_argument("--port", type=int, default=8190)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        key = cert = None
+        if args.tls:
+            key, cert = self_signed_certificate(directory)
+        server, thread = start_stub(args.port, key, cert)
+        scheme = "https" if args.tls else "http"
+        print(f"stub: {scheme}://127.0.0.1:{args.port}  requests per run: {args.requests}")
+        try:
+            asyncio.run(run(args, f"{scheme}://127.0.0.1:{args.port}/v1", verify=not args.tls))
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Load-test LLMRouter against the simulated provider farm (services/llm-simulator).
+
+Each variant builds a router from config.yaml plus its overrides, with every
+provider pointed at the simulator. The variant then runs the same scripted
+scenario, from a fresh scenario clock, at a fixed concurrency (closed loop) or
+a fixed arrival rate (open loop, --rps). Every request runs under the chat
+request deadline. The script prints throughput, success rate, tail latency,
+which providers served the answers, hedges, breaker transitions and limiter
+overflows for each variant.
+
+Usage:
+    python scripts/load_test_router.py --duration 120 --concurrency 16 \\
+        --variant baseline \\
+        --variant no-hedging:llm.hedging.enabled=false \\
+        --variant strict-breaker:llm.circuit_breaker.failure_threshold=2,llm.circuit_breaker.window_s=20
+
+By default the simulator is started in-process with
+services/llm-simulator/scenarios/primary_outage.yaml; pass --url to use one
+that is already running. Provider events go to a throwaway database.
+"""
+import argparse
+import asyncio
+import copy
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import httpx
+import uvicorn
+import yaml
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, 'services', 'chat-orchestrator'))
+os.chdir(BASE_DIR)
+
+import llm_provider
+from llm_provider import LLMRouter
+from services.shared.config_utils import load_config
+from services.shared.deadline import deadline_scope
+from services.shared.provider_metrics import ProviderMetrics
+from services.shared.stage_timing import LatencyHistograms
+
+DEFAULT_SCENARIO = os.path.join(BASE_DIR, 'services', 'llm-simulator', 'scenarios', 'primary_outage.yaml')
+PROMPT = "Context:\nOrders can be changed until they ship.\n\nQuestion: Can I change my delivery address?"
+SYSTEM_INSTRUCTION = "You are a helpful customer support assistant. Answer from the context."
+
+
+def parse_variant(text):
+    """``name[:key=value,key=value]`` with dotted config keys and YAML values."""
+    name, _, assignments = text.partition(":")
+    overrides = {}
+    for assignment in filter(None, assignments.split(",")):
+        key, _, value = assignment.partition("=")
+        overrides[key.strip()] = yaml.safe_load(value)
+    return name, overrides
+
+
+def apply_override(config, dotted_key, value):
+    node = config
+    *parents, leaf = dotted_key.split(".")
+    for key in parents:
+        node = node.setdefault(key, {})
+    node[leaf] = value
+
+
+def start_simulator(port, scenario_path):
+    os.environ["SIM_SCENARIO"] = scenario_path
+    # Loaded by path: the orchestrator's own main.py is also importable as "main"
+    spec = importlib.util.spec_from_file_location("llm_simulator_main", os.path.join(BASE_DIR, 'services', 'llm-simulator', 'main.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    simulator_app = module.app
+    server = uvicorn.Server(uvicorn.Config(simulator_app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def run_variant(args, base_url, scenario_spec, overrides, metrics_db):
+    config = copy.deepcopy(load_config())
+    config['llm']['simulator'] = {"enabled": True, "base_url": base_url}
+    # Keep breaker state in this process so runs do not leak into each other or into data/copilot.db
+    apply_override(config, "llm.circuit_breaker.shared_state", False)
+    for key, value in overrides.items():
+        apply_override(config, key, value)
+    request_timeout_s = float(((config.get('chat', {}) or {}).get('admission', {}) or {}).get('request_timeout_ms', 20000)) / 1000
+
+    # Fresh telemetry per variant: hedge delays and adaptive scores start from nothing each time
+    llm_provider.provider_metrics = ProviderMetrics(db_path=metrics_db)
+    llm_provider.latency_histograms = LatencyHistograms()
+    router = LLMRouter(config)
+    async with httpx.AsyncClient() as control:
+        (await control.post(f"{base_url}/scenario", json=scenario_spec)).raise_for_status()
+
+    results = []
+
+    async def one_request():
+        started = time.time()
+        with deadline_scope(started + request_timeout_s):
+            try:
+                result = await router.generate_answer(PROMPT, SYSTEM_INSTRUCTION)
+            except Exception as exc:  # the router should never raise; count it if it does
+                result = {"provider": f"error:{type(exc).__name__}", "success": False}
+        results.append(((time.time() - started) * 1000, result))
+
+    run_start = time.time()
+    try:
+        if args.rps:
+            # Open loop: arrivals do not wait for earlier requests, so queueing shows up in the tail
+            tasks = []
+            interval = 1 / args.rps
+            while time.time() - run_start < args.duration:
+                tasks.append(asyncio.ensure_future(one_request()))
+                await asyncio.sleep(interval)
+            await asyncio.gather(*tasks)
+        else:
+            async def worker():
+                while time.time() - run_start < args.duration:
+                    await one_request()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.time() - run_start
+        return summarize(router, results, elapsed)
+    finally:
+        await router.aclose()
+
+
+def summarize(router, results, elapsed):
+    latencies = [latency for latency, _ in results]
+    answered = [latency for latency, result in results if result.get("success")]
+    served = Counter(result.get("provider") for _, result in results)
+    return {
+        "requests": len(results),
+        "throughput": len(answered) / elapsed if elapsed else 0.0,
+        "success": len(answered) / len(results) if results else 0.0,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies, default=0.0),
+        "served": dict(served.most_common()),
+        "hedging": router.hedging_snapshot(),
+        "breakers": {name: snapshot["transitions"] for name, snapshot in router.breakers_snapshot().items()
+                     if any(snapshot["transitions"].values())},
+        "saturated": {name: snapshot["saturated"] for name, snapshot in router.limits_snapshot().items()
+                      if any(snapshot["saturated"].values())},
+    }
+
+
+def print_report(reports):
+    print(f"\n{'variant':<18} {'req':>6} {'ans/s':>7} {'ok%':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, report in reports:
+        print(f"{name:<18} {report['requests']:>6} {report['throughput']:>7.1f} {report['success'] * 100:>6.1f} "
+              f"{report['p50']:>8.0f} {report['p95']:>8.0f} {report['p99']:>8.0f} {report['max']:>8.0f}")
+    for name, report in reports:
+        hedging = report["hedging"]
+        print(f"\n[{name}]")
+        print(f"  served by: {report['served']}")
+        print(f"  hedges: fired={hedging['fired']} won={hedging['won']} lost={hedging['lost']} "
+              f"both_failed={hedging['both_failed']} over_budget={hedging['over_budget']}")
+        print(f"  breaker transitions: {report['breakers'] or 'none'}")
+        print(f"  limiter overflows: {report['saturated'] or 'none'}")
+
+
+async def main_async(args, base_url, scenario_spec):
+    reports = []
+    with tempfile.TemporaryDirectory() as directory:
+        for index, (name, overrides) in enumerate(args.variant or [("config", {})]):
+            print(f"running {name} for {args.duration:.0f}s {overrides or ''}", flush=True)
+            report = await run_variant(args, base_url, scenario_spec, overrides, os.path.join(directory, f"metrics-{index}.db"))
+            reports.append((name, report))
+    print_report(reports)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds per variant")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed-loop clients (ignored with --rps)")
+    parser.add_argument("--rps", type=float, help="open-loop arrival rate instead of closed-loop clients")
+    parser.add_argument("--variant", type=parse_variant, action="append",
+                        help="name[:dotted.key=value,...] applied on top of config.yaml; repeat to compare")
+    parser.add_argument("--url", help="use a running simulator instead of starting one")
+    parser.add_argument("--port", type=int, default=8095)
+    args = parser.parse_args()
+
+    with open(args.scenario, "r", encoding="utf-8") as f:
+        scenario_spec = yaml.safe_load(f) or {}
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server, thread = start_simulator(args.port, args.scenario)
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(main_async(args, base_url, scenario_spec))
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
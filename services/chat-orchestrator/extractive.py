@@ -0,0 +1,132 @@
+"""Extractive fast path: answer with a retrieved FAQ chunk verbatim instead of calling the LLM.
+
+Only used when retrieval is unambiguous. The top chunk must clear a strict
+distance threshold and beat the runner-up by a clear margin, and it must be a
+self-contained FAQ entry (a question-style title with a complete answer), not
+an excerpt from a longer document.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+# Document excerpts (PDF/DOCX paragraphs) rarely stand on their own
+NON_FAQ_SECTIONS = {"document"}
+QUESTION_WORDS = ("how", "what", "when", "where", "which", "who", "why", "can", "do", "does", "is", "are", "will", "should")
+# Openers that lean on surrounding text the user will not see
+DANGLING_OPENERS = re.compile(r"^(this|that|these|those|it|they|also|as mentioned|as above|see above|however|and|but)\b", re.IGNORECASE)
+
+
+@dataclass
+class ExtractiveSettings:
+    enabled: bool = False
+    max_score: float = 0.2
+    min_margin: float = 0.1
+    min_chars: int = 40
+    max_chars: int = 1200
+    first_turn_only: bool = True
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]]) -> "ExtractiveSettings":
+        section = section or {}
+        defaults = cls()
+        return cls(
+            enabled=bool(section.get("enabled", defaults.enabled)),
+            max_score=float(section.get("max_score", defaults.max_score)),
+            min_margin=float(section.get("min_margin", defaults.min_margin)),
+            min_chars=int(section.get("min_chars", defaults.min_chars)),
+            max_chars=int(section.get("max_chars", defaults.max_chars)),
+            first_turn_only=bool(section.get("first_turn_only", defaults.first_turn_only)),
+        )
+
+
+@dataclass
+class ExtractiveDecision:
+    accepted: bool
+    reason: str
+    result: Optional[Dict[str, Any]] = None
+    answer_text: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def report(self) -> Dict[str, Any]:
+        return {"accepted": self.accepted, "reason": self.reason, **self.details}
+
+
+class ExtractiveAnswerer:
+    """Decides whether the best retrieved chunk can be returned as the answer."""
+
+    def __init__(self, settings: ExtractiveSettings):
+        self.settings = settings
+        self._stats_lock = Lock()
+        self.decisions: Dict[str, int] = {}
+
+    def evaluate(self, rag_results: List[Dict[str, Any]], has_history: bool = False, allowed: bool = True) -> ExtractiveDecision:
+        decision = self._evaluate(rag_results, has_history, allowed)
+        with self._stats_lock:
+            self.decisions[decision.reason] = self.decisions.get(decision.reason, 0) + 1
+        return decision
+
+    def _evaluate(self, rag_results: List[Dict[str, Any]], has_history: bool, allowed: bool) -> ExtractiveDecision:
+        settings = self.settings
+        if not settings.enabled:
+            return ExtractiveDecision(False, "disabled")
+        if not allowed:
+            return ExtractiveDecision(False, "needs_escalation")
+        if settings.first_turn_only and has_history:
+            return ExtractiveDecision(False, "follow_up")
+
+        scored = sorted(
+            (res for res in rag_results if res.get("score") is not None),
+            key=lambda res: res["score"],
+        )
+        if not scored:
+            return ExtractiveDecision(False, "no_results")
+
+        top = scored[0]
+        details: Dict[str, Any] = {"score": round(top["score"], 4), "doc_id": top["chunk"]["metadata"].get("id")}
+        if top["score"] > settings.max_score:
+            return ExtractiveDecision(False, "score_above_threshold", details=details)
+        if len(scored) > 1:
+            margin = scored[1]["score"] - top["score"]
+            details["margin"] = round(margin, 4)
+            if margin < settings.min_margin:
+                return ExtractiveDecision(False, "ambiguous", details=details)
+
+        answer_text = self.self_contained_answer(top["chunk"])
+        if answer_text is None:
+            return ExtractiveDecision(False, "not_self_contained", details=details)
+        return ExtractiveDecision(True, "accepted", result=top, answer_text=answer_text, details=details)
+
+    def self_contained_answer(self, chunk: Dict[str, Any]) -> Optional[str]:
+        """The chunk's answer text when it is a standalone FAQ entry, else None."""
+        metadata = chunk.get("metadata") or {}
+        content = (metadata.get("content") or "").strip()
+        title = (metadata.get("title") or "").strip()
+        if not content or not title:
+            return None
+        if (metadata.get("section") or "").strip().lower() in NON_FAQ_SECTIONS:
+            return None
+        if not (title.endswith("?") or title.lower().startswith(QUESTION_WORDS)):
+            return None
+        if not self.settings.min_chars <= len(content) <= self.settings.max_chars:
+            return None
+        if DANGLING_OPENERS.match(content) or not content[0].isupper():
+            return None
+        if content[-1] not in ".!)\"'":
+            return None
+        return content
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            total = sum(self.decisions.values())
+            accepted = self.decisions.get("accepted", 0)
+            return {
+                "enabled": self.settings.enabled,
+                "evaluated": total,
+                "accepted": accepted,
+                "accept_rate": round(accepted / total, 3) if total else 0.0,
+                "decisions": dict(self.decisions),
+            }
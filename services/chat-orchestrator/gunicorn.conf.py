@@ -0,0 +1,47 @@
+"""Gunicorn settings for running the chat orchestrator with several worker processes.
+
+Run from the repository root:
+
+    gunicorn -c services/chat-orchestrator/gunicorn.conf.py "services.chat-orchestrator.main:app"
+
+The app is imported once in the master (``preload_app``), so tokenizers, the
+sentiment model and provider clients are loaded before forking and shared
+copy-on-write by the workers. Breaker state, the response cache and
+conversation memory live in SQLite (WAL mode), so all workers see the same
+state. Admission limits, single-flight coalescing and the /metrics/* counters
+are per worker. The worker count is exported as ``CHAT_WORKERS`` so that each
+worker paces LLM providers with its share of ``llm.limits``, and so that
+breaker state is shared once there is more than one worker
+(``llm.circuit_breaker.shared_state: auto``).
+"""
+
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from services.shared.config_utils import load_config
+
+
+def _configured_workers() -> int:
+    env_value = os.getenv("CHAT_WORKERS")
+    if env_value:
+        return max(1, int(env_value))
+    configured = int((load_config().get("chat", {}) or {}).get("workers", 0) or 0)
+    return configured if configured > 0 else multiprocessing.cpu_count()
+
+
+bind = os.getenv("CHAT_BIND", "0.0.0.0:8002")
+workers = _configured_workers()
+os.environ["CHAT_WORKERS"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_fork(server, worker):
+    # Threads do not survive fork: restart the log listener in each worker.
+    from services.shared.structured_logging import configure_logging
+    configure_logging()
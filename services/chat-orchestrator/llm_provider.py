@@ -2,40 +2,167 @@ import abc
 import os
 import sys
 import asyncio
+import json
 import time
-from typing import List, Dict, Optional, Any
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from typing import List, Dict, Optional, Any, AsyncIterator, Iterator, Tuple
 import httpx
 
 # Add parent directory to path to import shared modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from services.shared.config_utils import load_config
-from services.shared.circuit_breaker import CircuitBreaker
+from services.shared.circuit_breaker import CircuitBreaker, State
+from services.shared.breaker_store import get_breaker_store
 from services.shared.settings_service import get_settings_service
 from services.shared.provider_metrics import get_provider_metrics
+from services.shared.provider_health import AdaptiveRoutingSettings, ProviderHealth
+from services.shared.provider_limits import ProviderLimiter, ProviderLimitSettings, ProviderSaturated, serving_workers
+from services.shared.micro_batcher import MicroBatcher
+from services.shared.token_usage import (
+    PriceTable, TokenUsage, UsageCapture, capture_usage, estimate_tokens, gemini_usage, openai_usage, report_usage,
+)
+from services.shared.stage_timing import RecentLatencies, get_latency_histograms
+from services.shared.deadline import has_budget, timeout_for
+from services.shared.structured_logging import get_logger
 
 settings_service = get_settings_service()
 provider_metrics = get_provider_metrics()
+latency_histograms = get_latency_histograms()
+log = get_logger("llm_router")
+
+_batch_generation: ContextVar[bool] = ContextVar("batch_generation", default=False)
+
+
+@contextmanager
+def batch_generation() -> Iterator[None]:
+    """Mark LLM calls made in this block as offline work that may wait briefly to be batched.
+
+    Interactive requests never enter it, so they are never held back for a batch.
+    """
+    token = _batch_generation.set(True)
+    try:
+        yield
+    finally:
+        _batch_generation.reset(token)
+
+
+def in_batch_generation() -> bool:
+    return _batch_generation.get()
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+@dataclass
+class HTTPPoolSettings:
+    """Connection pool for one provider: ``llm.http`` overridden by ``llm.providers.<name>.http``."""
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry_s: float = 30.0
+    http2: bool = True
+
+    @classmethod
+    def from_config(cls, llm_config: Dict[str, Any], provider_name: str) -> "HTTPPoolSettings":
+        section = dict(llm_config.get('http', {}) or {})
+        section.update((llm_config.get('providers', {}).get(provider_name, {}) or {}).get('http', {}) or {})
+        defaults = cls()
+        return cls(
+            max_connections=int(section.get('max_connections', defaults.max_connections)),
+            max_keepalive_connections=int(section.get('max_keepalive_connections', defaults.max_keepalive_connections)),
+            keepalive_expiry_s=float(section.get('keepalive_expiry_s', defaults.keepalive_expiry_s)),
+            http2=bool(section.get('http2', defaults.http2)),
+        )
+
+    def build_client(self, verify: bool = True) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry_s,
+            ),
+            # HTTP/2 needs the optional h2 package; HTTP/1.1 keep-alive otherwise
+            http2=self.http2 and _http2_available(),
+            verify=verify,
+        )
+
+
+async def _sse_events(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """JSON payloads of a server-sent event stream, up to ``[DONE]``."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        if data:
+            yield json.loads(data)
+
+
+async def _stream_chat_completions(
+    client: httpx.AsyncClient,
+    url: str,
+    payload: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 20.0,
+    include_usage: bool = False,
+) -> AsyncIterator[str]:
+    """Content deltas from an OpenAI-compatible ``/chat/completions`` stream; its usage goes to ``report_usage``."""
+    body = {**payload, "stream": True}
+    if include_usage:
+        body["stream_options"] = {"include_usage": True}
+    async with client.stream("POST", url, json=body, headers=headers, timeout=timeout) as response:
+        response.raise_for_status()
+        async for chunk in _sse_events(response):
+            # Usage arrives on the final chunk when asked for (OpenAI, vLLM), and from Groq unasked
+            report_usage(openai_usage(chunk))
+            choices = chunk.get('choices') or []
+            delta = (choices[0].get('delta') or {}).get('content') if choices else None
+            if delta:
+                yield delta
+
+
+def _sdk_usage(response: Any) -> Optional[TokenUsage]:
+    """Usage of an ``openai`` SDK response or chunk, when it carries one."""
+    usage = getattr(response, 'usage', None)
+    return openai_usage({"usage": usage.model_dump()}) if usage is not None else None
+
 
 class LLMProvider(abc.ABC):
+    """A model API. Implementations pass the token usage their API reports to ``report_usage``."""
+
     @abc.abstractmethod
     async def generate_response(self, prompt: str, system_instruction: str) -> str:
         pass
 
+    async def generate_stream(self, prompt: str, system_instruction: str) -> AsyncIterator[str]:
+        """Text deltas as they are generated; without a streaming API, the whole answer at once."""
+        yield await self.generate_response(prompt, system_instruction)
+
 class GrokProvider(LLMProvider):
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
         self.model = model
+        self.http_client = client or httpx.AsyncClient()
         # Grok is often compatible with OpenAI client
         # We use the openai library if available, else fallback to httpx
         try:
             from openai import AsyncOpenAI
             self.client = AsyncOpenAI(
                 api_key=api_key,
-                base_url="https://api.grok.x.ai/v1" 
+                base_url="https://api.grok.x.ai/v1",
+                http_client=self.http_client
             )
             self.use_sdk = True
         except ImportError:
-            self.client = httpx.AsyncClient(headers={"Authorization": f"Bearer {api_key}"})
+            self.client = self.http_client
             self.use_sdk = False
 
     async def generate_response(self, prompt: str, system_instruction: str) -> str:
@@ -49,9 +176,10 @@ class GrokProvider(LLMProvider):
                     ],
                     timeout=10.0
                 )
+                report_usage(_sdk_usage(response))
                 return response.choices[0].message.content
             except Exception as e:
-                print(f"Grok SDK Error: {e}")
+                log.warning("provider_sdk_error", provider="grok", error=str(e))
                 raise e
         else:
             # Fallback HTTP
@@ -63,44 +191,87 @@ class GrokProvider(LLMProvider):
                     {"role": "user", "content": prompt}
                 ]
             }
-            response = await self.client.post(url, json=payload, timeout=10.0)
+            response = await self.client.post(url, json=payload, headers={"Authorization": f"Bearer {self.api_key}"}, timeout=10.0)
             response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+            data = response.json()
+            report_usage(openai_usage(data))
+            return data['choices'][0]['message']['content']
+
+    async def generate_stream(self, prompt: str, system_instruction: str) -> AsyncIterator[str]:
+        messages = [
+            {"role": "system", "content": system_instruction},
+            {"role": "user", "content": prompt}
+        ]
+        if not self.use_sdk:
+            async for delta in _stream_chat_completions(
+                self.client, "https://api.grok.x.ai/v1/chat/completions", {"model": self.model, "messages": messages},
+                headers={"Authorization": f"Bearer {self.api_key}"}, timeout=10.0,
+            ):
+                yield delta
+            return
+        stream = await self.client.chat.completions.create(model=self.model, messages=messages, stream=True, timeout=10.0)
+        async for chunk in stream:
+            report_usage(_sdk_usage(chunk))
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
 
 class GeminiProvider(LLMProvider):
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
         self.model = model
+        self.client = client or httpx.AsyncClient(verify=False)
         # Use v1 endpoint instead of v1beta
         self.url = f"https://generativelanguage.googleapis.com/v1/models/{model}:generateContent?key={api_key}"
-        print(f"[GeminiProvider] Initialized with api_key={api_key[:10] if api_key and api_key != 'dummy' else api_key}...")
+        self.stream_url = f"https://generativelanguage.googleapis.com/v1/models/{model}:streamGenerateContent?alt=sse&key={api_key}"
+        log.debug("provider_initialized", provider="gemini", model=model, has_api_key=bool(api_key and api_key != 'dummy'))
+
+    def _payload(self, prompt: str, system_instruction: str) -> Dict[str, Any]:
+        return {
+            "contents": [{
+                "parts": [{"text": f"{system_instruction}\n\nUser Query: {prompt}"}]
+            }]
+        }
 
     async def generate_response(self, prompt: str, system_instruction: str) -> str:
         # Google Gemini REST API
-        async with httpx.AsyncClient(verify=False) as client:
-            payload = {
-                "contents": [{
-                    "parts": [{"text": f"{system_instruction}\n\nUser Query: {prompt}"}]
-                }]
-            }
-            response = await client.post(self.url, json=payload, timeout=10.0)
+        payload = self._payload(prompt, system_instruction)
+        response = await self.client.post(self.url, json=payload, timeout=10.0)
+        response.raise_for_status()
+        data = response.json()
+        report_usage(gemini_usage(data))
+        # Handle safety ratings or empty content
+        if 'candidates' in data and data['candidates']:
+            content = data['candidates'][0].get('content')
+            if content and 'parts' in content:
+                return content['parts'][0]['text']
+        raise Exception("No content returned from Gemini (possibly blocked by safety filters)")
+
+    async def generate_stream(self, prompt: str, system_instruction: str) -> AsyncIterator[str]:
+        produced = False
+        payload = self._payload(prompt, system_instruction)
+        async with self.client.stream("POST", self.stream_url, json=payload, timeout=10.0) as response:
             response.raise_for_status()
-            data = response.json()
-            # Handle safety ratings or empty content
-            if 'candidates' in data and data['candidates']:
-                content = data['candidates'][0].get('content')
-                if content and 'parts' in content:
-                    return content['parts'][0]['text']
+            async for chunk in _sse_events(response):
+                # Every chunk carries the running totals, so the last one wins
+                report_usage(gemini_usage(chunk))
+                for candidate in (chunk.get('candidates') or [])[:1]:
+                    for part in (candidate.get('content') or {}).get('parts') or []:
+                        if part.get('text'):
+                            produced = True
+                            yield part['text']
+        if not produced:
             raise Exception("No content returned from Gemini (possibly blocked by safety filters)")
 
 
 class OpenAIProvider(LLMProvider):
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
         self.model = model
         self.endpoint = "https://api.openai.com/v1/chat/completions"
+        self.client = client or httpx.AsyncClient(verify=False)
 
-    async def generate_response(self, prompt: str, system_instruction: str) -> str:
+    def _request(self, prompt: str, system_instruction: str):
         if not self.api_key or self.api_key in ("", "dummy"):
             raise ValueError(f"Missing OPENAI_API_KEY (got: {self.api_key})")
 
@@ -116,42 +287,209 @@ class OpenAIProvider(LLMProvider):
             ],
             "temperature": 0.3
         }
+        return headers, payload
+
+    async def generate_response(self, prompt: str, system_instruction: str) -> str:
+        headers, payload = self._request(prompt, system_instruction)
+        response = await self.client.post(self.endpoint, headers=headers, json=payload, timeout=20.0)
+        response.raise_for_status()
+        data = response.json()
+        choices = data.get('choices')
+        if not choices:
+            raise Exception("OpenAI response missing choices")
+        report_usage(openai_usage(data))
+        return choices[0]['message']['content']
+
+    async def generate_stream(self, prompt: str, system_instruction: str) -> AsyncIterator[str]:
+        headers, payload = self._request(prompt, system_instruction)
+        async for delta in _stream_chat_completions(
+            self.client, self.endpoint, payload, headers=headers, timeout=20.0, include_usage=True,
+        ):
+            yield delta
+
+def _split_usage(total: Optional[TokenUsage], prompt_weights: List[float], completion_weights: List[float]) -> List[Optional[TokenUsage]]:
+    """Share one batch's usage among its prompts in proportion to their estimated tokens."""
+    if total is None:
+        return [None] * len(prompt_weights)
+
+    def share(amount: int, weight: float, weights: List[float]) -> int:
+        return round(amount * weight / sum(weights)) if sum(weights) else 0
+
+    return [
+        TokenUsage(
+            prompt_tokens=share(total.prompt_tokens, prompt_weight, prompt_weights),
+            completion_tokens=share(total.completion_tokens, completion_weight, completion_weights),
+            cached_tokens=share(total.cached_tokens, prompt_weight, prompt_weights),
+            estimated=True,
+        )
+        for prompt_weight, completion_weight in zip(prompt_weights, completion_weights)
+    ]
+
+
+@dataclass
+class LocalBatchSettings:
+    """Batching of offline calls to the local server (``llm.providers.local.batching``)."""
+    enabled: bool = False
+    mode: str = "concurrent"  # or "completions": one /completions call per batch with a list of prompts
+    max_batch_size: int = 16
+    max_wait_ms: float = 20.0
+    max_in_flight: int = 32  # open requests (concurrent) or batch calls (completions) to the server
+    max_tokens: int = 512  # completions mode; the endpoint's own default is tiny
+    prompt_template: str = "{system_instruction}\n\nUser: {prompt}\nAssistant:"  # completions mode
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]]) -> "LocalBatchSettings":
+        section = section or {}
+        defaults = cls()
+        mode = str(section.get('mode', defaults.mode))
+        if mode not in ("concurrent", "completions"):
+            log.warning("local_batching_mode_unknown", mode=mode, fallback=defaults.mode)
+            mode = defaults.mode
+        return cls(
+            enabled=bool(section.get('enabled', defaults.enabled)),
+            mode=mode,
+            max_batch_size=max(1, int(section.get('max_batch_size', defaults.max_batch_size))),
+            max_wait_ms=float(section.get('max_wait_ms', defaults.max_wait_ms)),
+            max_in_flight=max(1, int(section.get('max_in_flight', defaults.max_in_flight))),
+            max_tokens=int(section.get('max_tokens', defaults.max_tokens)),
+            prompt_template=str(section.get('prompt_template', defaults.prompt_template)),
+        )
 
-        async with httpx.AsyncClient(timeout=20.0, verify=False) as client:
-            response = await client.post(self.endpoint, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            choices = data.get('choices')
-            if not choices:
-                raise Exception("OpenAI response missing choices")
-            return choices[0]['message']['content']
 
 class LocalLLMProvider(LLMProvider):
-    def __init__(self, base_url: str, model: str):
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        client: Optional[httpx.AsyncClient] = None,
+        batching: Optional[LocalBatchSettings] = None,
+    ):
         self.base_url = base_url
         self.model = model
+        self.client = client or httpx.AsyncClient()
+        # Self-hosted servers (vLLM, TGI, Ollama) get far more tokens/s out of the GPU
+        # when kept busy with many sequences, so offline calls are grouped here.
+        self.batching = batching or LocalBatchSettings()
+        self.batcher = (
+            MicroBatcher(self._batch, self.batching.max_batch_size, self.batching.max_wait_ms)
+            if self.batching.enabled else None
+        )
+        self._in_flight: Optional[asyncio.Semaphore] = None
+
+    def _payload(self, prompt: str, system_instruction: str) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_instruction},
+                {"role": "user", "content": prompt}
+            ]
+        }
 
     async def generate_response(self, prompt: str, system_instruction: str) -> str:
-        async with httpx.AsyncClient() as client:
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": system_instruction},
-                    {"role": "user", "content": prompt}
-                ]
-            }
-            # Assuming OpenAI compatible local server (like vLLM or Ollama)
-            response = await client.post(f"{self.base_url}/chat/completions", json=payload, timeout=30.0)
-            response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+        if self.batcher is not None and in_batch_generation():
+            text, usage = await self.batcher.submit((prompt, system_instruction))
+        else:
+            text, usage = await self._chat_completion(prompt, system_instruction)
+        report_usage(usage)
+        return text
+
+    async def _chat_completion(self, prompt: str, system_instruction: str) -> Tuple[str, Optional[TokenUsage]]:
+        payload = self._payload(prompt, system_instruction)
+        # Assuming OpenAI compatible local server (like vLLM or Ollama)
+        response = await self.client.post(f"{self.base_url}/chat/completions", json=payload, timeout=30.0)
+        response.raise_for_status()
+        data = response.json()
+        return data['choices'][0]['message']['content'], openai_usage(data)
+
+    def _get_in_flight(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the serving event loop.
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.batching.max_in_flight)
+        return self._in_flight
+
+    async def generate_batch(self, requests: List[Tuple[str, str]]) -> List[Any]:
+        """Answers for ``(prompt, system_instruction)`` pairs, in order; a failed item's entry is its exception.
+
+        In ``completions`` mode the whole list goes to the server as one
+        ``/completions`` call with a list of prompts (vLLM and other servers that
+        accept one). Otherwise each pair becomes its own chat completion, with at
+        most ``max_in_flight`` open at a time.
+        """
+        return [
+            result if isinstance(result, BaseException) else result[0]
+            for result in await self._batch(requests)
+        ]
+
+    async def _batch(self, requests: List[Tuple[str, str]]) -> List[Any]:
+        """``generate_batch`` with each answer paired with its token usage."""
+        semaphore = self._get_in_flight()
+        if self.batching.mode == "completions":
+            async with semaphore:
+                return await self._completions_batch(requests)
+
+        async def one(prompt: str, system_instruction: str) -> Tuple[str, Optional[TokenUsage]]:
+            async with semaphore:
+                return await self._chat_completion(prompt, system_instruction)
+
+        return await asyncio.gather(*(one(prompt, system) for prompt, system in requests), return_exceptions=True)
+
+    async def _completions_batch(self, requests: List[Tuple[str, str]]) -> List[Any]:
+        payload = {
+            "model": self.model,
+            # /completions applies no chat template, so the conversation is rendered here
+            "prompt": [
+                self.batching.prompt_template.format(system_instruction=system, prompt=prompt)
+                for prompt, system in requests
+            ],
+            "max_tokens": self.batching.max_tokens,
+        }
+        response = await self.client.post(f"{self.base_url}/completions", json=payload, timeout=30.0)
+        response.raise_for_status()
+        data = response.json()
+        # Choices may come back in any order; ``index`` ties each one to its prompt
+        texts = {
+            choice.get('index', position): choice.get('text')
+            for position, choice in enumerate(data.get('choices') or [])
+        }
+        results: List[Any] = [
+            texts[index].strip() if texts.get(index) is not None else ValueError(f"No completion returned for prompt {index}")
+            for index in range(len(requests))
+        ]
+        usages = _split_usage(
+            openai_usage(data),
+            [estimate_tokens(prompt) for prompt in payload["prompt"]],
+            [0.0 if isinstance(result, Exception) else estimate_tokens(result) for result in results],
+        )
+        return [result if isinstance(result, Exception) else (result, usage) for result, usage in zip(results, usages)]
+
+    def batching_snapshot(self) -> Dict[str, Any]:
+        return {
+            "mode": self.batching.mode,
+            "max_in_flight": self.batching.max_in_flight,
+            **self.batcher.snapshot(),
+        }
+
+    async def generate_stream(self, prompt: str, system_instruction: str) -> AsyncIterator[str]:
+        payload = self._payload(prompt, system_instruction)
+        async for delta in _stream_chat_completions(
+            self.client, f"{self.base_url}/chat/completions", payload, timeout=30.0, include_usage=True,
+        ):
+            yield delta
+
+class SimulatedProvider(LocalLLMProvider):
+    """One provider of the LLM simulator farm (services/llm-simulator), used for load and failover tests."""
+
+    def __init__(self, base_url: str, name: str, model: Optional[str], client: Optional[httpx.AsyncClient] = None):
+        super().__init__(f"{base_url.rstrip('/')}/{name}/v1", model or name, client=client)
 
 class GroqProvider(LLMProvider):
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
         self.model = model
         self.endpoint = "https://api.groq.com/openai/v1/chat/completions"
+        self.client = client or httpx.AsyncClient(verify=False)
 
-    async def generate_response(self, prompt: str, system_instruction: str) -> str:
+    def _request(self, prompt: str, system_instruction: str):
         if not self.api_key or self.api_key in ("", "dummy"):
             raise ValueError(f"Missing GROQ_API_KEY (got: {self.api_key})")
 
@@ -167,21 +505,31 @@ class GroqProvider(LLMProvider):
             ],
             "temperature": 0.3
         }
+        return headers, payload
 
-        # Disable SSL verification for Groq (same as other services in this project)
-        async with httpx.AsyncClient(timeout=20.0, verify=False) as client:
-            response = await client.post(self.endpoint, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            choices = data.get('choices')
-            if not choices:
-                raise Exception("Groq response missing choices")
-            return choices[0]['message']['content']
+    async def generate_response(self, prompt: str, system_instruction: str) -> str:
+        headers, payload = self._request(prompt, system_instruction)
+        response = await self.client.post(self.endpoint, headers=headers, json=payload, timeout=20.0)
+        response.raise_for_status()
+        data = response.json()
+        choices = data.get('choices')
+        if not choices:
+            raise Exception("Groq response missing choices")
+        report_usage(openai_usage(data))
+        return choices[0]['message']['content']
+
+    async def generate_stream(self, prompt: str, system_instruction: str) -> AsyncIterator[str]:
+        headers, payload = self._request(prompt, system_instruction)
+        async for delta in _stream_chat_completions(self.client, self.endpoint, payload, headers=headers, timeout=20.0):
+            yield delta
 
 class HuggingFaceProvider(LLMProvider):
-    def __init__(self, api_token: str, endpoint: str):
+    # The Inference API answers in one piece: generate_stream uses the buffered default
+
+    def __init__(self, api_token: str, endpoint: str, client: Optional[httpx.AsyncClient] = None):
         self.api_token = api_token
         self.endpoint = endpoint
+        self.client = client or httpx.AsyncClient(verify=False)
 
     async def generate_response(self, prompt: str, system_instruction: str) -> str:
         if not self.api_token or self.api_token in ("", "dummy"):
@@ -194,69 +542,341 @@ class HuggingFaceProvider(LLMProvider):
             "parameters": {"max_new_tokens": 512, "return_full_text": False}
         }
         
-        async with httpx.AsyncClient(verify=False) as client:
-            response = await client.post(self.endpoint, headers=headers, json=payload, timeout=30.0)
-            response.raise_for_status()
-            data = response.json()
-            # Usually returns a list of dicts
-            if isinstance(data, list) and len(data) > 0:
-                return data[0].get('generated_text', '')
-            elif isinstance(data, dict) and 'generated_text' in data:
-                return data['generated_text']
-            else:
-                raise Exception(f"Unexpected response format from HuggingFace: {data}")
+        response = await self.client.post(self.endpoint, headers=headers, json=payload, timeout=30.0)
+        response.raise_for_status()
+        data = response.json()
+        # Usually returns a list of dicts
+        if isinstance(data, list) and len(data) > 0:
+            return data[0].get('generated_text', '')
+        elif isinstance(data, dict) and 'generated_text' in data:
+            return data['generated_text']
+        else:
+            raise Exception(f"Unexpected response format from HuggingFace: {data}")
+
+@dataclass
+class CascadeTier:
+    """One step of the model cascade: a provider pinned to a particular model."""
+    name: str
+    provider_name: str
+    model: Optional[str]
+    provider: LLMProvider
+    cost_per_1k_tokens: float = 0.0
+
+
+@dataclass
+class HedgingSettings:
+    """When to race a slow provider call against the next healthy one (``llm.hedging``)."""
+    enabled: bool = False
+    quantile: float = 0.9  # hedge once a call is slower than this share of its past calls
+    min_samples: int = 20  # latency observations needed before a call can be hedged
+    min_delay_ms: float = 100.0
+    max_ratio: float = 0.1  # at most this share of requests may fire a hedge
+    window_s: float = 60.0
+    latency_window_s: float = 300.0  # the quantile is taken over calls from this recent window only
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]]) -> "HedgingSettings":
+        section = section or {}
+        defaults = cls()
+        return cls(
+            enabled=bool(section.get('enabled', defaults.enabled)),
+            quantile=float(section.get('quantile', defaults.quantile)),
+            min_samples=int(section.get('min_samples', defaults.min_samples)),
+            min_delay_ms=float(section.get('min_delay_ms', defaults.min_delay_ms)),
+            max_ratio=float(section.get('max_ratio', defaults.max_ratio)),
+            window_s=float(section.get('window_s', defaults.window_s)),
+            latency_window_s=float(section.get('latency_window_s', defaults.latency_window_s)),
+        )
+
+
+class HedgeBudget:
+    """Caps hedges to a fraction of requests over a sliding window, so hedging cannot double load."""
+
+    def __init__(self, max_ratio: float, window_s: float, clock=time.monotonic):
+        self.max_ratio = max_ratio
+        self.window_s = window_s
+        self._clock = clock
+        self._lock = Lock()
+        self._requests: deque = deque()
+        self._hedges: deque = deque()
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._hedges):
+            while events and now - events[0] > self.window_s:
+                events.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = self._clock()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = self._clock()
+            self._trim(now)
+            if len(self._hedges) + 1 > self.max_ratio * len(self._requests):
+                return False
+            self._hedges.append(now)
+            return True
+
+
+@dataclass
+class _Candidate:
+    """A provider call the router may make: a routing-plan entry or a cascade tier."""
+    provider_name: str
+    provider: LLMProvider
+    attempt_index: int
+    model: Optional[str] = None
+    tier: Optional[CascadeTier] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider_name}:{self.tier.name}" if self.tier else self.provider_name
+
+    @property
+    def latency_key(self) -> str:
+        return self.latency_key_for(self.provider_name, self.tier)
+
+    @staticmethod
+    def latency_key_for(provider_name: str, tier: Optional[CascadeTier]) -> str:
+        return f"tier:{tier.name}" if tier else f"provider:{provider_name}"
+
+
+@dataclass
+class _RaceOutcome:
+    answer: Optional[str]
+    candidate: _Candidate  # the winner, or the primary when nothing answered
+    hedge: Optional[_Candidate] = None  # the backup raced against the primary, when a hedge fired
+    hedge_won: bool = False
+
+    @property
+    def last_tried(self) -> _Candidate:
+        """The furthest candidate this race called; the next attempt starts after it."""
+        return self.hedge or self.candidate
+
+
+class _StreamInterrupted(Exception):
+    """A provider stream failed after its first token, so it cannot fail over."""
+
+
+async def _next_delta(stream: AsyncIterator[str], captured: UsageCapture) -> str:
+    # asyncio.wait_for may run each step in a task of its own, so the capture is re-entered every time
+    with capture_usage(captured):
+        return await stream.__anext__()
+
+
+# Phrases that mean the model could not answer from the context it was given;
+# the system instruction asks for the first one explicitly.
+DEFAULT_UNCERTAINTY_MARKERS = [
+    "i don't have enough information",
+    "i do not have enough information",
+    "i'm not sure",
+    "i am not sure",
+    "i cannot answer",
+    "i can't answer",
+    "not enough context",
+    "unable to determine",
+]
+
 
 class LLMRouter:
-    def __init__(self):
-        self.config = load_config()
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config if config is not None else load_config()
         self.providers = {}
         self.breakers = {}
+        # One long-lived connection pool per provider, shared by its cascade tiers
+        self.http_clients: Dict[str, httpx.AsyncClient] = {}
+        # In-flight cap and RPM/TPM pacing per provider, also shared by its tiers
+        self.limiters: Dict[str, ProviderLimiter] = {}
         self._init_providers()
-        self._load_runtime_preferences()
+        self._init_pricing()
+        self._init_cascade()
+        self._init_hedging()
+        self._init_adaptive_routing()
+        self.preferences_refresh_s = float(self.config['llm'].get('settings_refresh_ms', 1000)) / 1000
+        self._preferences_version: Optional[int] = None
+        self._preferences_checked_at = 0.0
+        self._refresh_runtime_preferences(force=True)
+
+    def _build_provider(self, name: str, model: Optional[str] = None) -> Optional[LLMProvider]:
+        """Create provider ``name`` from config, optionally pinned to a different model."""
+        provider_config = self.config['llm']['providers'].get(name)
+        if provider_config is None:
+            return None
+        model = model or provider_config.get('model')
+
+        simulator = self.config['llm'].get('simulator') or {}
+        if simulator.get('enabled'):
+            # Every provider is served by the simulator farm instead of the real API
+            return SimulatedProvider(simulator.get('base_url', "http://localhost:8095"), name, model, client=self._http_client(name))
+        if name == 'grok':
+            return GrokProvider(api_key=os.getenv(provider_config['api_key_env'], "dummy"), model=model, client=self._http_client(name))
+        # SSL verification stays disabled for the hosted APIs (same as other services in this project)
+        if name == 'gemini':
+            return GeminiProvider(api_key=os.getenv(provider_config['api_key_env'], "dummy"), model=model, client=self._http_client(name, verify=False))
+        if name == 'openai':
+            return OpenAIProvider(api_key=os.getenv(provider_config['api_key_env'], "dummy"), model=model, client=self._http_client(name, verify=False))
+        if name == 'groq':
+            return GroqProvider(api_key=os.getenv(provider_config['api_key_env'], "dummy"), model=model, client=self._http_client(name, verify=False))
+        if name == 'huggingface':
+            return HuggingFaceProvider(
+                api_token=os.getenv(provider_config['token_env'], "dummy"),
+                endpoint=os.getenv(provider_config['endpoint_env'], "https://router.huggingface.co/models/google/flan-t5-base"),
+                client=self._http_client(name, verify=False)
+            )
+        if name == 'local':
+            return LocalLLMProvider(
+                base_url=provider_config['base_url'],
+                model=model,
+                client=self._http_client(name),
+                batching=LocalBatchSettings.from_config(provider_config.get('batching')),
+            )
+        return None
+
+    def _http_client(self, name: str, verify: bool = True) -> httpx.AsyncClient:
+        if name not in self.http_clients:
+            pool = HTTPPoolSettings.from_config(self.config['llm'], name)
+            self.http_clients[name] = pool.build_client(verify=verify)
+        return self.http_clients[name]
+
+    def _limiter(self, name: str) -> ProviderLimiter:
+        if name not in self.limiters:
+            settings = ProviderLimitSettings.from_config(self.config['llm'], name).per_worker(serving_workers())
+            self.limiters[name] = ProviderLimiter(name, settings)
+        return self.limiters[name]
+
+    async def _acquire_slot(
+        self, provider_name: str, prompt: str, system_instruction: str, reserve_s: float, probe: bool = False,
+    ) -> bool:
+        """Wait briefly for the provider's in-flight and rate limits; False means overflow to the next provider.
+
+        With ``probe`` set the caller holds the breaker's half-open probe, which
+        is given back whenever no slot is taken, including on cancellation.
+        """
+        limiter = self._limiter(provider_name)
+        waited = None
+        try:
+            # Real usage is only known afterwards, so the bucket is charged an estimate
+            waited = await limiter.acquire(
+                tokens=estimate_tokens(prompt, system_instruction),
+                timeout=timeout_for(limiter.settings.queue_timeout_s, reserve=reserve_s),
+            )
+        except ProviderSaturated as e:
+            log.info("provider_skipped", provider=provider_name, reason="saturated", limit=e.reason)
+            return False
+        finally:
+            # Saturated, or cancelled while queued (e.g. the hedge race was already decided)
+            if waited is None and probe:
+                await self.breakers[provider_name].release_probe_async()
+        if waited:
+            latency_histograms.observe(f"provider_queue:{provider_name}", waited * 1000)
+        return True
+
+    def breakers_snapshot(self) -> Dict[str, Any]:
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
+
+    def limits_snapshot(self) -> Dict[str, Any]:
+        return {name: self._limiter(name).snapshot() for name in self.providers}
+
+    async def aclose(self) -> None:
+        """Close every provider connection pool; call once on shutdown."""
+        clients, self.http_clients = self.http_clients, {}
+        for name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as exc:
+                log.warning("http_client_close_failed", provider=name, error=str(exc))
 
     def _init_providers(self):
         llm_config = self.config['llm']
+        breaker_config = llm_config.get('circuit_breaker', {}) or {}
+        # Shared breaker state keeps every worker process in agreement about provider health;
+        # a single process gains nothing from it and would pay a database round-trip per call
+        shared_state = breaker_config.get('shared_state', 'auto')
+        if shared_state == 'auto':
+            shared_state = serving_workers() > 1
+        breaker_store = get_breaker_store() if shared_state else None
         
         def add_provider(name, instance):
             self.providers[name] = instance
-            self.breakers[name] = CircuitBreaker(failure_threshold=3, recovery_timeout=30)
+            # Providers may tune their own thresholds (e.g. a slower slow-call limit for local models)
+            settings = dict(breaker_config)
+            settings.update((llm_config['providers'].get(name) or {}).get('circuit_breaker', {}) or {})
+            self.breakers[name] = CircuitBreaker(
+                failure_threshold=settings.get('failure_threshold', 3),
+                recovery_timeout=settings.get('recovery_timeout_s', 30),
+                name=name,
+                store=breaker_store,
+                sync_interval=float(settings.get('sync_interval_ms', 1000)) / 1000,
+                window_s=float(settings.get('window_s', 60)),
+                min_calls=int(settings.get('min_calls', 10)),
+                failure_rate_threshold=float(settings.get('failure_rate_threshold', 0.5)),
+                slow_call_ms=float(settings.get('slow_call_ms', 0)),
+                slow_call_rate_threshold=float(settings.get('slow_call_rate_threshold', 0.8)),
+                probe_timeout=settings.get('probe_timeout_s'),
+            )
 
         # Initialize providers based on config
-        if 'grok' in llm_config['providers']:
-            add_provider('grok', GrokProvider(
-                api_key=os.getenv(llm_config['providers']['grok']['api_key_env'], "dummy"),
-                model=llm_config['providers']['grok']['model']
-            ))
-        
-        if 'gemini' in llm_config['providers']:
-            add_provider('gemini', GeminiProvider(
-                api_key=os.getenv(llm_config['providers']['gemini']['api_key_env'], "dummy"),
-                model=llm_config['providers']['gemini']['model']
-            ))
+        for name in ('grok', 'gemini', 'openai', 'groq', 'huggingface', 'local'):
+            if name in llm_config['providers']:
+                add_provider(name, self._build_provider(name))
 
-        if 'openai' in llm_config['providers']:
-            add_provider('openai', OpenAIProvider(
-                api_key=os.getenv(llm_config['providers']['openai']['api_key_env'], "dummy"),
-                model=llm_config['providers']['openai']['model']
-            ))
+    def _init_pricing(self):
+        # Per-model token prices; cascade tiers' cost_per_1k_tokens covers models missing here
+        self.prices = PriceTable.from_config(self.config['llm'])
 
-        if 'groq' in llm_config['providers']:
-            add_provider('groq', GroqProvider(
-                api_key=os.getenv(llm_config['providers']['groq']['api_key_env'], "dummy"),
-                model=llm_config['providers']['groq']['model']
-            ))
-            
-        if 'huggingface' in llm_config['providers']:
-            add_provider('huggingface', HuggingFaceProvider(
-                api_token=os.getenv(llm_config['providers']['huggingface']['token_env'], "dummy"),
-                endpoint=os.getenv(llm_config['providers']['huggingface']['endpoint_env'], "https://router.huggingface.co/models/google/flan-t5-base")
-            ))
+    def _init_adaptive_routing(self):
+        self.adaptive_routing = AdaptiveRoutingSettings.from_config(self.config['llm'].get('adaptive_routing'))
+        self.provider_health = ProviderHealth(self.adaptive_routing)
+        # Same events as llm_provider_events, kept in memory for ranking
+        provider_metrics.add_listener(self.provider_health.observe)
+        self.routing_mode = 'adaptive' if self.adaptive_routing.enabled else 'static'
+
+    def _init_hedging(self):
+        self.hedging = HedgingSettings.from_config(self.config['llm'].get('hedging'))
+        self.hedge_budget = HedgeBudget(self.hedging.max_ratio, self.hedging.window_s)
+        self.hedge_latencies = RecentLatencies(self.hedging.latency_window_s)
+        self.hedge_stats = {"fired": 0, "won": 0, "lost": 0, "both_failed": 0, "over_budget": 0}
 
-        if 'local' in llm_config['providers']:
-            add_provider('local', LocalLLMProvider(
-                base_url=llm_config['providers']['local']['base_url'],
-                model=llm_config['providers']['local']['model']
+    def _init_cascade(self):
+        cascade_config = self.config['llm'].get('cascade', {}) or {}
+        self.cascade_enabled = bool(cascade_config.get('enabled', False))
+        self.cascade_min_retrieval_confidence = float(cascade_config.get('min_retrieval_confidence', 0.5))
+        self.uncertainty_markers = [
+            marker.lower() for marker in cascade_config.get('uncertainty_markers', DEFAULT_UNCERTAINTY_MARKERS)
+        ]
+        self.cascade_tiers: List[CascadeTier] = []
+        for tier_config in cascade_config.get('tiers', []) or []:
+            provider_name = tier_config.get('provider')
+            if provider_name not in self.providers:
+                log.warning("cascade_tier_skipped", tier=tier_config.get('name'), provider=provider_name, reason="provider_not_configured")
+                continue
+            model = tier_config.get('model') or self.config['llm']['providers'][provider_name].get('model')
+            self.cascade_tiers.append(CascadeTier(
+                name=tier_config.get('name') or f"tier{len(self.cascade_tiers)}",
+                provider_name=provider_name,
+                model=model,
+                provider=self._build_provider(provider_name, model),
+                cost_per_1k_tokens=float(tier_config.get('cost_per_1k_tokens', 0.0)),
             ))
+        self.cascade_stats: Dict[str, Dict[str, int]] = {"served": {}, "escalations": {}}
+
+    def _refresh_runtime_preferences(self, force: bool = False):
+        """Reload routing preferences only when the settings version has moved.
+
+        The version is polled at most every ``preferences_refresh_s`` seconds, so
+        most turns reuse the cached plan without touching the database.
+        """
+        now = time.monotonic()
+        if not force and now - self._preferences_checked_at < self.preferences_refresh_s:
+            return
+        self._preferences_checked_at = now
+        # Read before loading: a write landing in between is picked up on the next poll
+        version = settings_service.version()
+        if force or version != self._preferences_version:
+            self._load_runtime_preferences()
+            self._preferences_version = version
 
     def _load_runtime_preferences(self):
         fallback_default = self.config['llm'].get('fallback_order', list(self.providers.keys()))
@@ -265,7 +885,8 @@ class LLMRouter:
         overrides = settings_service.get_many({
             'llm_primary_provider': primary_default,
             'llm_fallback_order': fallback_default,
-            'llm_auto_fallback': True
+            'llm_auto_fallback': True,
+            'llm_routing_mode': 'adaptive' if self.adaptive_routing.enabled else 'static'
         })
 
         available_providers = list(self.providers.keys())
@@ -284,6 +905,7 @@ class LLMRouter:
         self.primary_provider = primary
         self.fallback_order = fallback_order
         self.auto_fallback_enabled = auto_fallback_enabled
+        self.routing_mode = 'adaptive' if overrides.get('llm_routing_mode') == 'adaptive' else 'static'
 
         routing = []
         if self.primary_provider:
@@ -292,50 +914,534 @@ class LLMRouter:
             routing.extend([p for p in self.fallback_order if p not in routing])
         self.routing_plan = routing if routing else available_providers
 
-    async def generate_answer(self, prompt: str, system_instruction: str) -> Dict[str, Any]:
-        # Always refresh routing preferences to pick up latest admin changes
-        self._load_runtime_preferences()
+    def current_routing_plan(self) -> List[str]:
+        """The configured plan, or in adaptive mode its healthy providers ranked by live score.
 
-        for attempt_index, provider_name in enumerate(self.routing_plan):
-            if provider_name not in self.providers:
+        Offline work (see ``batch_generation``) goes to a healthy batching
+        provider first, with the rest of the plan as its fallbacks.
+        """
+        plan = self.routing_plan
+        if self.routing_mode == 'adaptive' and self.auto_fallback_enabled:
+            healthy = [p for p in plan if p in self.breakers and self.breakers[p].state != State.OPEN]
+            unhealthy = [p for p in plan if p not in healthy]
+            plan = self.provider_health.rank(healthy) + unhealthy
+        batching = self._batching_providers()
+        if batching:
+            plan = [p for p in plan if p in batching] + [p for p in plan if p not in batching]
+        return plan
+
+    def _batching_providers(self) -> List[str]:
+        """Healthy providers that batch offline calls, when the current call is offline work."""
+        if not in_batch_generation():
+            return []
+        return [
+            name for name, provider in self.providers.items()
+            if getattr(provider, 'batcher', None) is not None and self.breakers[name].state != State.OPEN
+        ]
+
+    def batching_snapshot(self) -> Dict[str, Any]:
+        return {
+            name: provider.batching_snapshot()
+            for name, provider in self.providers.items()
+            if getattr(provider, 'batcher', None) is not None
+        }
+
+    def routing_snapshot(self) -> Dict[str, Any]:
+        return {
+            "mode": self.routing_mode,
+            "settings_version": self._preferences_version,
+            "configured_plan": list(self.routing_plan),
+            "plan": self.current_routing_plan(),
+            "providers": self.provider_health.snapshot(self.routing_plan),
+        }
+
+    def attempt_timeout(self, provider_name: str) -> float:
+        """Per-attempt cap in seconds: the provider's ``timeout_ms`` or ``llm.timeout_ms``."""
+        llm_config = self.config['llm']
+        provider_config = llm_config['providers'].get(provider_name) or {}
+        return float(provider_config.get('timeout_ms', llm_config.get('timeout_ms', 5000))) / 1000
+
+    def prompt_token_budget(self) -> int:
+        """Prompt token budget of the provider that will be tried first (the first cascade tier when enabled).
+
+        Providers may set ``max_prompt_tokens`` in config; otherwise the global
+        ``llm.prompt_budget_tokens`` applies.
+        """
+        llm_config = self.config['llm']
+        default_budget = int(llm_config.get('prompt_budget_tokens', 3000))
+        candidates = [tier.provider_name for tier in self.cascade_tiers] if self.cascade_enabled else []
+        for provider_name in candidates + self.current_routing_plan():
+            if provider_name in self.providers and self.breakers[provider_name].state != State.OPEN:
+                provider_config = llm_config['providers'].get(provider_name) or {}
+                return int(provider_config.get('max_prompt_tokens', default_budget))
+        return default_budget
+
+    def is_uncertain(self, answer: Optional[str]) -> bool:
+        """True when the answer admits it could not be given from the context."""
+        text = (answer or "").strip().lower()
+        return not text or any(marker in text for marker in self.uncertainty_markers)
+
+    def _call_cost(self, provider_name: str, model: Optional[str], usage: TokenUsage, cost_per_1k_tokens: float = 0.0) -> Optional[float]:
+        """USD for one call: ``llm.pricing`` for its model or provider, else a blended ``cost_per_1k_tokens``."""
+        cost = self.prices.cost(provider_name, model, usage)
+        if cost is None and cost_per_1k_tokens:
+            cost = usage.total_tokens / 1000 * cost_per_1k_tokens
+        return cost
+
+    def _count(self, bucket: str, key: str) -> None:
+        counts = self.cascade_stats[bucket]
+        counts[key] = counts.get(key, 0) + 1
+
+    def cascade_snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.cascade_enabled,
+            "tiers": [
+                {"name": tier.name, "provider": tier.provider_name, "model": tier.model, "cost_per_1k_tokens": tier.cost_per_1k_tokens}
+                for tier in self.cascade_tiers
+            ],
+            "served": dict(self.cascade_stats["served"]),
+            "escalations": dict(self.cascade_stats["escalations"]),
+        }
+
+    async def _attempt(
+        self,
+        provider_name: str,
+        provider: LLMProvider,
+        prompt: str,
+        system_instruction: str,
+        attempt_index: int,
+        reserve_s: float,
+        model: Optional[str] = None,
+        tier: Optional[CascadeTier] = None,
+        hedge: bool = False,
+    ) -> Optional[str]:
+        """One provider call with breaker, timeout and metrics; None when skipped or failed.
+
+        A call cancelled because a hedged rival won records nothing.
+        """
+        breaker = self.breakers[provider_name]
+        if not await breaker.allow_request_async():
+            log.info("provider_skipped", provider=provider_name, reason="circuit_open", sample_rate=0.1)
+            return None
+        probe = breaker.holds_probe()
+
+        if not await self._acquire_slot(provider_name, prompt, system_instruction, reserve_s, probe=probe):
+            return None
+
+        provider_config = self.config['llm']['providers'].get(provider_name) or {}
+        model = model or provider_config.get('model')
+        cost_per_1k = tier.cost_per_1k_tokens if tier else float(provider_config.get('cost_per_1k_tokens', 0.0))
+        attempt_start = time.time()
+        try:
+            attempt_timeout = timeout_for(self.attempt_timeout(provider_name), reserve=reserve_s)
+            log.debug("provider_attempt", provider=provider_name, model=model, tier=tier.name if tier else None,
+                      attempt=attempt_index, timeout_s=round(attempt_timeout, 2))
+            try:
+                with capture_usage() as captured:
+                    response_text = await asyncio.wait_for(
+                        provider.generate_response(prompt, system_instruction),
+                        timeout=attempt_timeout,
+                    )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"{provider_name} timed out after {attempt_timeout:.2f}s")
+            usage = captured.usage or TokenUsage.estimate((prompt, system_instruction), (response_text,))
+            latency_ms = (time.time() - attempt_start) * 1000
+            await breaker.record_result(False, latency_ms=latency_ms)
+            latency_histograms.observe(f"provider:{provider_name}", latency_ms)
+            if tier:
+                latency_histograms.observe(f"tier:{tier.name}", latency_ms)
+            self.hedge_latencies.observe(_Candidate.latency_key_for(provider_name, tier), latency_ms)
+            provider_metrics.record_event(
+                provider=provider_name,
+                success=True,
+                latency_ms=latency_ms,
+                fallback_depth=attempt_index,
+                model=model,
+                tier=tier.name if tier else None,
+                cost_usd=self._call_cost(provider_name, model, usage, cost_per_1k),
+                hedge=hedge,
+                usage=usage,
+            )
+            return response_text
+        except asyncio.CancelledError:
+            # No verdict from a cancelled call; let another caller probe
+            if probe:
+                await breaker.release_probe_async()
+            raise
+        except Exception as e:
+            log.warning("provider_failed", provider=provider_name, model=model, attempt=attempt_index, error=str(e))
+            latency_ms = (time.time() - attempt_start) * 1000
+            await breaker.record_result(True, latency_ms=latency_ms)
+            latency_histograms.observe(f"provider_error:{provider_name}", latency_ms)
+            # The provider may still bill the prompt, so failures are charged for it
+            usage = TokenUsage.estimate((prompt, system_instruction))
+            provider_metrics.record_event(
+                provider=provider_name,
+                success=False,
+                latency_ms=latency_ms,
+                error_message=str(e),
+                fallback_depth=attempt_index,
+                model=model,
+                tier=tier.name if tier else None,
+                cost_usd=self._call_cost(provider_name, model, usage, cost_per_1k),
+                hedge=hedge,
+                usage=usage,
+            )
+            return None
+        finally:
+            self._limiter(provider_name).release()
+
+    def hedge_delay(self, candidate: _Candidate) -> Optional[float]:
+        """Seconds to wait on ``candidate`` before hedging; None while hedging is off or data is thin."""
+        # Offline work has no latency target worth a duplicate call
+        if not self.hedging.enabled or in_batch_generation():
+            return None
+        # Recent calls only, so the threshold moves when the provider slows down or recovers
+        if self.hedge_latencies.count(candidate.latency_key) < self.hedging.min_samples:
+            return None
+        threshold_ms = self.hedge_latencies.percentile(candidate.latency_key, self.hedging.quantile)
+        if threshold_ms is None:
+            return None
+        return max(threshold_ms, self.hedging.min_delay_ms) / 1000
+
+    def _hedge_candidate(self, backups: List[_Candidate], min_budget_s: float) -> Optional[_Candidate]:
+        backup = next(
+            (c for c in backups if self.breakers[c.provider_name].state != State.OPEN),
+            None,
+        )
+        if backup is None or not has_budget(min_budget_s):
+            return None
+        if not self.hedge_budget.try_acquire():
+            self.hedge_stats["over_budget"] += 1
+            return None
+        return backup
+
+    async def _race(
+        self,
+        primary: _Candidate,
+        backups: List[_Candidate],
+        prompt: str,
+        system_instruction: str,
+        min_attempt_s: float,
+        reserve_s: float,
+    ) -> _RaceOutcome:
+        """Call ``primary``; once it is slower than its usual p90, race the next healthy backup.
+
+        The first non-empty answer wins and the other call is cancelled.
+        """
+        def call(candidate: _Candidate, hedge: bool = False):
+            return asyncio.ensure_future(self._attempt(
+                candidate.provider_name, candidate.provider, prompt, system_instruction,
+                attempt_index=candidate.attempt_index, reserve_s=reserve_s,
+                model=candidate.model, tier=candidate.tier, hedge=hedge,
+            ))
+
+        race_start = time.time()
+        primary_task = call(primary)
+        tasks = [primary_task]
+        try:
+            delay = self.hedge_delay(primary)
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+            backup = None
+            if delay is not None and not primary_task.done():
+                backup = self._hedge_candidate(backups, min_attempt_s + reserve_s)
+            if backup is None:
+                return _RaceOutcome(await primary_task, primary)
+
+            self.hedge_stats["fired"] += 1
+            log.info("provider_hedged", primary=primary.label, hedge=backup.label, delay_ms=round(delay * 1000))
+            hedge_task = call(backup, hedge=True)
+            tasks.append(hedge_task)
+            outcome = _RaceOutcome(None, primary, hedge=backup)
+            pending = set(tasks)
+            while pending and outcome.answer is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer the primary when both land in the same tick
+                for task, candidate in ((primary_task, primary), (hedge_task, backup)):
+                    if task in done and task.result() is not None and outcome.answer is None:
+                        outcome = _RaceOutcome(task.result(), candidate, hedge=backup, hedge_won=task is hedge_task)
+
+            winner = "none" if outcome.answer is None else ("hedge" if outcome.hedge_won else "primary")
+            self.hedge_stats[{"hedge": "won", "primary": "lost", "none": "both_failed"}[winner]] += 1
+            provider_metrics.record_hedge(
+                primary_provider=primary.label,
+                hedge_provider=backup.label,
+                delay_ms=delay * 1000,
+                winner=winner,
+                latency_ms=(time.time() - race_start) * 1000,
+            )
+            return outcome
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def hedging_snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.hedging.enabled,
+            "quantile": self.hedging.quantile,
+            "max_ratio": self.hedging.max_ratio,
+            **self.hedge_stats,
+        }
+
+    async def _run_cascade(
+        self,
+        prompt: str,
+        system_instruction: str,
+        retrieval_confidence: Optional[float],
+        min_attempt_s: float,
+        reserve_s: float,
+    ) -> Optional[Dict[str, Any]]:
+        """Cheapest tier first; move up only on an uncertain answer or weak retrieval."""
+        tiers = self.cascade_tiers
+        start_index = 0
+        escalation = None
+        if (
+            len(tiers) > 1
+            and retrieval_confidence is not None
+            and retrieval_confidence < self.cascade_min_retrieval_confidence
+        ):
+            # The cheap tier is unlikely to do well on weak evidence; go straight up
+            start_index = 1
+            escalation = "low_retrieval_confidence"
+            self._count("escalations", escalation)
+
+        candidates = [
+            _Candidate(tier.provider_name, tier.provider, attempt_index=index, model=tier.model, tier=tier)
+            for index, tier in enumerate(tiers)
+        ]
+        uncertain_result = None
+        depth = start_index
+        while depth < len(tiers):
+            if not has_budget(min_attempt_s + reserve_s):
+                log.warning("cascade_stopped", tier=tiers[depth].name, reason="deadline")
+                break
+            # A slow tier is hedged with the next tier up
+            race = await self._race(candidates[depth], candidates[depth + 1:], prompt, system_instruction, min_attempt_s, reserve_s)
+            if race.answer is None:
+                # The hedge may have skipped an open tier, so resume after the furthest tier called
+                depth = race.last_tried.attempt_index + 1
                 continue
-            
-            breaker = self.breakers[provider_name]
-            if not breaker.allow_request():
-                print(f"Skipping {provider_name} (Circuit Breaker OPEN)")
+            tier = race.candidate.tier
+            depth = race.candidate.attempt_index + 1
+            result = {
+                "provider": tier.provider_name,
+                "model": tier.model,
+                "tier": tier.name,
+                "answer": race.answer,
+                "success": True,
+                "escalation": escalation,
+            }
+            if race.hedge_won:
+                result["hedged"] = True
+            if depth < len(tiers) and self.is_uncertain(race.answer):
+                escalation = "uncertain_answer"
+                self._count("escalations", escalation)
+                log.info("cascade_escalated", tier=tier.name, reason=escalation)
+                uncertain_result = result
                 continue
-                
-            provider = self.providers[provider_name]
-            attempt_start = time.time()
-            try:
-                print(f"Attempting generation with {provider_name}...")
-                response_text = await provider.generate_response(prompt, system_instruction)
-                breaker.record_success()
-                provider_metrics.record_event(
-                    provider=provider_name,
-                    success=True,
-                    latency_ms=(time.time() - attempt_start) * 1000,
-                    fallback_depth=attempt_index,
-                )
-                return {
-                    "provider": provider_name,
-                    "answer": response_text,
-                    "success": True
-                }
-            except Exception as e:
-                print(f"Provider {provider_name} failed: {e}")
-                breaker.record_failure()
-                provider_metrics.record_event(
-                    provider=provider_name,
-                    success=False,
-                    latency_ms=(time.time() - attempt_start) * 1000,
-                    error_message=str(e),
-                    fallback_depth=attempt_index,
-                )
+            self._count("served", tier.name)
+            return result
+
+        if uncertain_result:
+            # The stronger tiers failed outright; an uncertain answer beats none
+            self._count("served", uncertain_result["tier"])
+        return uncertain_result
+
+    async def generate_answer(
+        self,
+        prompt: str,
+        system_instruction: str,
+        retrieval_confidence: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        # Admin changes to the routing preferences land within preferences_refresh_s
+        self._refresh_runtime_preferences()
+
+        min_attempt_s = float(self.config['llm'].get('min_attempt_ms', 500)) / 1000
+        # Held back so the caller can still build a fallback answer in time
+        reserve_s = float(self.config['llm'].get('deadline_reserve_ms', 250)) / 1000
+        self.hedge_budget.record_request()
+
+        plan = self.current_routing_plan()
+        # Offline work that has a batching backend skips the hosted cascade
+        batched = bool(plan) and plan[0] in self._batching_providers()
+        if self.cascade_enabled and self.cascade_tiers and not batched:
+            result = await self._run_cascade(prompt, system_instruction, retrieval_confidence, min_attempt_s, reserve_s)
+            if result:
+                return result
+            # Every tier failed: fall back to the regular routing plan
+
+        # attempt_index is the position in this list, so a race can say where to resume
+        available = [provider_name for provider_name in plan if provider_name in self.providers]
+        candidates = [
+            _Candidate(provider_name, self.providers[provider_name], attempt_index=attempt_index)
+            for attempt_index, provider_name in enumerate(available)
+        ]
+        position = 0
+        while position < len(candidates):
+            # A fallback that cannot finish before the request deadline is not worth starting
+            if not has_budget(min_attempt_s + reserve_s):
+                log.warning("provider_skipped", provider=candidates[position].provider_name,
+                            attempt=candidates[position].attempt_index, reason="deadline")
+                break
+
+            # A slow provider is hedged with the next one in the plan
+            race = await self._race(candidates[position], candidates[position + 1:], prompt, system_instruction, min_attempt_s, reserve_s)
+            # The hedge may have skipped an open provider, so resume after the furthest one called
+            position = race.last_tried.attempt_index + 1
+            if race.answer is None:
                 continue
+            provider_name = race.candidate.provider_name
+            result = {
+                "provider": provider_name,
+                "model": (self.config['llm']['providers'].get(provider_name) or {}).get('model'),
+                "answer": race.answer,
+                "success": True
+            }
+            if race.hedge_won:
+                result["hedged"] = True
+            return result
         
         return {
             "provider": "none",
             "answer": None,
             "success": False
         }
+
+    async def _attempt_stream(
+        self,
+        provider_name: str,
+        provider: LLMProvider,
+        prompt: str,
+        system_instruction: str,
+        attempt_index: int,
+        reserve_s: float,
+    ) -> AsyncIterator[str]:
+        """``_attempt`` for streams: yields deltas, ends empty when skipped or failed before the first token.
+
+        Each wait for the next delta is capped by the attempt timeout (shortened to
+        the request deadline). A failure after the first delta raises
+        ``_StreamInterrupted``.
+        """
+        breaker = self.breakers[provider_name]
+        if not await breaker.allow_request_async():
+            log.info("provider_skipped", provider=provider_name, reason="circuit_open", sample_rate=0.1)
+            return
+        probe = breaker.holds_probe()
+
+        if not await self._acquire_slot(provider_name, prompt, system_instruction, reserve_s, probe=probe):
+            return
+
+        provider_config = self.config['llm']['providers'].get(provider_name) or {}
+        model = provider_config.get('model')
+        cost_per_1k = float(provider_config.get('cost_per_1k_tokens', 0.0))
+        attempt_start = time.time()
+        first_token_ms: Optional[float] = None
+        parts: List[str] = []
+        captured = UsageCapture()
+        stream = provider.generate_stream(prompt, system_instruction)
+        try:
+            while True:
+                wait_s = timeout_for(self.attempt_timeout(provider_name), reserve=reserve_s)
+                try:
+                    delta = await asyncio.wait_for(_next_delta(stream, captured), timeout=wait_s)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{provider_name} stream stalled for {wait_s:.2f}s")
+                if not delta:
+                    continue
+                if not parts:
+                    first_token_ms = (time.time() - attempt_start) * 1000
+                    latency_histograms.observe(f"provider_first_token:{provider_name}", first_token_ms)
+                parts.append(delta)
+                yield delta
+            if not parts:
+                raise ValueError(f"{provider_name} stream ended without content")
+        except (asyncio.CancelledError, GeneratorExit):
+            if probe:
+                await breaker.release_probe_async()
+            raise
+        except Exception as e:
+            log.warning("provider_failed", provider=provider_name, model=model, attempt=attempt_index,
+                        error=str(e), streamed_chars=sum(len(part) for part in parts))
+            latency_ms = (time.time() - attempt_start) * 1000
+            await breaker.record_result(True, latency_ms=latency_ms)
+            latency_histograms.observe(f"provider_error:{provider_name}", latency_ms)
+            usage = captured.usage or TokenUsage.estimate((prompt, system_instruction), parts)
+            provider_metrics.record_event(
+                provider=provider_name,
+                success=False,
+                latency_ms=latency_ms,
+                error_message=str(e),
+                fallback_depth=attempt_index,
+                model=model,
+                cost_usd=self._call_cost(provider_name, model, usage, cost_per_1k),
+                usage=usage,
+            )
+            if parts:
+                raise _StreamInterrupted(str(e)) from e
+            return
+        finally:
+            await stream.aclose()
+            self._limiter(provider_name).release()
+
+        # A stream is judged slow by its time to first token
+        await breaker.record_result(False, latency_ms=first_token_ms)
+        latency_ms = (time.time() - attempt_start) * 1000
+        latency_histograms.observe(f"provider:{provider_name}", latency_ms)
+        usage = captured.usage or TokenUsage.estimate((prompt, system_instruction), parts)
+        provider_metrics.record_event(
+            provider=provider_name,
+            success=True,
+            latency_ms=latency_ms,
+            fallback_depth=attempt_index,
+            model=model,
+            cost_usd=self._call_cost(provider_name, model, usage, cost_per_1k),
+            usage=usage,
+        )
+
+    async def generate_stream(self, prompt: str, system_instruction: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream an answer as ``{"type": "delta", "text"}`` events, then one ``{"type": "done", ...}``.
+
+        The done event carries the same fields as ``generate_answer``'s result.
+        Providers are tried in routing-plan order, and one that errors or stalls
+        before its first token is skipped. After that the stream is committed, so
+        a later error ends it with ``success`` False and the partial answer. The
+        cascade and hedging need whole answers, so streams use the plan only.
+        """
+        self._refresh_runtime_preferences()
+        min_attempt_s = float(self.config['llm'].get('min_attempt_ms', 500)) / 1000
+        reserve_s = float(self.config['llm'].get('deadline_reserve_ms', 250)) / 1000
+
+        for attempt_index, provider_name in enumerate(self.current_routing_plan()):
+            if provider_name not in self.providers:
+                continue
+            if not has_budget(min_attempt_s + reserve_s):
+                log.warning("provider_skipped", provider=provider_name, attempt=attempt_index, reason="deadline")
+                break
+            done = {
+                "type": "done",
+                "provider": provider_name,
+                "model": (self.config['llm']['providers'].get(provider_name) or {}).get('model'),
+                "success": True,
+            }
+            parts: List[str] = []
+            stream = self._attempt_stream(
+                provider_name, self.providers[provider_name], prompt, system_instruction, attempt_index, reserve_s,
+            )
+            try:
+                async for delta in stream:
+                    parts.append(delta)
+                    yield {"type": "delta", "text": delta}
+            except _StreamInterrupted as e:
+                done.update(success=False, error=str(e))
+            finally:
+                # Also reached when the consumer stops early; close the provider stream now
+                await stream.aclose()
+            if parts:
+                yield {**done, "answer": "".join(parts)}
+                return
+
+        yield {"type": "done", "provider": "none", "answer": None, "success": False}
@@ -1,14 +1,21 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import asyncio
 import sys
 import os
 import time
+from collections import defaultdict
 
 # Add current directory to path
 sys.path.append(os.path.dirname(__file__))
 from rag_client import RAGClient
-from llm_provider import LLMRouter
+from llm_provider import LLMRouter, batch_generation
+from speculation import SpeculativeTask, speculation_stats
+from prompt_builder import PromptBuilder
+from extractive import ExtractiveAnswerer, ExtractiveSettings
+from services.shared.intent_classifier import IntentMatch, get_intent_classifier
 from services.shared.config_utils import load_config
 from services.shared.security import redactor
 from services.shared.logger import logger as interaction_logger
@@ -19,6 +26,23 @@ from services.shared.knowledge_gap_analyzer import KnowledgeGapAnalyzer
 from services.shared.translation_service import get_translation_service
 from services.shared.settings_service import get_settings_service
 from services.shared.faq_answer_service import FAQAnswerService
+from services.shared.embeddings import EmbeddingSettings, get_embedder
+from services.shared.stage_timing import StageTimer, get_latency_histograms
+from services.shared.single_flight import SingleFlight, normalize_key
+from services.shared.structured_logging import get_logger, get_logging_pipeline
+from services.shared.admission import AdmissionController, AdmissionRejected
+from services.shared.deadline import (
+    DEADLINE_HEADER,
+    ClientDisconnected,
+    cancel_on_disconnect,
+    deadline_scope,
+    has_budget,
+    parse_deadline_header,
+    remaining,
+    timeout_for,
+)
+
+log = get_logger("chat_orchestrator")
 
 app = FastAPI(title="Chat Orchestrator")
 rag_client = RAGClient()
@@ -30,7 +54,21 @@ sentiment_analyzer = get_sentiment_analyzer()
 cache = ResponseCache(ttl_hours=24)  # Cache responses for 24 hours
 gap_analyzer = KnowledgeGapAnalyzer()
 translation_service = get_translation_service()
-faq_answer_service = FAQAnswerService()
+embedding_settings = EmbeddingSettings.from_config(config)
+faq_answer_service = FAQAnswerService(
+    embedder=get_embedder(embedding_settings.model) if embedding_settings.multilingual else None,
+    semantic_min_score=embedding_settings.faq_min_similarity,
+)
+# Search non-English questions as written (multilingual index and FAQ embeddings)
+# instead of translating them to English first
+multilingual_retrieval = embedding_settings.multilingual and faq_answer_service.semantic_enabled
+if embedding_settings.multilingual and not multilingual_retrieval:
+    log.warning("multilingual_retrieval_unavailable", model=embedding_settings.model, fallback="translate_first")
+latency_histograms = get_latency_histograms()
+prompt_builder = PromptBuilder()
+answer_flights = SingleFlight()
+extractive_answerer = ExtractiveAnswerer(ExtractiveSettings.from_config(config.get('chat', {}).get('extractive')))
+intent_classifier = get_intent_classifier()
 
 
 def _get_confidence_threshold() -> float:
@@ -52,9 +90,42 @@ def _calculate_response_confidence(top_score: Optional[float], threshold: float)
     confidence = max(0.1, min(1.0, ratio))
     return float(confidence)
 
+def _cache_context_window() -> int:
+    """Number of prior messages that key follow-up cache entries (0 disables)."""
+    try:
+        return max(0, int(config.get('chat', {}).get('cache_context_window', 2)))
+    except (TypeError, ValueError):
+        return 2
+
+
+def _speculative_rag_enabled() -> bool:
+    return bool(config.get('chat', {}).get('speculative_rag', True))
+
+
+def _admission_settings() -> Dict[str, float]:
+    admission_config = config.get('chat', {}).get('admission', {}) or {}
+    return {
+        "max_concurrent": int(admission_config.get('max_concurrent', 32)),
+        "max_queue": int(admission_config.get('max_queue', 64)),
+        "queue_timeout_s": float(admission_config.get('queue_timeout_ms', 2000)) / 1000,
+        "request_timeout_s": float(admission_config.get('request_timeout_ms', 20000)) / 1000,
+        "retry_after_s": int(admission_config.get('retry_after_seconds', 5)),
+        "degraded_retrieval_timeout_s": float(admission_config.get('degraded_retrieval_timeout_ms', 1000)) / 1000,
+    }
+
+
+admission_settings = _admission_settings()
+admission = AdmissionController(
+    max_concurrent=admission_settings["max_concurrent"],
+    max_queue=admission_settings["max_queue"],
+    queue_timeout_s=admission_settings["queue_timeout_s"],
+)
+
+
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
+    debug: bool = False
 
 class Citation(BaseModel):
     doc_id: str
@@ -72,158 +143,409 @@ class AnswerEnvelope(BaseModel):
     notes: Optional[str] = None
     sentiment: Optional[Dict[str, Any]] = None
     session_id: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    debug: Optional[Dict[str, Any]] = None
+
+
+def _finalize_timing(
+    envelope: AnswerEnvelope,
+    timer: StageTimer,
+    request: ChatRequest,
+    debug_extra: Optional[Dict[str, Any]] = None,
+) -> AnswerEnvelope:
+    """Feed the request's stage timings into the histograms and optionally echo them."""
+    latency_histograms.observe_timer(timer)
+    latency_histograms.observe(f"path:{envelope.provider}", timer.total_ms())
+    if request.debug:
+        envelope.debug = {"timings": timer.breakdown(), **(debug_extra or {})}
+    return envelope
+
+class BatchChatRequest(BaseModel):
+    messages: List[ChatRequest]
+    stream: bool = False
+    max_concurrency: Optional[int] = None
+
+class BatchItemResult(BaseModel):
+    index: int
+    response: Optional[AnswerEnvelope] = None
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchItemResult]
+    latency_ms: int
+
 
 @app.post("/chat", response_model=AnswerEnvelope)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
+    # The gateway's deadline (if any) bounds everything below; our own request
+    # timeout applies when it is later or missing.
+    local_deadline = time.time() + admission_settings["request_timeout_s"]
+    upstream_deadline = parse_deadline_header(http_request.headers.get(DEADLINE_HEADER))
+    with deadline_scope(min(local_deadline, upstream_deadline or local_deadline)):
+        try:
+            return await cancel_on_disconnect(_admitted_chat(request), http_request.is_disconnected)
+        except ClientDisconnected:
+            log.info("client_disconnected", session_id=request.session_id)
+            raise HTTPException(status_code=499, detail="Client closed request")
+
+
+async def _admitted_chat(request: ChatRequest, prefetched: Optional[Dict[str, Any]] = None) -> AnswerEnvelope:
+    # Bounded concurrency plus the request deadline; anything that cannot be
+    # admitted or finished in time is answered by the degraded path instead.
+    # Batch items come through here too, so a batch cannot bypass shedding.
+    try:
+        async with admission.slot(timeout=remaining()):
+            return await asyncio.wait_for(_handle_chat(request, prefetched), timeout=remaining())
+    except AdmissionRejected as rejected:
+        return await _shed_load(request, rejected.reason)
+    except asyncio.TimeoutError:
+        admission.record_deadline_exceeded()
+        return await _shed_load(request, "deadline_exceeded")
+
+
+async def _shed_load(request: ChatRequest, reason: str) -> AnswerEnvelope:
+    """Answer without the LLM when saturated: cache, then FAQ, then the top chunk, else 503."""
     start_time = time.time()
-    
-    # Detect and translate user's language
-    user_message = request.message
-    detected_lang, lang_confidence = translation_service.detect_language(user_message)
-    user_lang = detected_lang
-    print(f"🌍 Detected language: {user_lang} (confidence: {lang_confidence:.2f})")
-    
-    # Translate to English for processing if needed
+    notes = f"Degraded response ({reason})"
+    log.warning("load_shed", reason=reason, **admission.snapshot())
+
+    # Look up the same English question the main path caches and matches under.
+    # Once the deadline has passed the caller has given up; do no more remote work.
+    user_lang, question = 'en', request.message
+    if has_budget(0.05):
+        user_lang, question = await asyncio.to_thread(_detect_and_translate, request.message, StageTimer())
+
+    cached_response = cache.get(question, language=user_lang)
+    if cached_response:
+        rendered_language = cached_response.pop('rendered_language', None)
+        if rendered_language != user_lang:
+            cached_response['answer_text'] = await _degraded_rendering(cached_response['answer_text'], user_lang)
+        admission.record_degraded("cache")
+        cached_response['latency_ms'] = int((time.time() - start_time) * 1000)
+        cached_response['session_id'] = request.session_id
+        cached_response['notes'] = notes
+        return AnswerEnvelope(**cached_response)
+
+    faq_match = await asyncio.to_thread(faq_answer_service.find_best_match, question, language=user_lang)
+    if faq_match:
+        outcome = _faq_outcome(faq_match)
+    else:
+        rag_results = []
+        if has_budget(0.05):
+            try:
+                rag_results = await asyncio.wait_for(
+                    rag_client.search(question, k=1),
+                    timeout=timeout_for(admission_settings["degraded_retrieval_timeout_s"]),
+                )
+            except asyncio.TimeoutError:
+                pass
+        if not rag_results:
+            admission.record_unavailable()
+            raise HTTPException(
+                status_code=503,
+                detail="Chat service is overloaded, please retry shortly",
+                headers={"Retry-After": str(admission_settings["retry_after_s"])},
+            )
+        outcome = _chunk_fallback_outcome(rag_results, _citations_for(rag_results))
+
+    admission.record_degraded(outcome['provider'])
+    return AnswerEnvelope(
+        answer_text=await _degraded_rendering(outcome['answer_text'], user_lang),
+        citations=outcome['citations'],
+        confidence=outcome['confidence'],
+        model_id=outcome['model_id'],
+        provider=outcome['provider'],
+        latency_ms=int((time.time() - start_time) * 1000),
+        notes=notes,
+        session_id=request.session_id,
+    )
+
+
+async def _degraded_rendering(english_answer: str, user_lang: str) -> str:
+    """``english_answer`` in the user's language, left in English when there is no budget to translate."""
+    if user_lang == 'en' or not has_budget(0.05):
+        return english_answer
+    translation_result = await asyncio.to_thread(
+        translation_service.translate, text=english_answer, target_lang=user_lang, source_lang='en'
+    )
+    return translation_result['translated_text']
+
+
+def _detect_and_translate(user_message: str, timer: StageTimer) -> Tuple[str, str]:
+    """The user's language and the question to look up: in English, unless retrieval is multilingual."""
+    with timer.stage("language_detection"):
+        user_lang, lang_confidence = translation_service.detect_language(user_message)
+    log.debug("language_detected", language=user_lang, confidence=round(lang_confidence, 2), sample_rate=0.1)
+
     translated_question = user_message
-    if user_lang != 'en':
-        translation_result = translation_service.translate(
-            text=user_message,
-            target_lang='en',
-            source_lang=user_lang
-        )
+    if user_lang != 'en' and not multilingual_retrieval:
+        with timer.stage("translation"):
+            translation_result = translation_service.translate(
+                text=user_message,
+                target_lang='en',
+                source_lang=user_lang
+            )
         translated_question = translation_result['translated_text']
-        print(f"🔄 Translated to English: {translated_question[:80]}...")
+        log.debug("question_translated", source_lang=user_lang)
+    return user_lang, translated_question
+
+
+async def _handle_chat(request: ChatRequest, prefetched: Optional[Dict[str, Any]] = None) -> AnswerEnvelope:
+    """Run one message through the pipeline.
+
+    ``prefetched`` carries work already done in bulk by /chat/batch: the
+    detected ``language``, the ``translated_question`` and optionally the
+    ``rag_results`` for it.
+    """
+    start_time = time.time()
+    timer = StageTimer()
+    user_message = request.message
     
-    # Create or retrieve session
-    if not request.session_id:
-        request.session_id = memory.create_session(client_id="anonymous")
+    if prefetched:
+        user_lang = prefetched['language']
+        translated_question = prefetched['translated_question']
+    else:
+        user_lang, translated_question = _detect_and_translate(user_message, timer)
+
+    # Greetings, thanks and "talk to a human" need neither retrieval nor the LLM
+    with timer.stage("intent"):
+        intent_match = intent_classifier.classify(translated_question)
+    if intent_match:
+        return _answer_intent(request, intent_match, user_lang, timer, start_time)
     
-    # Check cache first (only for non-conversational queries to avoid stale context)
-    conversation_history = memory.get_conversation_history(request.session_id, limit=1)
+    # Create or retrieve session
+    context_window = _cache_context_window()
+    with timer.stage("memory"):
+        if not request.session_id:
+            request.session_id = memory.create_session(client_id="anonymous")
+        
+        # Follow-up turns are cached under the recent conversation window so that
+        # identical multi-turn patterns do not each need an LLM call
+        conversation_history = memory.get_conversation_history(request.session_id, limit=max(context_window, 1))
     is_first_message = len(conversation_history) == 0
+    cacheable = is_first_message or context_window > 0
+    cache_context_hash = ""
+    if not is_first_message and context_window > 0:
+        cache_context_hash = cache.build_context_hash(conversation_history[-context_window:])
     
-    if is_first_message:
+    if cacheable:
         # Use English version for cache lookup
-        cached_response = cache.get(translated_question)
+        with timer.stage("cache_lookup"):
+            cached_response = cache.get(translated_question, context_hash=cache_context_hash, language=user_lang)
         if cached_response:
-            print(f"✅ Cache HIT for query: {translated_question[:50]}...")
+            rendered_language = cached_response.pop('rendered_language', None)
+            log.info("cache_lookup", hit=True, follow_up=bool(cache_context_hash), rendered=rendered_language == user_lang, sample_rate=0.1)
             
-            # Translate cached response back to user's language if needed
-            answer_text = cached_response['answer_text']
-            if user_lang != 'en':
-                translation_result = translation_service.translate(
-                    text=answer_text,
-                    target_lang=user_lang,
-                    source_lang='en'
-                )
+            # Translate once per language; later hits are served from the stored rendering
+            if rendered_language != user_lang:
+                english_answer = cached_response['answer_text']
+                with timer.stage("translation"):
+                    translation_result = translation_service.translate(
+                        text=english_answer,
+                        target_lang=user_lang,
+                        source_lang='en'
+                    )
                 cached_response['answer_text'] = translation_result['translated_text']
-                print(f"🔄 Translated cached response to {user_lang}")
+                if _is_real_translation(translation_result):
+                    cache.set_translation(
+                        translated_question,
+                        user_lang,
+                        cached_response['answer_text'],
+                        source_text=english_answer,
+                        context_hash=cache_context_hash,
+                    )
             
             end_time = time.time()
             cached_response['latency_ms'] = int((end_time - start_time) * 1000)
             cached_response['session_id'] = request.session_id
             cached_response['notes'] = f"Cached response (accessed {cached_response.get('access_count', 0)} times)"
-            return AnswerEnvelope(**cached_response)
-        else:
-            print(f"❌ Cache MISS for query: {translated_question[:50]}...")
+
+            # Keep the session history complete so later turns see this exchange
+            with timer.stage("memory"):
+                memory.add_message(
+                    session_id=request.session_id,
+                    role="user",
+                    content=user_message,
+                    metadata={"language": user_lang, "cache_hit": True}
+                )
+                memory.add_message(
+                    session_id=request.session_id,
+                    role="assistant",
+                    content=cached_response['answer_text'],
+                    confidence=cached_response.get('confidence'),
+                    metadata={"provider": cached_response.get('provider'), "language": user_lang, "cache_hit": True}
+                )
+            return _finalize_timing(AnswerEnvelope(**cached_response), timer, request)
+        log.info("cache_lookup", hit=False, follow_up=bool(cache_context_hash), sample_rate=0.1)
     else:
-        print(f"⏭️  Skipping cache (conversational context)")
+        log.debug("cache_skipped", reason="conversational_context")
     
     # 0. Redact PII from Input Log (in a real app, we'd log the redacted version)
     redacted_message = redactor.redact(user_message)
-    print(f"Processing query [{request.session_id}]: {redacted_message}") # Log redacted
+    log.debug("processing_query", session_id=request.session_id, query=redacted_message)  # Log redacted
     
     # Analyze sentiment (on original user message)
-    sentiment_result = sentiment_analyzer.analyze(user_message)
-    print(f"Sentiment: {sentiment_result['sentiment']} (score: {sentiment_result['score']:.2f})")
+    with timer.stage("sentiment"):
+        sentiment_result = sentiment_analyzer.analyze(user_message)
+    log.debug("sentiment_analyzed", sentiment=sentiment_result['sentiment'], score=round(sentiment_result['score'], 2), sample_rate=0.1)
     
     if sentiment_result['needs_escalation']:
-        print(f"⚠️  ESCALATION NEEDED - Flags: {', '.join(sentiment_result['flags'])}")
+        log.warning("escalation_needed", session_id=request.session_id, flags=sentiment_result['flags'])
     
     if sentiment_result['is_urgent']:
-        print(f"⏰ URGENT request detected")
+        log.info("urgent_request", session_id=request.session_id)
     
     # Get conversation context for better follow-up handling
-    conversation_context = memory.get_conversation_context(request.session_id)
+    with timer.stage("memory"):
+        conversation_turns = memory.get_conversation_history(request.session_id, limit=5)
 
-    # Store user message in memory with sentiment and language info
-    memory.add_message(
-        session_id=request.session_id,
-        role="user",
-        content=user_message,
-        metadata={
-            "sentiment": sentiment_result['sentiment'],
-            "sentiment_score": sentiment_result['score'],
-            "needs_escalation": sentiment_result['needs_escalation'],
-            "flags": sentiment_result['flags'],
-            "language": user_lang,
-            "translated_to_english": user_lang != 'en'
-        }
-    )
+        # Store user message in memory with sentiment and language info
+        memory.add_message(
+            session_id=request.session_id,
+            role="user",
+            content=user_message,
+            metadata={
+                "sentiment": sentiment_result['sentiment'],
+                "sentiment_score": sentiment_result['score'],
+                "needs_escalation": sentiment_result['needs_escalation'],
+                "flags": sentiment_result['flags'],
+                "language": user_lang,
+                "translated_to_english": user_lang != 'en'
+            }
+        )
 
-    # 1. Attempt curated FAQ answer before invoking the LLM stack
-    faq_match = faq_answer_service.find_best_match(translated_question)
-    if faq_match:
-        faq_record = faq_match['faq']
-        answer_text_en = faq_record['answer']
-        answer_text = answer_text_en
-        if user_lang != 'en':
+    tone_guidance = sentiment_analyzer.get_response_tone(sentiment_result)
+    prefetched_rag = prefetched.get('rag_results') if prefetched else None
+    system_instruction = _build_system_instruction(tone_guidance, question_language=user_lang)
+    # Upset customers get a generated, empathetic answer rather than a verbatim FAQ entry
+    allow_extractive = not sentiment_result['needs_escalation']
+
+    # Identical first-turn questions in flight at the same time share one
+    # FAQ/RAG/LLM run instead of each paying for their own
+    shared = False
+    if is_first_message:
+        # Everything the shared run depends on besides the question: the reply
+        # language shapes the system instruction, and extractive answers may be off
+        flight_key = f"{tone_guidance}:{user_lang}:{int(allow_extractive)}:{normalize_key(translated_question)}"
+        wait_start = time.perf_counter()
+
+        async def resolve_and_cache() -> Dict[str, Any]:
+            resolved = await _resolve_answer(translated_question, conversation_turns, system_instruction, timer, prefetched_rag, allow_extractive, user_lang)
+            # Cached inside the shared run, so the answer is kept even if the originator's client has gone
+            _cache_outcome(translated_question, cache_context_hash, resolved, sentiment_result)
+            return resolved
+
+        outcome, shared = await answer_flights.do(flight_key, resolve_and_cache)
+        if shared:
+            timer.add("coalesced_wait", (time.perf_counter() - wait_start) * 1000)
+    else:
+        outcome = await _resolve_answer(translated_question, conversation_turns, system_instruction, timer, prefetched_rag, allow_extractive, user_lang)
+
+    kind = outcome['kind']
+    citations = outcome['citations']
+    built_prompt = outcome.get('prompt')
+
+    # Translate answer back to user's language if needed
+    answer_text = outcome['answer_text']
+    cached_renderings = {}
+    if kind != "llm_failure" and user_lang != 'en':
+        with timer.stage("translation"):
             translation_result = translation_service.translate(
-                text=answer_text_en,
+                text=answer_text,
                 target_lang=user_lang,
                 source_lang='en'
             )
-            answer_text = translation_result['translated_text']
-
-        latency_ms = int((time.time() - start_time) * 1000)
-        faq_citation = Citation(
-            doc_id=f"faq:{faq_record['id']}",
-            title=faq_record['question'],
-            section=faq_record.get('category') or 'FAQ',
-            score=round(1.0 - faq_match['score'], 4)
+        answer_text = translation_result['translated_text']
+        if _is_real_translation(translation_result):
+            cached_renderings[user_lang] = answer_text
+
+    notes = outcome.get('notes')
+    if shared:
+        notes = f"{notes} (coalesced with an identical in-flight request)" if notes else "Coalesced with an identical in-flight request"
+
+    latency_ms = int((time.time() - start_time) * 1000)
+    if kind == "llm_failure":
+        response_envelope = AnswerEnvelope(
+            answer_text=answer_text,
+            citations=citations,
+            confidence=outcome['confidence'],
+            model_id=outcome['model_id'],
+            provider=outcome['provider'],
+            latency_ms=latency_ms,
+            notes=notes
         )
-        faq_confidence = max(0.75, faq_match['score'])
+    else:
         response_envelope = AnswerEnvelope(
             answer_text=answer_text,
-            citations=[faq_citation],
-            confidence=faq_confidence,
-            model_id="faq-direct",
-            provider="faq",
+            citations=citations,
+            confidence=outcome['confidence'],
+            model_id=outcome['model_id'],
+            provider=outcome['provider'],
             latency_ms=latency_ms,
-            notes="Answered via curated FAQ",
+            notes=notes,
             sentiment=sentiment_result,
-            session_id=request.session_id
+            session_id=request.session_id,
+            prompt_tokens=built_prompt.prompt_tokens if built_prompt else None
         )
 
-        memory.add_message(
-            session_id=request.session_id,
-            role="assistant",
-            content=response_envelope.answer_text,
-            confidence=response_envelope.confidence,
-            metadata={
-                "provider": "faq",
-                "language": user_lang,
-                "faq_id": faq_record['id']
+    with timer.stage("persistence"):
+        if kind != "llm_failure":
+            # Store assistant response in memory (translated version)
+            assistant_metadata = {
+                "provider": response_envelope.provider,
+                "language": user_lang
             }
-        )
+            if outcome.get('faq_id'):
+                assistant_metadata["faq_id"] = outcome['faq_id']
+            memory.add_message(
+                session_id=request.session_id,
+                role="assistant",
+                content=response_envelope.answer_text,
+                confidence=response_envelope.confidence,
+                metadata=assistant_metadata
+            )
 
-        if is_first_message:
-            cache.set(
-                query=translated_question,
-                response_data={
-                    "answer_text": answer_text_en,
-                    "citations": [faq_citation.dict()],
-                    "confidence": faq_confidence,
-                    "model_id": "faq-direct",
-                    "provider": "faq",
-                    "sentiment": sentiment_result
-                },
-                metadata={
-                    "created_at": time.time(),
-                    "source": "faq"
-                }
+        if kind == "llm":
+            # Analyze response for knowledge gaps (using English versions)
+            gap_analyzer.analyze_response(
+                question=translated_question,
+                answer=outcome['answer_text'],  # English answer
+                confidence=1.0,
+                citations=citations
             )
 
+        # Cache the English version, keyed on the conversation window for follow-ups.
+        # First turns were cached by their shared run; only this request's rendering is added.
+        if kind != "llm_failure" and cacheable:
+            if is_first_message:
+                for language, rendering in cached_renderings.items():
+                    cache.set_translation(
+                        translated_question,
+                        language,
+                        rendering,
+                        source_text=outcome['answer_text'],
+                        context_hash=cache_context_hash,
+                    )
+            else:
+                _cache_outcome(translated_question, cache_context_hash, outcome, sentiment_result, cached_renderings)
+
+        if kind != "faq":
+            unanswered_note = None
+            if kind == "llm_failure":
+                unanswered_note = "llm_failure"
+            elif response_envelope.confidence <= 0.4:
+                unanswered_note = "low_confidence_llm"
+            elif not citations:
+                unanswered_note = "no_citations"
+
+            if unanswered_note:
+                gap_analyzer.record_unanswered_question(
+                    question=translated_question,
+                    confidence=response_envelope.confidence,
+                    notes=unanswered_note
+                )
+
+        # Log the interaction
         interaction_logger.log_interaction(
             query=redacted_message,
             answer=response_envelope.answer_text,
@@ -233,182 +555,468 @@ async def chat(request: ChatRequest):
             citations=response_envelope.citations
         )
 
-        return response_envelope
+    debug_extra = {}
+    if built_prompt:
+        debug_extra["prompt"] = built_prompt.report()
+    if outcome.get('extractive'):
+        debug_extra["extractive"] = outcome['extractive']
+    if outcome.get('cascade'):
+        debug_extra["cascade"] = outcome['cascade']
+    return _finalize_timing(response_envelope, timer, request, debug_extra)
 
-    # 2. Retrieve Context (use English version for RAG)
-    confidence_threshold = _get_confidence_threshold()
-    rag_results = await rag_client.search(translated_question, k=config['rag']['retrieval_k'])
-    filtered_results = [res for res in rag_results if res.get('score') is not None and res['score'] <= confidence_threshold]
-    if filtered_results:
-        rag_results = filtered_results
-    elif rag_results:
-        print(f"⚠️  No RAG chunks met confidence threshold ({confidence_threshold}); using best available results.")
-    
-    # Format context for LLM
-    context_text = ""
-    citations = []
-    
-    # Simple confidence check based on distance (lower is better for L2, but let's assume we normalize or use threshold)
-    # For this prototype, we'll just take the top results.
-    # In a real L2 index, distance can be > 1. Let's assume we trust the retrieval for now.
-    
-    for res in rag_results:
-        chunk = res['chunk']
-        score = res['score']
-        context_text += f"Source (ID: {chunk['metadata']['id']}): {chunk['text']}\n\n"
-        citations.append(Citation(
-            doc_id=chunk['metadata']['id'],
-            title=chunk['metadata']['title'],
-            section=chunk['metadata']['section'],
-            score=score
-        ))
 
-    top_score = rag_results[0]['score'] if rag_results else None
-    response_confidence = _calculate_response_confidence(top_score, confidence_threshold)
+def _cache_outcome(
+    translated_question: str,
+    context_hash: str,
+    outcome: Dict[str, Any],
+    sentiment_result: Dict[str, Any],
+    translations: Optional[Dict[str, str]] = None,
+) -> None:
+    """Store the English answer of ``outcome`` (nothing for an LLM failure)."""
+    kind = outcome['kind']
+    if kind == "llm_failure":
+        return
+    cache_metadata = {"created_at": time.time()}
+    if kind in ("faq", "extractive"):
+        cache_metadata["source"] = kind
+    else:
+        cache_metadata["sentiment"] = sentiment_result['sentiment']
+    cache.set(
+        query=translated_question,
+        context_hash=context_hash,
+        response_data={
+            "answer_text": outcome['answer_text'],
+            "citations": [c.dict() for c in outcome['citations']],
+            "confidence": outcome['confidence'],
+            "model_id": outcome['model_id'],
+            "provider": outcome['provider'],
+            "sentiment": sentiment_result
+        },
+        metadata=cache_metadata,
+        translations=translations or {}
+    )
+    log.debug("response_cached", follow_up=bool(context_hash))
+
+
+def _is_real_translation(translation_result: Dict[str, Any]) -> bool:
+    """Whether a translation is worth keeping in the response cache (not the untranslated or error fallback)."""
+    return translation_result.get('method') not in (None, 'none', 'error')
+
+
+def _answer_intent(
+    request: ChatRequest,
+    match: IntentMatch,
+    user_lang: str,
+    timer: StageTimer,
+    start_time: float,
+) -> AnswerEnvelope:
+    """Reply to a classified intent from its template; handoff requests are flagged for an agent."""
+    answer_text = match.response
+    if user_lang != 'en':
+        with timer.stage("translation"):
+            answer_text = translation_service.translate(
+                text=answer_text,
+                target_lang=user_lang,
+                source_lang='en'
+            )['translated_text']
 
-    # 2. Construct Prompt with conversation context
+    with timer.stage("memory"):
+        if not request.session_id:
+            request.session_id = memory.create_session(client_id="anonymous")
+        memory.add_message(
+            session_id=request.session_id,
+            role="user",
+            content=request.message,
+            metadata={
+                "intent": match.intent,
+                "needs_escalation": match.escalate,
+                "flags": ["human_requested"] if match.escalate else [],
+                "language": user_lang,
+            }
+        )
+        memory.add_message(
+            session_id=request.session_id,
+            role="assistant",
+            content=answer_text,
+            confidence=1.0,
+            metadata={"provider": "intent", "intent": match.intent, "language": user_lang}
+        )
+
+    if match.escalate:
+        log.warning("escalation_needed", session_id=request.session_id, flags=["human_requested"])
+    log.info("intent_short_circuit", intent=match.intent, sample_rate=0.1)
+
+    response_envelope = AnswerEnvelope(
+        answer_text=answer_text,
+        citations=[],
+        confidence=1.0,
+        model_id="intent",
+        provider="intent",
+        latency_ms=int((time.time() - start_time) * 1000),
+        notes=f"Intent: {match.intent}" + (" (escalated to a human agent)" if match.escalate else ""),
+        session_id=request.session_id,
+    )
+    interaction_logger.log_interaction(
+        query=redactor.redact(request.message),
+        answer=response_envelope.answer_text,
+        provider=response_envelope.provider,
+        latency_ms=response_envelope.latency_ms,
+        confidence=response_envelope.confidence,
+        citations=[]
+    )
+    return _finalize_timing(response_envelope, timer, request, {"intent": match.report()})
+
+
+def _build_system_instruction(tone_guidance: str, question_language: str = 'en') -> str:
     system_instruction = """You are a helpful customer service AI. 
     Answer the user's question strictly based on the provided context. 
     If the answer is not in the context, say "I don't have enough information to answer that."
     Do not hallucinate or make up facts.
     If the user is asking a follow-up question, use the previous conversation context to understand what they're referring to.
     """
+    if question_language != 'en' and multilingual_retrieval:
+        # Answers are cached and post-processed in English, then translated for the user
+        system_instruction += "\nThe question may be written in another language. Always write your answer in English."
     
     # Adjust tone based on sentiment
-    tone_guidance = sentiment_analyzer.get_response_tone(sentiment_result)
     if tone_guidance == 'apologetic_professional':
         system_instruction += "\nIMPORTANT: The customer is upset. Be apologetic, professional, and offer immediate assistance."
     elif tone_guidance == 'empathetic_supportive':
         system_instruction += "\nIMPORTANT: The customer is frustrated. Show empathy and understanding."
     elif tone_guidance == 'prompt_helpful':
         system_instruction += "\nIMPORTANT: This is urgent. Provide quick, clear, and actionable answers."
-    
-    # Include conversation history if available
-    full_prompt = ""
-    if conversation_context:
-        full_prompt += f"{conversation_context}\n\n"
-    
-    full_prompt += f"Context:\n{context_text}\n\nUser Question: {translated_question}"
+    return system_instruction
+
+
+async def _resolve_answer(
+    translated_question: str,
+    conversation_turns: List[Dict[str, Any]],
+    system_instruction: str,
+    timer: StageTimer,
+    prefetched_rag: Optional[List[Dict[str, Any]]] = None,
+    allow_extractive: bool = True,
+    language: str = 'en',
+) -> Dict[str, Any]:
+    """Produce the English answer: curated FAQ first, then retrieval plus LLM generation.
+
+    The result depends only on the arguments, which is what lets identical
+    in-flight questions share it.
+    """
+    # 1. Attempt curated FAQ answer before invoking the LLM stack. Retrieval is
+    # started speculatively so a FAQ miss does not pay both latencies in series.
+    retrieval_k = config['rag']['retrieval_k']
+    speculative_rag = None
+    if prefetched_rag is None and _speculative_rag_enabled():
+        speculative_rag = SpeculativeTask(rag_client.search(translated_question, k=retrieval_k), speculation_stats)
+    try:
+        with timer.stage("faq_match"):
+            faq_match = await asyncio.to_thread(faq_answer_service.find_best_match, translated_question, language=language)
+        if faq_match:
+            return _faq_outcome(faq_match)
 
-    # 3. Generate Answer with Fallback
-    generation_result = await llm_router.generate_answer(full_prompt, system_instruction)
+        # 2. Retrieve Context (English question, or the original with multilingual retrieval)
+        confidence_threshold = _get_confidence_threshold()
+        with timer.stage("retrieval"):
+            if prefetched_rag is not None:
+                rag_results = prefetched_rag
+            elif speculative_rag:
+                rag_results = await speculative_rag.result()
+            else:
+                rag_results = await rag_client.search(translated_question, k=retrieval_k)
+    finally:
+        # A FAQ hit, a failed lookup or a cancelled request must not leave the search running
+        if speculative_rag:
+            speculative_rag.cancel()
+
+    # 3. Extractive fast path: a near-exact, self-contained FAQ chunk is the answer
+    extractive = extractive_answerer.evaluate(rag_results, has_history=bool(conversation_turns), allowed=allow_extractive)
+    if extractive.accepted:
+        log.info("extractive_answer", doc_id=extractive.details.get("doc_id"), score=extractive.details.get("score"))
+        return {
+            "kind": "extractive",
+            "answer_text": extractive.answer_text,
+            "citations": _citations_for([extractive.result]),
+            "confidence": _calculate_response_confidence(extractive.result['score'], confidence_threshold),
+            "model_id": "extractive",
+            "provider": "extractive",
+            "notes": "Answered verbatim from the knowledge base",
+            "extractive": extractive.report(),
+        }
+
+    filtered_results = [res for res in rag_results if res.get('score') is not None and res['score'] <= confidence_threshold]
+    if filtered_results:
+        rag_results = filtered_results
+    elif rag_results:
+        log.info("rag_below_threshold", threshold=confidence_threshold, best_score=rag_results[0].get('score'))
     
-    end_time = time.time()
-    latency_ms = int((end_time - start_time) * 1000)
+    top_score = rag_results[0]['score'] if rag_results else None
+    response_confidence = _calculate_response_confidence(top_score, confidence_threshold)
 
-    response_envelope = None
+    # Fit history and retrieved chunks into the provider's prompt budget
+    with timer.stage("prompt"):
+        built_prompt = prompt_builder.build(
+            question=translated_question,
+            system_instruction=system_instruction,
+            history=conversation_turns,
+            rag_results=rag_results,
+            budget_tokens=llm_router.prompt_token_budget(),
+        )
+    # Only cite the chunks that actually made it into the prompt
+    rag_results = built_prompt.rag_results
+    citations = _citations_for(rag_results)
 
-    unanswered_note = None
+    # 4. Generate Answer with Fallback
+    with timer.stage("llm"):
+        generation_result = await llm_router.generate_answer(
+            built_prompt.prompt,
+            system_instruction,
+            retrieval_confidence=response_confidence,
+        )
 
     if generation_result['success']:
-        # Translate answer back to user's language if needed
-        answer_text = generation_result['answer']
-        if user_lang != 'en':
-            translation_result = translation_service.translate(
-                text=answer_text,
-                target_lang=user_lang,
-                source_lang='en'
-            )
-            answer_text = translation_result['translated_text']
-            print(f"🔄 Translated answer to {user_lang}")
-        
-        response_envelope = AnswerEnvelope(
-            answer_text=answer_text,
-            citations=citations,
-            confidence=response_confidence,
-            model_id="unknown",
-            provider=generation_result['provider'],
-            latency_ms=latency_ms,
-            sentiment=sentiment_result,
-            session_id=request.session_id
+        notes = None
+        if generation_result.get('escalation'):
+            notes = f"Escalated to the {generation_result['tier']} model tier ({generation_result['escalation']})"
+        return {
+            "kind": "llm",
+            "answer_text": generation_result['answer'],
+            "citations": citations,
+            "confidence": response_confidence,
+            "model_id": generation_result.get('model') or "unknown",
+            "provider": generation_result['provider'],
+            "notes": notes,
+            "prompt": built_prompt,
+            "extractive": extractive.report(),
+            "cascade": {
+                "tier": generation_result.get('tier'),
+                "escalation": generation_result.get('escalation'),
+                "hedged": bool(generation_result.get('hedged')),
+            },
+        }
+
+    # Fallback if all LLMs fail
+    if rag_results:
+        return {**_chunk_fallback_outcome(rag_results, citations), "prompt": built_prompt}
+    return {
+        "kind": "llm_failure",
+        "answer_text": "I'm sorry, I'm currently unavailable and couldn't find relevant information.",
+        "citations": [],
+        "confidence": 0.0,
+        "model_id": "none",
+        "provider": "none",
+        "prompt": built_prompt,
+    }
+
+def _faq_outcome(faq_match: Dict[str, Any]) -> Dict[str, Any]:
+    faq_record = faq_match['faq']
+    faq_citation = Citation(
+        doc_id=f"faq:{faq_record['id']}",
+        title=faq_record['question'],
+        section=faq_record.get('category') or 'FAQ',
+        score=round(1.0 - faq_match['score'], 4)
+    )
+    return {
+        "kind": "faq",
+        "answer_text": faq_record['answer'],
+        "citations": [faq_citation],
+        "confidence": max(0.75, faq_match['score']),
+        "model_id": "faq-direct",
+        "provider": "faq",
+        "notes": "Answered via curated FAQ",
+        "faq_id": faq_record['id'],
+    }
+
+
+def _chunk_fallback_outcome(rag_results: List[Dict[str, Any]], citations: List[Citation]) -> Dict[str, Any]:
+    """Rule-based answer quoting the best retrieved chunk."""
+    top_chunk = rag_results[0]['chunk']
+    return {
+        "kind": "llm_failure",
+        "answer_text": f"I'm currently experiencing high traffic, but here is some information that might help:\n\n{top_chunk['text']}",
+        "citations": citations,
+        "confidence": 0.5,
+        "model_id": "rule-based",
+        "provider": "fallback-rule",
+        "notes": "LLM generation failed, returned raw chunk.",
+    }
+
+
+def _citations_for(rag_results: List[Dict[str, Any]]) -> List[Citation]:
+    return [
+        Citation(
+            doc_id=res['chunk']['metadata']['id'],
+            title=res['chunk']['metadata']['title'],
+            section=res['chunk']['metadata']['section'],
+            score=res['score']
         )
-        
-        # Store assistant response in memory (translated version)
-        memory.add_message(
-            session_id=request.session_id,
-            role="assistant",
-            content=response_envelope.answer_text,  # Use the translated answer from envelope
-            confidence=response_envelope.confidence,
-            metadata={
-                "provider": generation_result['provider'],
-                "language": user_lang
-            }
+        for res in rag_results
+    ]
+
+
+def _batch_settings() -> Dict[str, Any]:
+    batch_config = config.get('chat', {}).get('batch', {}) or {}
+    return {
+        "max_items": int(batch_config.get('max_items', 100)),
+        "max_concurrency": int(batch_config.get('max_concurrency', 8)),
+        "prefetch_retrieval": bool(batch_config.get('prefetch_retrieval', True)),
+    }
+
+
+async def _prefetch_batch(messages: List[ChatRequest], prefetch_retrieval: bool) -> List[Dict[str, Any]]:
+    """Detect languages, translate per language pair and retrieve context for a whole batch at once."""
+    prefetched = []
+    by_language: Dict[str, List[int]] = defaultdict(list)
+    for index, message in enumerate(messages):
+        language, _ = translation_service.detect_language(message.message)
+        prefetched.append({"language": language, "translated_question": message.message})
+        if language != 'en' and not multilingual_retrieval:
+            by_language[language].append(index)
+
+    for language, indices in by_language.items():
+        translations = await asyncio.to_thread(
+            translation_service.translate_batch,
+            [messages[index].message for index in indices],
+            'en',
+            language,
         )
-        
-        # Analyze response for knowledge gaps (using English versions)
-        gap_analyzer.analyze_response(
-            question=translated_question,
-            answer=generation_result['answer'],  # English answer
-            confidence=1.0,
-            citations=citations
+        for index, translation in zip(indices, translations):
+            prefetched[index]["translated_question"] = translation['translated_text']
+
+    if prefetch_retrieval:
+        rag_batches = await rag_client.search_batch(
+            [item["translated_question"] for item in prefetched],
+            k=config['rag']['retrieval_k'],
         )
-        
-        # Cache the response (only if first message in session, cache English version)
-        if is_first_message:
-            cache.set(
-                query=translated_question,
-                response_data={
-                    "answer_text": generation_result['answer'],  # Cache English version
-                    "citations": [c.dict() for c in response_envelope.citations],
-                    "confidence": response_envelope.confidence,
-                    "model_id": response_envelope.model_id,
-                    "provider": response_envelope.provider,
-                    "sentiment": sentiment_result
-                },
-                metadata={
-                    "created_at": time.time(),
-                    "sentiment": sentiment_result['sentiment']
-                }
-            )
-            print(f"💾 Cached response for future use")
-    else:
-        # Fallback if all LLMs fail
-        if rag_results:
-            top_chunk = rag_results[0]['chunk']
-            response_envelope = AnswerEnvelope(
-                answer_text=f"I'm currently experiencing high traffic, but here is some information that might help:\n\n{top_chunk['text']}",
-                citations=citations,
-                confidence=0.5,
-                model_id="rule-based",
-                provider="fallback-rule",
-                latency_ms=latency_ms,
-                notes="LLM generation failed, returned raw chunk."
-            )
-        else:
-             response_envelope = AnswerEnvelope(
-                answer_text="I'm sorry, I'm currently unavailable and couldn't find relevant information.",
-                citations=[],
-                confidence=0.0,
-                model_id="none",
-                provider="none",
-                latency_ms=latency_ms
-            )
-        unanswered_note = "llm_failure"
+        for item, rag_results in zip(prefetched, rag_batches):
+            item["rag_results"] = rag_results
+    return prefetched
 
-    if response_envelope and not unanswered_note:
-        if response_envelope.confidence <= 0.4:
-            unanswered_note = "low_confidence_llm"
-        elif not citations:
-            unanswered_note = "no_citations"
 
-    if response_envelope and unanswered_note:
-        gap_analyzer.record_unanswered_question(
-            question=translated_question,
-            confidence=response_envelope.confidence,
-            notes=unanswered_note
-        )
-            
-    # Log the interaction
-    interaction_logger.log_interaction(
-        query=redacted_message,
-        answer=response_envelope.answer_text,
-        provider=response_envelope.provider,
-        latency_ms=response_envelope.latency_ms,
-        confidence=response_envelope.confidence,
-        citations=response_envelope.citations
-    )
-    
-    return response_envelope
+async def _run_batch(batch: BatchChatRequest):
+    """Yield ``BatchItemResult``s as items complete, with bounded concurrency."""
+    settings = _batch_settings()
+    concurrency = max(1, min(batch.max_concurrency or settings["max_concurrency"], settings["max_concurrency"]))
+    semaphore = asyncio.Semaphore(concurrency)
+    prefetched = await _prefetch_batch(batch.messages, settings["prefetch_retrieval"])
+
+    async def run_item(index: int) -> BatchItemResult:
+        async with semaphore:
+            try:
+                # Offline work: the LLM call may wait briefly to share a batch with other items
+                with batch_generation():
+                    envelope = await _admitted_chat(batch.messages[index], prefetched[index])
+                return BatchItemResult(index=index, response=envelope)
+            except Exception as exc:
+                log.exception("batch_item_failed", index=index)
+                return BatchItemResult(index=index, error=str(exc))
+
+    tasks = [asyncio.ensure_future(run_item(index)) for index in range(len(batch.messages))]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(batch: BatchChatRequest):
+    """Answer many messages in one call, for email backlogs and offline evaluation.
+
+    Results come back in request order, or as NDJSON lines in completion
+    order when ``stream`` is set.
+    """
+    max_items = _batch_settings()["max_items"]
+    if not batch.messages:
+        raise HTTPException(status_code=400, detail="messages must not be empty")
+    if len(batch.messages) > max_items:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {max_items} messages")
+
+    if batch.stream:
+        async def ndjson_lines():
+            async for item in _run_batch(batch):
+                yield item.json(exclude_none=True) + "\n"
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    start_time = time.time()
+    results = [item async for item in _run_batch(batch)]
+    results.sort(key=lambda item: item.index)
+    return BatchChatResponse(results=results, latency_ms=int((time.time() - start_time) * 1000))
+
+
+@app.get("/metrics/speculation")
+async def speculation_metrics():
+    """Saved versus wasted work from speculative retrieval."""
+    return speculation_stats.snapshot()
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Response cache hit rates for first-turn and follow-up questions."""
+    return cache.get_hit_rates()
+
+@app.get("/metrics/coalescing")
+async def coalescing_metrics():
+    """How many identical in-flight questions shared a single computation."""
+    return answer_flights.snapshot()
+
+@app.get("/metrics/latency")
+async def latency_metrics():
+    """Latency histograms per pipeline stage, answer path and LLM provider."""
+    return latency_histograms.snapshot()
+
+@app.get("/metrics/routing")
+async def routing_metrics():
+    """Routing mode, the provider order in use and each provider's live score."""
+    return llm_router.routing_snapshot()
+
+@app.get("/metrics/breakers")
+async def breaker_metrics():
+    """Circuit breaker state per provider: rolling error and slow-call rates and the half-open probe."""
+    return llm_router.breakers_snapshot()
+
+@app.get("/metrics/provider_limits")
+async def provider_limit_metrics():
+    """Per-provider in-flight calls, queue waits and overflows to the next provider."""
+    return llm_router.limits_snapshot()
+
+@app.get("/metrics/batching")
+async def batching_metrics():
+    """Offline LLM calls grouped into batches per batching provider, and the batch sizes reached."""
+    return llm_router.batching_snapshot()
+
+@app.get("/metrics/hedging")
+async def hedging_metrics():
+    """Hedged provider calls fired in this worker and how often the hedge won."""
+    return llm_router.hedging_snapshot()
+
+@app.get("/metrics/cascade")
+async def cascade_metrics():
+    """Answers served per model tier and why requests escalated."""
+    return llm_router.cascade_snapshot()
+
+@app.get("/metrics/intents")
+async def intent_metrics():
+    """Share of messages answered from an intent template without retrieval or the LLM."""
+    return intent_classifier.snapshot()
+
+@app.get("/metrics/extractive")
+async def extractive_metrics():
+    """How often retrieval was returned verbatim and why it was not."""
+    return extractive_answerer.snapshot()
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Active requests, queue depth, rejections and how shed requests were answered."""
+    return admission.snapshot()
+
+@app.get("/metrics/logging")
+async def logging_metrics():
+    """Log queue depth and records dropped because the queue was full."""
+    return get_logging_pipeline().snapshot()
+
+@app.on_event("shutdown")
+async def close_provider_clients():
+    await llm_router.aclose()
 
 @app.get("/health")
 async def health():
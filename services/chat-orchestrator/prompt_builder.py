@@ -0,0 +1,160 @@
+"""Token-budgeted prompt assembly for the chat pipeline.
+
+Keeps the prompt sent to the LLM inside a per-provider token budget: the oldest
+conversation turns are trimmed first, then the lowest-scoring retrieved chunks
+are truncated or dropped.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+DEFAULT_ENCODING = "cl100k_base"
+# Below this many tokens a truncated chunk is more noise than evidence
+MIN_CHUNK_TOKENS = 48
+
+
+@lru_cache(maxsize=4)
+def _load_encoding(name: str):
+    """Load a tiktoken encoding once per process; None when tiktoken is unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+
+class TokenCounter:
+    """Counts tokens with a cached tokenizer, falling back to a ~4 chars/token estimate."""
+
+    def __init__(self, encoding_name: str = DEFAULT_ENCODING, cache_size: int = 4096):
+        self.encoding = _load_encoding(encoding_name)
+        self.method = "tiktoken" if self.encoding is not None else "estimate"
+        # Retrieved chunks and system prompts repeat constantly; memoize their counts.
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return math.ceil(len(text) / 4)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text)[:max_tokens]).rstrip() + " ..."
+        return text[: max_tokens * 4].rstrip() + " ..."
+
+
+@dataclass
+class BuiltPrompt:
+    prompt: str
+    prompt_tokens: int
+    budget_tokens: int
+    rag_results: List[Dict[str, Any]] = field(default_factory=list)
+    history_used: int = 0
+    history_dropped: int = 0
+    chunks_truncated: int = 0
+    chunks_dropped: int = 0
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "budget_tokens": self.budget_tokens,
+            "history_used": self.history_used,
+            "history_dropped": self.history_dropped,
+            "chunks_used": len(self.rag_results),
+            "chunks_truncated": self.chunks_truncated,
+            "chunks_dropped": self.chunks_dropped,
+        }
+
+
+class PromptBuilder:
+    """Assembles history, retrieved context and the question within a token budget."""
+
+    def __init__(self, counter: Optional[TokenCounter] = None):
+        self.counter = counter or TokenCounter()
+
+    @staticmethod
+    def _format_turn(message: Dict[str, Any]) -> str:
+        prefix = "Customer" if message.get("role") == "user" else "Assistant"
+        return f"{prefix}: {message.get('content', '')}"
+
+    @staticmethod
+    def _format_chunk(result: Dict[str, Any], text: Optional[str] = None) -> str:
+        chunk = result["chunk"]
+        return f"Source (ID: {chunk['metadata']['id']}): {text if text is not None else chunk['text']}\n\n"
+
+    def build(
+        self,
+        question: str,
+        system_instruction: str,
+        history: List[Dict[str, Any]],
+        rag_results: List[Dict[str, Any]],
+        budget_tokens: int,
+    ) -> BuiltPrompt:
+        count = self.counter.count
+        question_block = f"User Question: {question}"
+        # The system instruction travels with every provider call, so it counts too.
+        remaining = budget_tokens - count(system_instruction) - count(question_block) - count("Context:\n\n\n")
+
+        # Lower L2 distance is better; the worst chunks are the first to go.
+        ranked = sorted(rag_results, key=lambda res: res.get("score") if res.get("score") is not None else math.inf)
+        chunk_cost = sum(count(self._format_chunk(res)) for res in ranked)
+
+        # History only gets what the full retrieved context leaves over, newest turns first.
+        history_lines: List[str] = []
+        history_budget = remaining - chunk_cost - count("Previous conversation:\n\n")
+        for message in reversed(history):
+            line = self._format_turn(message)
+            line_tokens = count(line + "\n")
+            if line_tokens > history_budget:
+                break
+            history_lines.insert(0, line)
+            history_budget -= line_tokens
+        if history_lines:
+            remaining -= count("Previous conversation:\n" + "\n".join(history_lines) + "\n\n")
+
+        kept: List[Dict[str, Any]] = []
+        context_text = ""
+        truncated = 0
+        for result in ranked:
+            block = self._format_chunk(result)
+            block_tokens = count(block)
+            if block_tokens <= remaining:
+                kept.append(result)
+                context_text += block
+                remaining -= block_tokens
+                continue
+            # Keep at least the best chunk, even if it has to be cut down.
+            overhead = count(self._format_chunk(result, ""))
+            room = remaining - overhead
+            if room >= MIN_CHUNK_TOKENS or not kept:
+                text = self.counter.truncate(result["chunk"]["text"], max(room, MIN_CHUNK_TOKENS))
+                kept.append(result)
+                context_text += self._format_chunk(result, text)
+                truncated += 1
+            break
+
+        prompt = ""
+        if history_lines:
+            prompt += "Previous conversation:\n" + "\n".join(history_lines) + "\n\n"
+        prompt += f"Context:\n{context_text}\n\n{question_block}"
+
+        return BuiltPrompt(
+            prompt=prompt,
+            prompt_tokens=count(prompt) + count(system_instruction),
+            budget_tokens=budget_tokens,
+            rag_results=kept,
+            history_used=len(history_lines),
+            history_dropped=len(history) - len(history_lines),
+            chunks_truncated=truncated,
+            chunks_dropped=len(ranked) - len(kept),
+        )
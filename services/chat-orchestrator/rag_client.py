@@ -1,3 +1,4 @@
+import asyncio
 import httpx
 import os
 import sys
@@ -6,6 +7,10 @@ from typing import List, Dict, Any
 # Add parent directory to path to import shared modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from services.shared.config_utils import load_config
+from services.shared.deadline import has_budget, propagation_headers, timeout_for
+from services.shared.structured_logging import get_logger
+
+log = get_logger("rag_client")
 
 class RAGClient:
     def __init__(self):
@@ -16,18 +21,44 @@ class RAGClient:
         self.base_url = "http://localhost:8001" # Default port for ingestion-indexer
 
     async def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        if not has_budget():
+            log.info("rag_search_skipped", reason="deadline")
+            return []
         async with httpx.AsyncClient() as client:
             try:
                 response = await client.post(
                     f"{self.base_url}/search",
                     json={"query": query, "k": k},
-                    timeout=5.0
+                    headers=propagation_headers(),
+                    timeout=timeout_for(5.0)
                 )
                 response.raise_for_status()
                 data = response.json()
                 return data.get("results", [])
             except Exception as e:
-                print(f"Error calling RAG service: {e}")
+                log.warning("rag_search_failed", error=str(e))
                 # Fallback or re-raise depending on policy. 
                 # For now, return empty list to allow LLM to try without context or fail gracefully.
                 return []
+
+    async def search_batch(self, queries: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+        """Retrieve chunks for many queries in one round-trip (one embedding pass on the indexer)."""
+        if not queries:
+            return []
+        async with httpx.AsyncClient() as client:
+            try:
+                response = await client.post(
+                    f"{self.base_url}/search/batch",
+                    json={"queries": queries, "k": k},
+                    headers=propagation_headers(),
+                    timeout=timeout_for(max(5.0, 0.5 * len(queries)))
+                )
+                response.raise_for_status()
+                results = response.json().get("results", [])
+                if len(results) == len(queries):
+                    return results
+                log.warning("rag_batch_size_mismatch", results=len(results), queries=len(queries))
+            except Exception as e:
+                log.warning("rag_batch_search_failed", queries=len(queries), error=str(e))
+        # Older indexers without /search/batch: fall back to concurrent single searches
+        return list(await asyncio.gather(*(self.search(query, k=k) for query in queries)))
@@ -0,0 +1,94 @@
+"""Speculative execution helpers for the chat pipeline.
+
+Retrieval is started before the curated FAQ lookup finishes so that a FAQ miss
+does not pay both latencies back to back. A FAQ hit cancels the pending search.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from threading import Lock
+from typing import Any, Awaitable, Dict, Optional
+
+
+class SpeculationStats:
+    """In-memory counters describing how much speculative work paid off."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.launched = 0
+        self.reused = 0
+        self.cancelled = 0
+        self.saved_ms = 0.0
+        self.wasted_ms = 0.0
+
+    def record_launch(self) -> None:
+        with self._lock:
+            self.launched += 1
+
+    def record_reuse(self, saved_ms: float) -> None:
+        with self._lock:
+            self.reused += 1
+            self.saved_ms += max(0.0, saved_ms)
+
+    def record_cancel(self, wasted_ms: float) -> None:
+        with self._lock:
+            self.cancelled += 1
+            self.wasted_ms += max(0.0, wasted_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            settled = self.reused + self.cancelled
+            return {
+                "launched": self.launched,
+                "reused": self.reused,
+                "cancelled": self.cancelled,
+                "reuse_rate": round(self.reused / settled, 3) if settled else 0.0,
+                "saved_ms_total": round(self.saved_ms, 2),
+                "wasted_ms_total": round(self.wasted_ms, 2),
+                "avg_saved_ms": round(self.saved_ms / self.reused, 2) if self.reused else 0.0,
+                "avg_wasted_ms": round(self.wasted_ms / self.cancelled, 2) if self.cancelled else 0.0,
+            }
+
+
+class SpeculativeTask:
+    """Wraps a coroutine started ahead of knowing whether its result is needed."""
+
+    def __init__(self, coro: Awaitable[Any], stats: SpeculationStats):
+        self.stats = stats
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.settled = False  # result used or work discarded
+        self.task = asyncio.ensure_future(coro)
+        self.task.add_done_callback(self._mark_finished)
+        stats.record_launch()
+
+    def _mark_finished(self, _task: asyncio.Future) -> None:
+        self.finished_at = time.perf_counter()
+
+    async def result(self) -> Any:
+        """Await the speculative result and credit the overlap as saved time."""
+        requested_at = time.perf_counter()
+        value = await self.task
+        self.settled = True
+        # Whatever ran before we asked for the result would otherwise have been serial.
+        overlap_end = min(requested_at, self.finished_at or requested_at)
+        self.stats.record_reuse((overlap_end - self.started_at) * 1000)
+        return value
+
+    def cancel(self) -> None:
+        """Discard the speculative work, recording the time it already consumed.
+
+        A no-op once the result has been used, so callers can always cancel on the way out.
+        """
+        if self.settled:
+            return
+        self.settled = True
+        ended_at = self.finished_at or time.perf_counter()
+        if not self.task.done():
+            self.task.cancel()
+        self.stats.record_cancel((ended_at - self.started_at) * 1000)
+
+
+speculation_stats = SpeculationStats()
@@ -15,6 +15,8 @@ class EmailResponder:
         self.config = load_config()
         self.check_interval = self.config['email']['check_interval_seconds']
         self.provider_type = self.config['email']['provider']
+        self.batch_size = self.config['email'].get('batch_size', 50)
+        self.chat_url = "http://localhost:8002/chat"
         
         if self.provider_type == 'imap':
             # In a real app, these would come from config/env
@@ -35,45 +37,72 @@ class EmailResponder:
     def fetch_emails(self):
         return self.provider.fetch_unseen()
 
+    @staticmethod
+    def build_query(email):
+        # Construct Query from Subject + Body
+        return f"{email['subject']}\n{email['body']}"
+
+    def handle_answer(self, email, data):
+        draft_response = data['answer_text']
+        confidence = data['confidence']
+        
+        # Create Draft / Send Reply
+        # For now, we'll just "send" it if confidence is high, or log it
+        if confidence > 0.8:
+            self.provider.send_reply(email['from'], email['subject'], draft_response)
+        else:
+            print(f"Low confidence ({confidence}). Draft saved for review.")
+            # In real app: save to DB 'tickets' table
+
     def process_email(self, email):
         print(f"Processing email: {email['subject']}")
         
-        # 1. Construct Query from Subject + Body
-        query = f"{email['subject']}\n{email['body']}"
-        
-        # 2. Call Chat Service via Gateway or Direct
+        # Call Chat Service via Gateway or Direct
         # In a real deployment, we might use the internal service URL
-        chat_url = "http://localhost:8002/chat" 
-        
         try:
             import requests
-            response = requests.post(chat_url, json={"message": query})
+            response = requests.post(self.chat_url, json={"message": self.build_query(email)})
             if response.status_code == 200:
-                data = response.json()
-                draft_response = data['answer_text']
-                confidence = data['confidence']
-                citations = data['citations']
-                
-                # 3. Create Draft / Send Reply
-                # For now, we'll just "send" it if confidence is high, or log it
-                if confidence > 0.8:
-                    self.provider.send_reply(email['from'], email['subject'], draft_response)
-                else:
-                    print(f"Low confidence ({confidence}). Draft saved for review.")
-                    # In real app: save to DB 'tickets' table
+                self.handle_answer(email, response.json())
             else:
                 print(f"Failed to get AI response: {response.status_code}")
                 
         except Exception as e:
             print(f"Error calling chat service: {e}")
 
+    def process_emails(self, emails):
+        """Answer a backlog through /chat/batch, one request per batch_size emails."""
+        import requests
+        for offset in range(0, len(emails), self.batch_size):
+            chunk = emails[offset:offset + self.batch_size]
+            print(f"Processing {len(chunk)} emails via batch API")
+            try:
+                response = requests.post(
+                    f"{self.chat_url}/batch",
+                    json={"messages": [{"message": self.build_query(email)} for email in chunk]}
+                )
+                response.raise_for_status()
+                results = response.json()['results']
+            except Exception as e:
+                print(f"Batch chat call failed ({e}); falling back to one request per email")
+                for email in chunk:
+                    self.process_email(email)
+                continue
+
+            for item in results:
+                email = chunk[item['index']]
+                if item.get('response'):
+                    self.handle_answer(email, item['response'])
+                else:
+                    print(f"Failed to answer email '{email['subject']}': {item.get('error')}")
+
     def run(self):
         print("Starting Email Responder Loop...")
         while True:
             try:
                 emails = self.fetch_emails()
-                for email in emails:
-                    self.process_email(email)
+                if emails:
+                    self.process_emails(emails)
                 time.sleep(self.check_interval)
             except KeyboardInterrupt:
                 print("Stopping Email Responder...")
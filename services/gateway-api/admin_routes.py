@@ -19,7 +19,7 @@ from services.shared.translation_service import get_translation_service
 from services.shared.analytics_service import get_analytics_service
 from services.shared.settings_service import get_settings_service
 from services.shared.provider_metrics import get_provider_metrics
-from services.shared.config_utils import load_config
+from services.shared.config_utils import database_path, load_config
 from services.shared.integration_service import get_integration_service
 from services.shared.faq_repository import FAQRepository
 from services.shared.llm_test_service import (
@@ -45,7 +45,7 @@ async def require_admin_token(x_admin_token: str = Header(None)):
 
 router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
 
-DB_PATH = "data/copilot.db"
+DB_PATH = database_path()
 
 # Initialize managers
 conversation_memory = ConversationMemory(DB_PATH)
@@ -262,7 +262,9 @@ async def get_fallback_stats(days: int = 7, limit: int = 20):
     return {
         "summary": summary,
         "distribution": distribution,
-        "recent_failures": failures
+        "recent_failures": failures,
+        "tiers": provider_metrics.get_tier_summary(days=days),
+        "hedges": provider_metrics.get_hedge_summary(days=days)
     }
 
 
@@ -466,11 +468,13 @@ async def get_llm_settings():
     primary_default = fallback_order_default[0] if fallback_order_default else None
     primary_provider = settings_service.get('llm_primary_provider', primary_default)
     auto_fallback = settings_service.get('llm_auto_fallback', True)
+    routing_default = 'adaptive' if (llm_config.get('adaptive_routing') or {}).get('enabled') else 'static'
 
     return {
         "primary_provider": primary_provider,
         "fallback_order": fallback_order,
         "auto_fallback": bool(auto_fallback),
+        "routing_mode": settings_service.get('llm_routing_mode', routing_default),
         "available_providers": _get_available_providers()
     }
 
@@ -483,6 +487,10 @@ async def update_llm_settings(payload: Dict[str, Any]):
     primary = payload.get('primary_provider')
     fallback_order = payload.get('fallback_order')
     auto_fallback = payload.get('auto_fallback')
+    routing_mode = payload.get('routing_mode')
+
+    if routing_mode is not None and routing_mode not in ('static', 'adaptive'):
+        raise HTTPException(status_code=400, detail="routing_mode must be 'static' or 'adaptive'")
 
     if primary and primary not in available:
         raise HTTPException(status_code=400, detail=f"Unknown provider '{primary}'")
@@ -506,6 +514,9 @@ async def update_llm_settings(payload: Dict[str, Any]):
     if auto_fallback is not None:
         settings_service.set('llm_auto_fallback', bool(auto_fallback))
 
+    if routing_mode is not None:
+        settings_service.set('llm_routing_mode', routing_mode)
+
     return {"status": "success"}
 
 
@@ -996,7 +1007,9 @@ async def get_fallback_stats(days: int = 7, limit: int = 20):
     return {
         "summary": summary,
         "distribution": distribution,
-        "recent_failures": failures
+        "recent_failures": failures,
+        "tiers": provider_metrics.get_tier_summary(days=days),
+        "hedges": provider_metrics.get_hedge_summary(days=days)
     }
 
 @router.get("/analytics/costs")
@@ -1005,6 +1018,14 @@ async def get_cost_analysis(days: int = 30):
     costs = analytics_service.get_cost_analysis(days=days)
     return costs
 
+@router.get("/analytics/tokens")
+async def get_token_usage(days: int = 7):
+    """Get token usage, completion tokens/s and cost per answer by provider and model."""
+    return {
+        "window_days": days,
+        "providers": provider_metrics.get_usage_summary(days=days)
+    }
+
 @router.get("/analytics/export")
 async def export_analytics(days: int = 30):
     """Export comprehensive analytics report."""
@@ -1,7 +1,7 @@
 from fastapi import FastAPI, HTTPException, Request, Security, Depends, WebSocket, WebSocketDisconnect, status
 from fastapi.security.api_key import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import httpx
 import os
 import sys
@@ -15,6 +15,17 @@ from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from services.shared.config_utils import load_config
 from services.shared.rate_limiter import get_rate_limiter, get_ip_throttler
+from services.shared.deadline import (
+    DEADLINE_HEADER,
+    ClientDisconnected,
+    cancel_on_disconnect,
+    deadline_scope,
+    format_deadline,
+    has_budget,
+    parse_deadline_header,
+    propagation_headers,
+    timeout_for,
+)
 
 # Import admin routes from same directory
 sys.path.insert(0, os.path.dirname(__file__))
@@ -90,6 +101,16 @@ async def get_api_key(request: Request, api_key_header: str = Security(api_key_h
 
 # Service URLs (configurable via env or config in real app)
 CHAT_SERVICE_URL = "http://localhost:8002"
+CHAT_TIMEOUT_SECONDS = 30.0
+CHAT_BATCH_TIMEOUT_SECONDS = 600.0
+
+
+def _chat_deadline(request: Request) -> float:
+    """Absolute deadline for a chat call: our own timeout, or earlier if the client sent one."""
+    deadline = time.time() + CHAT_TIMEOUT_SECONDS
+    client_deadline = parse_deadline_header(request.headers.get(DEADLINE_HEADER))
+    return min(deadline, client_deadline) if client_deadline else deadline
+
 
 async def _forward_chat_request(request: Request, api_key: str):
     start_time = time.time()
@@ -98,26 +119,53 @@ async def _forward_chat_request(request: Request, api_key: str):
     
     try:
         body = await request.json()
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{CHAT_SERVICE_URL}/chat",
-                json=body,
-                timeout=30.0
-            )
-            result = response.json()
-            
-            # Record successful request
-            response_time_ms = int((time.time() - start_time) * 1000)
-            rate_limiter.record_request(
-                api_key=api_key,
-                ip_address=client_ip,
-                endpoint="/api/v1/chat",
+        # The deadline travels with the request so every downstream stage
+        # spends only what is left of it
+        with deadline_scope(_chat_deadline(request)):
+            if not has_budget():
+                raise httpx.TimeoutException("Request deadline already passed")
+            async with httpx.AsyncClient() as client:
+                response = await cancel_on_disconnect(
+                    client.post(
+                        f"{CHAT_SERVICE_URL}/chat",
+                        json=body,
+                        headers=propagation_headers(),
+                        timeout=timeout_for(CHAT_TIMEOUT_SECONDS)
+                    ),
+                    request.is_disconnected
+                )
+        result = response.json()
+        status_code = response.status_code
+        
+        # Record request
+        response_time_ms = int((time.time() - start_time) * 1000)
+        rate_limiter.record_request(
+            api_key=api_key,
+            ip_address=client_ip,
+            endpoint="/api/v1/chat",
+            status_code=status_code,
+            response_time_ms=response_time_ms
+        )
+        
+        if status_code >= 400:
+            # Pass shedding responses (503 + Retry-After) through unchanged
+            retry_after = response.headers.get("Retry-After")
+            return JSONResponse(
                 status_code=status_code,
-                response_time_ms=response_time_ms
+                content=result,
+                headers={"Retry-After": retry_after} if retry_after else None
             )
+        return result
             
-            return result
-            
+    except ClientDisconnected:
+        response_time_ms = int((time.time() - start_time) * 1000)
+        rate_limiter.record_request(api_key, client_ip, "/api/v1/chat", 499, response_time_ms)
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except httpx.TimeoutException:
+        status_code = 504
+        response_time_ms = int((time.time() - start_time) * 1000)
+        rate_limiter.record_request(api_key, client_ip, "/api/v1/chat", status_code, response_time_ms)
+        raise HTTPException(status_code=504, detail="Chat service did not answer before the request deadline")
     except httpx.RequestError as exc:
         status_code = 503
         response_time_ms = int((time.time() - start_time) * 1000)
@@ -130,6 +178,53 @@ async def _forward_chat_request(request: Request, api_key: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _forward_chat_batch(request: Request, api_key: str):
+    """Relay a /chat/batch call; NDJSON streams are passed through as they arrive."""
+    start_time = time.time()
+    client_ip = request.client.host if request.client else "unknown"
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        response_time_ms = int((time.time() - start_time) * 1000)
+        rate_limiter.record_request(api_key, client_ip, "/api/v1/chat/batch", 400, response_time_ms)
+        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+
+    client = httpx.AsyncClient(timeout=CHAT_BATCH_TIMEOUT_SECONDS)
+    try:
+        upstream = await client.send(
+            client.build_request("POST", f"{CHAT_SERVICE_URL}/chat/batch", json=body),
+            stream=True
+        )
+    except httpx.RequestError as exc:
+        await client.aclose()
+        response_time_ms = int((time.time() - start_time) * 1000)
+        rate_limiter.record_request(api_key, client_ip, "/api/v1/chat/batch", 503, response_time_ms)
+        raise HTTPException(status_code=503, detail=f"Chat service unavailable: {exc}")
+
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+            await client.aclose()
+            response_time_ms = int((time.time() - start_time) * 1000)
+            rate_limiter.record_request(api_key, client_ip, "/api/v1/chat/batch", upstream.status_code, response_time_ms)
+
+    return StreamingResponse(
+        relay(),
+        status_code=upstream.status_code,
+        media_type=upstream.headers.get("content-type", "application/json")
+    )
+
+
+@app.post("/api/v1/chat/batch")
+async def proxy_chat_batch(request: Request, api_key: str = Depends(get_api_key)):
+    return await _forward_chat_batch(request, api_key)
+
+
 @app.post("/api/v1/chat")
 async def proxy_chat(request: Request, api_key: str = Depends(get_api_key)):
     return await _forward_chat_request(request, api_key)
@@ -213,7 +308,8 @@ async def websocket_chat_endpoint(websocket: WebSocket, client_id: str):
                         response = await client.post(
                             f"{CHAT_SERVICE_URL}/chat",
                             json={"message": message_data.get("content", "")},
-                            timeout=30.0
+                            headers={DEADLINE_HEADER: format_deadline(time.time() + CHAT_TIMEOUT_SECONDS)},
+                            timeout=CHAT_TIMEOUT_SECONDS
                         )
                         result = response.json()
                         
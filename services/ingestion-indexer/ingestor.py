@@ -25,7 +25,6 @@ def patched_request(self, *args, **kwargs):
     return original_request(self, *args, **kwargs)
 Session.request = patched_request
 
-from sentence_transformers import SentenceTransformer
 from typing import List, Dict
 
 # Document Parsers
@@ -35,15 +34,18 @@ from docx import Document
 # Add parent directory to path to import shared modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from services.shared.config_utils import load_config
+from services.shared.embeddings import DEFAULT_MODEL, Embedder, EmbeddingSettings
 
 class IngestionEngine:
     def __init__(self):
         self.config = load_config()
-        self.model_name = "all-MiniLM-L6-v2" # Lightweight model for prototype
-        self.model = SentenceTransformer(self.model_name)
+        # rag.embedding.model; a multilingual model lets non-English questions be searched directly
+        self.model_name = EmbeddingSettings.from_config(self.config).model
+        self.model = Embedder(self.model_name)
         self.vector_store_path = self.config['database']['vector_store_path']
         self.index_file = os.path.join(self.vector_store_path, "index.faiss")
         self.metadata_file = os.path.join(self.vector_store_path, "metadata.pkl")
+        self.info_file = os.path.join(self.vector_store_path, "index_info.json")
         
         # Ensure directory exists
         os.makedirs(self.vector_store_path, exist_ok=True)
@@ -52,11 +54,28 @@ class IngestionEngine:
     def _has_existing_index(self) -> bool:
         return os.path.exists(self.index_file) and os.path.exists(self.metadata_file)
 
+    def _index_info(self) -> Dict:
+        if not os.path.exists(self.info_file):
+            # Indexes built before the model became configurable used the default model
+            return {"model": DEFAULT_MODEL, "source": None}
+        with open(self.info_file, 'r') as f:
+            return json.load(f)
+
     def _ensure_default_index(self):
-        """Automatically seed the vector store with sample data if empty."""
+        """Automatically seed the vector store with sample data if empty, and re-embed it after a model change."""
+        sample_file = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/faqs/sample_faq.json'))
         if self._has_existing_index():
+            info = self._index_info()
+            if info.get("model") == self.model_name:
+                return
+            # Vectors from another model are not comparable with this model's queries
+            source = info.get("source") or sample_file
+            print(f"🔄 Index was built with {info.get('model')}; re-embedding {source} with {self.model_name}...")
+            if os.path.exists(source):
+                self.ingest(source)
+            else:
+                print(f"⚠️  {source} no longer exists; re-ingest your documents to rebuild the index.")
             return
-        sample_file = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/faqs/sample_faq.json'))
         if not os.path.exists(sample_file):
             print("⚠️  Sample FAQ file not found; vector store will remain empty until ingestion runs.")
             return
@@ -147,28 +166,39 @@ class IngestionEngine:
         
         with open(self.metadata_file, 'wb') as f:
             pickle.dump(chunks, f)
+        with open(self.info_file, 'w') as f:
+            json.dump({"model": self.model_name, "source": os.path.abspath(file_path)}, f)
             
         print("Ingestion complete.")
 
     def search(self, query: str, k: int = 3):
-        if not os.path.exists(self.index_file) or not os.path.exists(self.metadata_file):
+        return self.search_batch([query], k)[0]
+
+    def search_batch(self, queries: List[str], k: int = 3) -> List[List[Dict]]:
+        """Search several queries with one embedding pass and one index lookup."""
+        if not queries:
             return []
+        if not os.path.exists(self.index_file) or not os.path.exists(self.metadata_file):
+            return [[] for _ in queries]
             
         index = faiss.read_index(self.index_file)
         with open(self.metadata_file, 'rb') as f:
             chunks = pickle.load(f)
             
-        query_vector = self.model.encode([query])
-        distances, indices = index.search(np.array(query_vector).astype('float32'), k)
+        query_vectors = self.model.encode(queries)
+        distances, indices = index.search(np.array(query_vectors).astype('float32'), k)
         
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx != -1:
-                results.append({
-                    "chunk": chunks[idx],
-                    "score": float(distances[0][i]) # L2 distance (lower is better)
-                })
-        return results
+        batch_results = []
+        for row, row_indices in enumerate(indices):
+            results = []
+            for i, idx in enumerate(row_indices):
+                if idx != -1:
+                    results.append({
+                        "chunk": chunks[idx],
+                        "score": float(distances[row][i]) # L2 distance (lower is better)
+                    })
+            batch_results.append(results)
+        return batch_results
 
 if __name__ == "__main__":
     engine = IngestionEngine()
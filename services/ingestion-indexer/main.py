@@ -15,6 +15,10 @@ class SearchRequest(BaseModel):
     query: str
     k: Optional[int] = 3
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    k: Optional[int] = 3
+
 class IngestRequest(BaseModel):
     file_path: str
 
@@ -34,6 +38,14 @@ async def search(request: SearchRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search/batch")
+async def search_batch(request: BatchSearchRequest):
+    try:
+        results = engine.search_batch(request.queries, request.k)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
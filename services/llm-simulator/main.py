@@ -0,0 +1,142 @@
+"""
+Simulated LLM provider farm for load and failover testing.
+
+Serves an OpenAI-compatible ``/<provider>/v1/chat/completions`` per provider
+defined in the loaded scenario (see simulator.py), with or without streaming.
+Set ``llm.simulator.enabled`` and the orchestrator's router talks to this
+service instead of the real APIs, with its fallback, hedging, limiter and
+breaker settings unchanged. scripts/load_test_router.py drives it.
+
+    uvicorn main:app --port 8095          (from services/llm-simulator)
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+import yaml
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from simulator import Scenario, answer_words
+from services.shared.config_utils import load_config
+from services.shared.structured_logging import get_logger
+
+log = get_logger("llm_simulator")
+
+app = FastAPI(title="LLM Simulator")
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(__file__), "scenarios", "default.yaml")
+
+
+def load_scenario_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _initial_scenario():
+    try:
+        simulator_config = (load_config().get('llm', {}) or {}).get('simulator', {}) or {}
+    except FileNotFoundError:
+        simulator_config = {}
+    path = os.getenv("SIM_SCENARIO") or simulator_config.get('scenario') or DEFAULT_SCENARIO
+    log.info("scenario_loaded", path=path)
+    return load_scenario_file(path)
+
+
+scenario = Scenario(_initial_scenario())
+
+
+def _completion_id():
+    return f"chatcmpl-sim-{uuid.uuid4().hex[:12]}"
+
+
+def _usage(messages, completion_tokens):
+    # ~4 characters per token, like the orchestrator's own estimates
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.post("/{provider}/v1/chat/completions")
+async def chat_completions(provider: str, request: Request):
+    body = await request.json()
+    decision = scenario.decide(provider)
+    if decision is None:
+        raise HTTPException(status_code=404, detail=f"provider '{provider}' is not in the scenario")
+
+    if decision.outcome == "throttled":
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"message": "Rate limit reached (simulated)", "type": "rate_limit_exceeded"}},
+            headers={"Retry-After": str(int(max(1, decision.retry_after_s)))},
+        )
+    if decision.outcome == "hang":
+        await asyncio.sleep(decision.hang_s)
+        return JSONResponse(status_code=504, content={"error": {"message": "Upstream hung (simulated)"}})
+    await asyncio.sleep(decision.first_token_s)
+    if decision.outcome == "error":
+        return JSONResponse(status_code=500, content={"error": {"message": "Internal error (simulated)"}})
+
+    words = answer_words(decision.answer_tokens)
+    model = body.get("model") or provider
+    messages = body.get("messages") or []
+    token_delay = 1 / decision.tokens_per_s if decision.tokens_per_s > 0 else 0.0
+
+    if body.get("stream"):
+        async def events():
+            completion_id = _completion_id()
+            for index, word in enumerate(words):
+                if index:
+                    await asyncio.sleep(token_delay)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage_chunk = {"id": completion_id, "object": "chat.completion.chunk", "model": model, "choices": [], "usage": _usage(messages, len(words))}
+                yield f"data: {json.dumps(usage_chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # Without streaming the whole answer is generated before anything is returned
+    await asyncio.sleep(token_delay * (len(words) - 1))
+    return {
+        "id": _completion_id(),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+        "usage": _usage(messages, len(words)),
+    }
+
+
+@app.post("/scenario")
+async def load_scenario(spec: dict):
+    """Replace the running scenario (same shape as the YAML files) and restart its clock."""
+    scenario.load(spec)
+    return scenario.snapshot()
+
+
+@app.post("/reset")
+async def reset():
+    """Restart the current scenario's clock and counters."""
+    scenario.load(scenario.spec)
+    return scenario.snapshot()
+
+
+@app.get("/stats")
+async def stats():
+    """Elapsed scenario time, each provider's current behaviour and its outcome counts."""
+    return scenario.snapshot()
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "service": "llm-simulator", "providers": sorted(scenario.backends)}
@@ -0,0 +1,183 @@
+"""Scripted behaviour for the simulated LLM providers served by this service.
+
+A scenario gives each provider a timeline of phases keyed by ``at_s``, the
+seconds since the scenario was loaded. A phase lists only what changes; every
+other field carries over from the phase before it. With ``repeat_s`` the
+timeline loops.
+
+    seed: 7
+    providers:
+      groq:
+        phases:
+          - at_s: 0
+            latency_ms: {p50: 350, p95: 900}   # time to first token (lognormal)
+            tokens_per_s: 120                  # streaming speed
+            error_rate: 0.01                   # HTTP 500
+          - at_s: 60
+            throttle: {every_s: 20, for_s: 5}  # 429 bursts
+            rate_limit_rpm: 300                # 429 above this rate
+          - at_s: 120
+            hang_rate: 0.2                     # never answer (until hang_s)
+
+Decisions draw from one seeded RNG, so a single-client run replays exactly.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, fields, replace
+import math
+import random
+from threading import Lock
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+WORDS = (
+    "thanks for reaching out you can update this from the account settings page "
+    "and the change applies to your next order as described in our help center"
+).split()
+
+
+@dataclass
+class Behaviour:
+    latency_p50_ms: float = 300.0
+    latency_p95_ms: float = 800.0
+    tokens_per_s: float = 60.0
+    answer_tokens: int = 60
+    error_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_s: float = 600.0
+    rate_limit_rpm: float = 0.0  # 0 = unlimited
+    throttle_every_s: float = 0.0  # 0 = no 429 bursts
+    throttle_for_s: float = 0.0
+    retry_after_s: float = 1.0
+
+    def updated(self, phase: Dict[str, Any]) -> "Behaviour":
+        changes = {name: value for name, value in phase.items() if name in {f.name for f in fields(self)}}
+        latency = phase.get("latency_ms")
+        if isinstance(latency, dict):
+            changes["latency_p50_ms"] = latency.get("p50", self.latency_p50_ms)
+            changes["latency_p95_ms"] = latency.get("p95", changes["latency_p50_ms"])
+        elif latency is not None:
+            changes["latency_p50_ms"] = changes["latency_p95_ms"] = latency
+        throttle = phase.get("throttle")
+        if throttle is not None:
+            changes["throttle_every_s"] = (throttle or {}).get("every_s", 0.0)
+            changes["throttle_for_s"] = (throttle or {}).get("for_s", 0.0)
+        return replace(self, **{name: type(getattr(self, name))(value) for name, value in changes.items()})
+
+
+@dataclass
+class Decision:
+    outcome: str  # ok, error, throttled, hang
+    first_token_s: float = 0.0
+    tokens_per_s: float = 0.0
+    answer_tokens: int = 0
+    retry_after_s: float = 0.0
+    hang_s: float = 0.0
+
+
+class SimulatedBackend:
+    """One simulated provider following its phase timeline."""
+
+    def __init__(self, name: str, phases: List[Dict[str, Any]], repeat_s: float = 0.0, rng: Optional[random.Random] = None):
+        self.name = name
+        self.repeat_s = repeat_s
+        self.rng = rng or random.Random()
+        self.timeline: List[Tuple[float, Behaviour]] = []
+        behaviour = Behaviour()
+        for phase in sorted(phases or [{}], key=lambda p: float(p.get("at_s", 0))):
+            behaviour = behaviour.updated(phase)
+            self.timeline.append((float(phase.get("at_s", 0)), behaviour))
+        self._recent: deque = deque()  # request times within the last minute, for rate_limit_rpm
+        self.counts: Dict[str, int] = {"ok": 0, "error": 0, "throttled": 0, "hang": 0}
+
+    def behaviour_at(self, elapsed: float) -> Behaviour:
+        if self.repeat_s > 0:
+            elapsed %= self.repeat_s
+        current = self.timeline[0][1]
+        for at_s, behaviour in self.timeline:
+            if elapsed < at_s:
+                break
+            current = behaviour
+        return current
+
+    def _latency_s(self, behaviour: Behaviour) -> float:
+        p50, p95 = max(behaviour.latency_p50_ms, 0.0), max(behaviour.latency_p95_ms, behaviour.latency_p50_ms)
+        if p50 <= 0:
+            return 0.0
+        sigma = (math.log(p95) - math.log(p50)) / 1.645 if p95 > p50 else 0.0
+        return self.rng.lognormvariate(math.log(p50), sigma) / 1000
+
+    def decide(self, elapsed: float, now: float) -> Decision:
+        behaviour = self.behaviour_at(elapsed)
+        while self._recent and now - self._recent[0] >= 60:
+            self._recent.popleft()
+        self._recent.append(now)
+        throttled = (
+            behaviour.throttle_every_s > 0
+            and elapsed % behaviour.throttle_every_s < behaviour.throttle_for_s
+        ) or (behaviour.rate_limit_rpm > 0 and len(self._recent) > behaviour.rate_limit_rpm)
+        if throttled:
+            decision = Decision("throttled", retry_after_s=behaviour.retry_after_s)
+        elif self.rng.random() < behaviour.hang_rate:
+            decision = Decision("hang", hang_s=behaviour.hang_s)
+        elif self.rng.random() < behaviour.error_rate:
+            decision = Decision("error", first_token_s=self._latency_s(behaviour))
+        else:
+            decision = Decision(
+                "ok",
+                first_token_s=self._latency_s(behaviour),
+                tokens_per_s=behaviour.tokens_per_s,
+                answer_tokens=behaviour.answer_tokens,
+            )
+        self.counts[decision.outcome] += 1
+        return decision
+
+
+def answer_words(count: int) -> List[str]:
+    return [WORDS[i % len(WORDS)] for i in range(max(1, count))]
+
+
+class Scenario:
+    """All simulated providers and the clock their timelines run on."""
+
+    def __init__(self, spec: Optional[Dict[str, Any]] = None, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = Lock()
+        self.load(spec or {})
+
+    def load(self, spec: Dict[str, Any]) -> None:
+        """Replace the scenario and restart its clock."""
+        rng = random.Random(spec.get("seed"))
+        repeat_s = float(spec.get("repeat_s", 0) or 0)
+        with self._lock:
+            self.spec = spec
+            self.backends = {
+                name: SimulatedBackend(name, (provider or {}).get("phases"), repeat_s, rng)
+                for name, provider in (spec.get("providers") or {}).items()
+            }
+            self.started = self._clock()
+
+    def elapsed(self) -> float:
+        return self._clock() - self.started
+
+    def decide(self, provider: str) -> Optional[Decision]:
+        """Next outcome for a call to ``provider``; None when the scenario does not define it."""
+        with self._lock:
+            backend = self.backends.get(provider)
+            if backend is None:
+                return None
+            now = self._clock()
+            return backend.decide(now - self.started, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = self._clock() - self.started
+            return {
+                "elapsed_s": round(elapsed, 1),
+                "providers": {
+                    name: {"counts": dict(backend.counts), "behaviour": backend.behaviour_at(elapsed).__dict__}
+                    for name, backend in self.backends.items()
+                },
+            }
@@ -0,0 +1,106 @@
+"""Admission control for request handlers: bounded concurrency plus a bounded wait queue."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from threading import Lock
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; ``reason`` is ``queue_full`` or ``queue_timeout``."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Lets at most ``max_concurrent`` requests run at once.
+
+    Up to ``max_queue`` more may wait, each for at most ``queue_timeout_s``
+    seconds. Anything beyond that is rejected immediately, so that a slow
+    dependency turns into predictable shedding rather than an unbounded pile-up.
+    """
+
+    def __init__(self, max_concurrent: int = 32, max_queue: int = 64, queue_timeout_s: float = 2.0):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout_s = max(0.0, float(queue_timeout_s))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stats_lock = Lock()
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "queue_timeout": 0}
+        self.deadline_exceeded = 0
+        self.degraded: Dict[str, int] = {}
+        self.unavailable = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the serving event loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a concurrency slot; ``timeout`` can shorten the queue wait (e.g. to a request deadline)."""
+        semaphore = self._get_semaphore()
+        wait_s = self.queue_timeout_s if timeout is None else min(self.queue_timeout_s, max(0.0, timeout))
+        if semaphore.locked():
+            if self.queued >= self.max_queue:
+                self._reject("queue_full")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=wait_s)
+            except asyncio.TimeoutError:
+                self._reject("queue_timeout")
+            finally:
+                self.queued -= 1
+        else:
+            await semaphore.acquire()
+
+        self.active += 1
+        with self._stats_lock:
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            semaphore.release()
+
+    def _reject(self, reason: str) -> None:
+        with self._stats_lock:
+            self.rejected[reason] += 1
+        raise AdmissionRejected(reason)
+
+    def record_deadline_exceeded(self) -> None:
+        with self._stats_lock:
+            self.deadline_exceeded += 1
+
+    def record_degraded(self, path: str) -> None:
+        """Count a shed request that was still answered via ``path`` (cache, faq, fallback-rule)."""
+        with self._stats_lock:
+            self.degraded[path] = self.degraded.get(path, 0) + 1
+
+    def record_unavailable(self) -> None:
+        """Count a shed request that ended in a 503."""
+        with self._stats_lock:
+            self.unavailable += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "active": self.active,
+                "queue_depth": self.queued,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "deadline_exceeded": self.deadline_exceeded,
+                "degraded": dict(self.degraded),
+                "unavailable": self.unavailable,
+            }
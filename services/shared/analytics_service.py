@@ -16,13 +16,16 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 import json
 
+from services.shared.provider_metrics import ProviderMetrics
+from services.shared.config_utils import database_path
+
 
 class AnalyticsService:
     """
     Centralized analytics service for monitoring platform performance and usage.
     """
     
-    def __init__(self, db_path: str = "data/copilot.db"):
+    def __init__(self, db_path: str = database_path()):
         """Initialize analytics service."""
         self.db_path = db_path
         self._init_database()
@@ -413,7 +416,7 @@ class AnalyticsService:
     
     def get_cost_analysis(self, days: int = 30) -> Dict:
         """
-        Estimate costs based on LLM provider usage.
+        Costs from the token usage recorded with each LLM provider call.
         
         Args:
             days: Number of days to analyze
@@ -435,18 +438,14 @@ class AnalyticsService:
         
         provider_usage = dict(cursor.fetchall())
         
-        # Estimated costs (rough estimates)
-        cost_per_request = {
-            "openai": 0.002,  # ~$0.002 per request
-            "anthropic": 0.0015,
-            "google": 0.001,
-            "local": 0.0
-        }
-        
-        estimated_cost = sum(
-            provider_usage.get(provider, 0) * cost
-            for provider, cost in cost_per_request.items()
-        )
+        # Spend per provider call, priced from llm.pricing (failed attempts included)
+        token_usage = ProviderMetrics(db_path=self.db_path).get_usage_summary(days=days)
+        cost_per_provider = defaultdict(float)
+        for row in token_usage:
+            cost_per_provider[row["provider"]] += row["total_cost_usd"]
+        estimated_cost = sum(cost_per_provider.values())
+        answers = sum(row["answers"] for row in token_usage)
+        cost_per_answer = estimated_cost / answers if answers else 0.0
         
         # Cache savings
         cursor.execute("""
@@ -455,19 +454,21 @@ class AnalyticsService:
         """, (cutoff,))
         
         cache_hits = cursor.fetchone()[0] or 0
-        cache_savings = cache_hits * 0.0015  # Average cost saved per cache hit
+        cache_savings = cache_hits * cost_per_answer  # Each hit saved one answer
         
         conn.close()
         
         return {
-            "estimated_cost_usd": round(estimated_cost, 2),
-            "cache_savings_usd": round(cache_savings, 2),
+            "estimated_cost_usd": round(estimated_cost, 4),
+            "cache_savings_usd": round(cache_savings, 4),
+            "cost_per_answer_usd": round(cost_per_answer, 6),
             "total_requests": sum(provider_usage.values()),
             "provider_breakdown": provider_usage,
             "cost_per_provider": {
-                provider: round(count * cost_per_request.get(provider, 0), 2)
-                for provider, count in provider_usage.items()
-            }
+                provider: round(cost, 4)
+                for provider, cost in cost_per_provider.items()
+            },
+            "token_usage": token_usage
         }
 
 
@@ -0,0 +1,172 @@
+"""SQLite-backed circuit breaker state shared by every orchestrator worker process.
+
+Alongside each breaker's row the store keeps its rolling call window as
+per-bucket counters. Every transition runs in one ``BEGIN IMMEDIATE``
+transaction (``transact``), so workers never race each other into
+inconsistent states and only one of them can claim the half-open probe.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.shared.config_utils import database_path
+
+DB_PATH = database_path()
+
+_COLUMNS = "name, state, failures, last_failure_time, probe_started"
+
+
+def empty_record(name: str) -> Dict[str, Any]:
+    return {"name": name, "state": "CLOSED", "failures": 0, "last_failure_time": 0.0, "probe_started": 0.0}
+
+
+def empty_window() -> Dict[str, int]:
+    return {"calls": 0, "failures": 0, "slow": 0}
+
+
+class BreakerStore:
+    """Persists breaker state so that all workers see the same view of each provider."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or DB_PATH
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._ensure_table()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_table(self) -> None:
+        conn = self._connect()
+        try:
+            # WAL lets readers in other workers proceed while one worker writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS circuit_breakers (
+                    name TEXT PRIMARY KEY,
+                    state TEXT NOT NULL DEFAULT 'CLOSED',
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    last_failure_time REAL NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            # When the single half-open probe was handed out (0 = none in flight)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(circuit_breakers)").fetchall()}
+            if "probe_started" not in existing:
+                conn.execute("ALTER TABLE circuit_breakers ADD COLUMN probe_started REAL NOT NULL DEFAULT 0")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS circuit_breaker_windows (
+                    name TEXT NOT NULL,
+                    bucket REAL NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    slow INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (name, bucket)
+                )
+                """
+            )
+        finally:
+            conn.close()
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM circuit_breakers WHERE name = ?",
+                (name,),
+            ).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def transact(
+        self,
+        name: str,
+        apply: Callable[[Dict[str, Any], Dict[str, int]], None],
+        call: Optional[Tuple[bool, bool]] = None,
+        window_s: float = 60.0,
+        bucket_s: float = 6.0,
+    ) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """Atomically count ``call`` (failed, slow) in the rolling window, then let ``apply`` update the row.
+
+        ``apply(record, window)`` mutates the record in place; setting
+        ``record["reset_window"]`` also clears the window. Returns the stored
+        record and window.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if call is not None:
+                failed, slow = call
+                conn.execute(
+                    """
+                    INSERT INTO circuit_breaker_windows (name, bucket, calls, failures, slow)
+                    VALUES (?, ?, 1, ?, ?)
+                    ON CONFLICT(name, bucket) DO UPDATE SET
+                        calls = calls + 1,
+                        failures = failures + excluded.failures,
+                        slow = slow + excluded.slow
+                    """,
+                    (name, now - now % bucket_s, int(failed), int(slow)),
+                )
+            conn.execute("DELETE FROM circuit_breaker_windows WHERE name = ? AND bucket <= ?", (name, now - window_s - bucket_s))
+            window = dict(conn.execute(
+                """
+                SELECT COALESCE(SUM(calls), 0) AS calls, COALESCE(SUM(failures), 0) AS failures, COALESCE(SUM(slow), 0) AS slow
+                FROM circuit_breaker_windows WHERE name = ? AND bucket > ?
+                """,
+                (name, now - window_s),
+            ).fetchone())
+            row = conn.execute(f"SELECT {_COLUMNS} FROM circuit_breakers WHERE name = ?", (name,)).fetchone()
+            record = dict(row) if row else empty_record(name)
+            apply(record, window)
+            if record.pop("reset_window", False):
+                conn.execute("DELETE FROM circuit_breaker_windows WHERE name = ?", (name,))
+                window = empty_window()
+            conn.execute(
+                """
+                INSERT INTO circuit_breakers (name, state, failures, last_failure_time, probe_started, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    state = excluded.state,
+                    failures = excluded.failures,
+                    last_failure_time = excluded.last_failure_time,
+                    probe_started = excluded.probe_started,
+                    updated_at = excluded.updated_at
+                """,
+                (name, record["state"], record["failures"], record["last_failure_time"], record["probe_started"], now),
+            )
+            conn.execute("COMMIT")
+            return record, window
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT {_COLUMNS}, updated_at FROM circuit_breakers").fetchall()
+            return {row["name"]: dict(row) for row in rows}
+        finally:
+            conn.close()
+
+
+_breaker_store: Optional[BreakerStore] = None
+
+
+def get_breaker_store() -> BreakerStore:
+    global _breaker_store
+    if _breaker_store is None:
+        _breaker_store = BreakerStore()
+    return _breaker_store
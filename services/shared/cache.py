@@ -3,12 +3,19 @@ Caching Layer for LLM Responses
 Reduces API costs by caching frequently asked questions
 """
 import json
+import re
 import sqlite3
 import hashlib
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from threading import Lock
+from typing import Optional, Dict, Any, List
 import os
 
+from services.shared.structured_logging import get_logger
+from services.shared.config_utils import database_path
+
+log = get_logger("cache")
+
 class ResponseCache:
     """
     Cache for LLM responses to reduce API calls and costs.
@@ -16,9 +23,15 @@ class ResponseCache:
     In production, consider Redis for distributed caching.
     """
     
-    def __init__(self, db_path: str = "data/copilot.db", ttl_hours: int = 24):
+    def __init__(self, db_path: str = database_path(), ttl_hours: int = 24):
         self.db_path = db_path
         self.ttl_hours = ttl_hours
+        # Process-local lookup counters, split by first-turn vs follow-up keys
+        self._stats_lock = Lock()
+        self._lookups = {
+            "first_turn": {"hits": 0, "misses": 0},
+            "follow_up": {"hits": 0, "misses": 0},
+        }
         self._init_db()
     
     def _init_db(self):
@@ -37,9 +50,20 @@ class ResponseCache:
                     created_at TEXT,
                     last_accessed TEXT,
                     access_count INTEGER DEFAULT 1,
-                    metadata TEXT
+                    metadata TEXT,
+                    context_hash TEXT DEFAULT '',
+                    translations TEXT DEFAULT '{}'
                 )
             """)
+
+            # Older databases predate context-aware (follow-up) entries
+            cursor.execute("PRAGMA table_info(response_cache)")
+            columns = {row[1] for row in cursor.fetchall()}
+            if "context_hash" not in columns:
+                cursor.execute("ALTER TABLE response_cache ADD COLUMN context_hash TEXT DEFAULT ''")
+            # Per-language renderings of the English answer, keyed by language code
+            if "translations" not in columns:
+                cursor.execute("ALTER TABLE response_cache ADD COLUMN translations TEXT DEFAULT '{}'")
             
             # Create index on query_hash for faster lookups
             cursor.execute("""
@@ -65,13 +89,69 @@ class ResponseCache:
         
         return hashlib.sha256(combined.encode()).hexdigest()
     
-    def get(self, query: str, context_hash: str = "") -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """Lowercase, drop punctuation and collapse whitespace"""
+        cleaned = re.sub(r"[^\w\s]", " ", (text or "").lower())
+        return " ".join(cleaned.split())
+
+    def build_context_hash(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Derive a stable key from a window of conversation messages.
+
+        Only role and normalized content are used, so sessions that went through
+        the same turns (e.g. "how do I return" -> "how long does it take") share
+        cache entries regardless of timestamps or metadata.
+        """
+        if not messages:
+            return ""
+        window = "\n".join(
+            f"{msg.get('role', '')}:{self._normalize_text(msg.get('content', ''))}"
+            for msg in messages
+        )
+        return hashlib.sha256(window.encode()).hexdigest()[:32]
+
+    def _record_lookup(self, context_hash: str, hit: bool):
+        kind = "follow_up" if context_hash else "first_turn"
+        with self._stats_lock:
+            self._lookups[kind]["hits" if hit else "misses"] += 1
+
+    def get_hit_rates(self) -> Dict[str, Any]:
+        """Hit rates observed by this process since start-up"""
+        with self._stats_lock:
+            report = {}
+            total_hits = total_lookups = 0
+            for kind, counts in self._lookups.items():
+                lookups = counts["hits"] + counts["misses"]
+                total_hits += counts["hits"]
+                total_lookups += lookups
+                report[kind] = {
+                    "hits": counts["hits"],
+                    "misses": counts["misses"],
+                    "hit_rate": round(counts["hits"] / lookups, 3) if lookups else 0.0,
+                }
+            report["overall"] = {
+                "lookups": total_lookups,
+                "hit_rate": round(total_hits / total_lookups, 3) if total_lookups else 0.0,
+            }
+            return report
+
+    def get(self, query: str, context_hash: str = "", language: str = "en") -> Optional[Dict[str, Any]]:
         """
         Get cached response for query
         
+        For a non-English ``language`` the stored rendering replaces
+        ``answer_text`` when there is one; ``rendered_language`` tells the caller
+        whether it still has to translate (and then ``set_translation``).
+        
         Returns:
             Cached response data or None if not found/expired
         """
+        cached = self._lookup(query, context_hash, language)
+        self._record_lookup(context_hash, cached is not None)
+        return cached
+
+    def _lookup(self, query: str, context_hash: str, language: str = "en") -> Optional[Dict[str, Any]]:
         query_hash = self._hash_query(query, context_hash)
         
         with sqlite3.connect(self.db_path) as conn:
@@ -79,7 +159,7 @@ class ResponseCache:
             
             # Get cached entry
             cursor.execute("""
-                SELECT response_data, created_at, access_count
+                SELECT response_data, created_at, access_count, translations
                 FROM response_cache
                 WHERE query_hash = ?
             """, (query_hash,))
@@ -89,7 +169,7 @@ class ResponseCache:
             if not row:
                 return None
             
-            response_data, created_at, access_count = row
+            response_data, created_at, access_count, translations = row
             
             # Check if expired
             created_time = datetime.fromisoformat(created_at)
@@ -115,6 +195,14 @@ class ResponseCache:
             cached = json.loads(response_data)
             cached['cache_hit'] = True
             cached['access_count'] = access_count + 1
+            cached['rendered_language'] = 'en'
+            if language != 'en':
+                rendering = json.loads(translations or '{}').get(language)
+                if rendering is not None:
+                    cached['answer_text'] = rendering
+                    cached['rendered_language'] = language
+                else:
+                    cached['rendered_language'] = None
             
             return cached
     
@@ -123,9 +211,13 @@ class ResponseCache:
         query: str, 
         response_data: Dict[str, Any],
         context_hash: str = "",
-        metadata: Dict = None
+        metadata: Dict = None,
+        translations: Optional[Dict[str, str]] = None
     ):
-        """Cache a response"""
+        """Cache a response (``answer_text`` in English) with any renderings already known.
+        
+        Replacing an entry drops renderings of the previous English answer.
+        """
         query_hash = self._hash_query(query, context_hash)
         
         with sqlite3.connect(self.db_path) as conn:
@@ -134,18 +226,40 @@ class ResponseCache:
             
             cursor.execute("""
                 INSERT OR REPLACE INTO response_cache
-                (query_hash, original_query, response_data, created_at, last_accessed, access_count, metadata)
-                VALUES (?, ?, ?, ?, ?, 1, ?)
+                (query_hash, original_query, response_data, created_at, last_accessed, access_count, metadata, context_hash, translations)
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?)
             """, (
                 query_hash,
                 query,
                 json.dumps(response_data),
                 now,
                 now,
-                json.dumps(metadata or {})
+                json.dumps(metadata or {}),
+                context_hash,
+                json.dumps(translations or {})
             ))
             
             conn.commit()
+
+    def set_translation(self, query: str, language: str, answer_text: str, source_text: str, context_hash: str = ""):
+        """
+        Store the ``language`` rendering of a cached answer.
+        
+        Only applied while the entry still holds ``source_text`` as its English
+        answer, so a rendering never outlives the answer it was made from.
+        """
+        if not re.fullmatch(r"[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})?", language or ""):
+            return
+        query_hash = self._hash_query(query, context_hash)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE response_cache
+                SET translations = json_set(COALESCE(NULLIF(translations, ''), '{}'), ?, ?)
+                WHERE query_hash = ? AND json_extract(response_data, '$.answer_text') = ?
+            """, (f'$."{language}"', answer_text, query_hash, source_text))
+            conn.commit()
     
     def invalidate(self, query: str, context_hash: str = ""):
         """Invalidate (delete) a cached entry"""
@@ -215,6 +329,24 @@ class ResponseCache:
                 FROM response_cache
             """)
             age_stats = cursor.fetchone()
+
+            # Follow-up entries are keyed on a conversation window
+            cursor.execute("""
+                SELECT
+                    CASE WHEN COALESCE(context_hash, '') = '' THEN 'first_turn' ELSE 'follow_up' END AS kind,
+                    COUNT(*),
+                    SUM(access_count)
+                FROM response_cache
+                GROUP BY kind
+            """)
+            by_kind = {}
+            for kind, entries, accesses in cursor.fetchall():
+                accesses = accesses or 0
+                by_kind[kind] = {
+                    "entries": entries,
+                    "accesses": accesses,
+                    "hit_rate": (accesses - entries) / max(accesses, 1)
+                }
             
             return {
                 "total_entries": total_entries,
@@ -222,7 +354,9 @@ class ResponseCache:
                 "hit_rate": (total_accesses - total_entries) / max(total_accesses, 1),
                 "top_queries": top_queries,
                 "oldest_entry": age_stats[0] if age_stats[0] else None,
-                "newest_entry": age_stats[1] if age_stats[1] else None
+                "newest_entry": age_stats[1] if age_stats[1] else None,
+                "by_kind": by_kind,
+                "runtime_hit_rates": self.get_hit_rates()
             }
     
     def get_popular_queries(self, limit: int = 20) -> list:
@@ -265,9 +399,9 @@ class SmartCache(ResponseCache):
             from sentence_transformers import SentenceTransformer
             self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
             self.semantic_enabled = True
-            print("✅ Semantic cache enabled")
+            log.info("semantic_cache_enabled")
         except ImportError:
-            print("⚠️  sentence-transformers not available. Using exact match only.")
+            log.warning("semantic_cache_unavailable", reason="sentence-transformers not installed")
             self.semantic_enabled = False
     
     def _get_embedding(self, text: str):
@@ -1,5 +1,36 @@
-import time
+"""Circuit breaker with a rolling window of error and slow-call rates.
+
+The breaker opens on ``failure_threshold`` consecutive failures. It also opens
+once at least ``min_calls`` calls have landed in the last ``window_s`` seconds
+and either their failure rate or their slow-call rate crosses its threshold.
+After ``recovery_timeout`` seconds exactly one caller gets the half-open
+probe. Its success closes the breaker; its failure, or a slow success, opens
+it again. A probe that never reports back is re-issued after
+``probe_timeout`` seconds.
+
+Transitions are synchronous, with no awaits in between, so they are atomic on
+the event loop. A lock guards them across threads. With a shared store (see
+breaker_store.py) each transition is one database transaction, so every worker
+process sees the same state and only one of them probes. Async callers use
+``allow_request_async``, ``record_result`` and ``release_probe_async``, which
+run store reads and transactions in a worker thread instead of blocking the
+event loop. A breaker read as CLOSED within ``sync_interval`` admits calls
+without touching the store.
+"""
+
+import asyncio
+from collections import deque
 from enum import Enum
+import threading
+import time
+
+from services.shared.breaker_store import empty_record, empty_window
+from services.shared.structured_logging import get_logger
+
+log = get_logger("circuit_breaker")
+
+# The rolling window is counted in this many buckets when the state is shared
+WINDOW_BUCKETS = 10
 
 class State(Enum):
     CLOSED = "CLOSED"     # Normal operation
@@ -7,41 +38,244 @@ class State(Enum):
     HALF_OPEN = "HALF_OPEN" # Testing if service recovered
 
 class CircuitBreaker:
-    def __init__(self, failure_threshold=3, recovery_timeout=30):
+    def __init__(
+        self,
+        failure_threshold=3,
+        recovery_timeout=30,
+        name=None,
+        store=None,
+        sync_interval=1.0,
+        window_s=60.0,
+        min_calls=10,
+        failure_rate_threshold=0.5,
+        slow_call_ms=0.0,
+        slow_call_rate_threshold=0.8,
+        probe_timeout=None,
+    ):
+        self.name = name
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
+        self.window_s = window_s
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_ms = slow_call_ms  # 0 disables slow-call tracking
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.probe_timeout = probe_timeout if probe_timeout is not None else recovery_timeout
         self.state = State.CLOSED
-        self.failures = 0
+        self.failures = 0  # consecutive
+        # Time of the last failure, or of opening; the recovery timeout counts from here
         self.last_failure_time = 0
+        self.probe_started = 0.0
+        self._probe_claimed_at = None  # probe_started of the probe this instance handed out
+        self.window = empty_window()
+        self.transitions = {"opened": 0, "half_open": 0, "closed": 0}
+        self.rejected = 0
+        self._calls = deque()  # (timestamp, failed, slow) when the state is local
+        self._lock = threading.Lock()
+        # With a shared store (see breaker_store.py) every worker process sees
+        # the same state; reads are refreshed at most every ``sync_interval`` seconds.
+        self.store = store if name else None
+        self.sync_interval = sync_interval
+        self._synced_at = 0.0
+        self._sync(force=True)
 
-    def record_failure(self):
-        self.failures += 1
-        self.last_failure_time = time.time()
-        if self.failures >= self.failure_threshold:
-            self.state = State.OPEN
-            print(f"Circuit Breaker OPENED (Failures: {self.failures})")
+    def _record(self):
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "failures": self.failures,
+            "last_failure_time": self.last_failure_time,
+            "probe_started": self.probe_started,
+        }
 
-    def record_success(self):
-        if self.state == State.HALF_OPEN:
-            self.state = State.CLOSED
-            self.failures = 0
-            print("Circuit Breaker CLOSED (Recovered)")
-        elif self.state == State.CLOSED:
-            self.failures = 0
+    def _apply(self, row):
+        self.state = State(row["state"])
+        self.failures = row["failures"]
+        self.last_failure_time = row["last_failure_time"]
+        self.probe_started = row.get("probe_started") or 0.0
+        self._synced_at = time.time()
+
+    def _sync(self, force=False):
+        if self.store is None:
+            return
+        if not force and time.time() - self._synced_at < self.sync_interval:
+            return
+        row = self.store.load(self.name)
+        self._apply(row or empty_record(self.name))
+
+    def _transact(self, apply, call=None):
+        """Run ``apply(record, window)`` atomically, after counting ``call`` (failed, slow) if given."""
+        if self.store is not None:
+            record, window = self.store.transact(
+                self.name, apply, call=call, window_s=self.window_s, bucket_s=self.window_s / WINDOW_BUCKETS,
+            )
+            self._apply(record)
+            self.window = window
+            return
+        with self._lock:
+            now = time.time()
+            if call is not None:
+                self._calls.append((now, *call))
+            while self._calls and self._calls[0][0] <= now - self.window_s:
+                self._calls.popleft()
+            window = {
+                "calls": len(self._calls),
+                "failures": sum(1 for _, failed, _ in self._calls if failed),
+                "slow": sum(1 for _, _, slow in self._calls if slow),
+            }
+            record = self._record()
+            apply(record, window)
+            if record.pop("reset_window", False):
+                self._calls.clear()
+                window = empty_window()
+            self._apply(record)
+            self.window = window
+
+    def _trip_reason(self, record, window):
+        if record["failures"] >= self.failure_threshold:
+            return "consecutive_failures"
+        if window["calls"] >= self.min_calls:
+            if window["failures"] / window["calls"] >= self.failure_rate_threshold:
+                return "failure_rate"
+            if self.slow_call_ms and window["slow"] / window["calls"] >= self.slow_call_rate_threshold:
+                return "slow_call_rate"
+        return None
+
+    def _record_call(self, failed, latency_ms):
+        slow = bool(self.slow_call_ms and latency_ms is not None and latency_ms >= self.slow_call_ms)
+        previous = self.state
+        outcome = {}
+
+        def apply(record, window):
+            now = time.time()
+            if failed:
+                record["failures"] += 1
+                record["last_failure_time"] = now
+            else:
+                record["failures"] = 0
+            if record["state"] == State.HALF_OPEN.value:
+                # The probe's verdict (a slow success does not count as recovered)
+                if failed or slow:
+                    outcome["reason"] = "probe_failed" if failed else "probe_slow"
+                    record.update(state=State.OPEN.value, last_failure_time=now, probe_started=0.0)
+                else:
+                    record.update(state=State.CLOSED.value, failures=0, probe_started=0.0, reset_window=True)
+            elif record["state"] == State.CLOSED.value:
+                reason = self._trip_reason(record, window)
+                if reason:
+                    outcome["reason"] = reason
+                    record.update(state=State.OPEN.value, last_failure_time=now, probe_started=0.0)
+
+        self._transact(apply, call=(failed, slow))
+        self._log_transition(previous, outcome.get("reason"))
+
+    def _log_transition(self, previous, reason=None):
+        if self.state == previous:
+            return
+        if self.state == State.OPEN:
+            self.transitions["opened"] += 1
+            log.warning("breaker_opened", breaker=self.name, reason=reason, failures=self.failures, window=self.window)
+        elif self.state == State.HALF_OPEN:
+            self.transitions["half_open"] += 1
+            log.info("breaker_half_open", breaker=self.name)
+        else:
+            self.transitions["closed"] += 1
+            log.info("breaker_closed", breaker=self.name)
+
+    def record_failure(self, latency_ms=None):
+        self._record_call(True, latency_ms)
+
+    def record_success(self, latency_ms=None):
+        self._record_call(False, latency_ms)
+
+    async def record_result(self, failed, latency_ms=None):
+        """``record_failure``/``record_success`` for async callers; the shared store is written off the event loop."""
+        if self.store is None:
+            self._record_call(failed, latency_ms)
+        else:
+            await asyncio.to_thread(self._record_call, failed, latency_ms)
 
     def allow_request(self) -> bool:
+        self._sync()
         if self.state == State.CLOSED:
             return True
-        
-        if self.state == State.OPEN:
-            if time.time() - self.last_failure_time > self.recovery_timeout:
-                self.state = State.HALF_OPEN
-                print("Circuit Breaker HALF_OPEN (Probing)")
-                return True
+        now = time.time()
+        if self.state == State.OPEN and now - self.last_failure_time <= self.recovery_timeout:
+            self.rejected += 1
             return False
-            
+        if self.state == State.HALF_OPEN and now - self.probe_started <= self.probe_timeout:
+            # Someone else's probe is in flight
+            self.rejected += 1
+            return False
+        return self._claim_probe()
+
+    async def allow_request_async(self) -> bool:
+        """``allow_request`` for async callers; the store is only read, and the probe claimed, off the event loop."""
+        fresh = time.time() - self._synced_at < self.sync_interval
+        if self.store is None or (self.state == State.CLOSED and fresh):
+            return self.allow_request()
+        return await asyncio.to_thread(self.allow_request)
+
+    def _claim_probe(self) -> bool:
+        """Hand out the single half-open probe, unless another caller or worker took it first."""
+        previous = self.state
+        claimed = {}
+
+        def apply(record, window):
+            now = time.time()
+            state = record["state"]
+            if state == State.CLOSED.value:
+                claimed["ok"] = True
+            elif (
+                (state == State.OPEN.value and now - record["last_failure_time"] > self.recovery_timeout)
+                or (state == State.HALF_OPEN.value and now - record["probe_started"] > self.probe_timeout)
+            ):
+                record.update(state=State.HALF_OPEN.value, probe_started=now)
+                claimed["ok"] = True
+
+        self._transact(apply)
+        self._log_transition(previous)
         if self.state == State.HALF_OPEN:
-            # Allow one request to probe (simplified: allow all in half-open until success/fail)
-            return True
-            
-        return False
+            self._probe_claimed_at = self.probe_started
+        if not claimed:
+            self.rejected += 1
+        return bool(claimed)
+
+    def holds_probe(self) -> bool:
+        """True right after ``allow_request`` when the admitted call is the half-open probe."""
+        return self.state == State.HALF_OPEN and self.probe_started == self._probe_claimed_at
+
+    def release_probe(self):
+        """Give the probe back without a verdict (e.g. the call was cancelled) so another caller can take it."""
+        claimed_at, self._probe_claimed_at = self._probe_claimed_at, None
+        if claimed_at is None:
+            return
+
+        def apply(record, window):
+            if record["state"] == State.HALF_OPEN.value and record["probe_started"] == claimed_at:
+                record["probe_started"] = 0.0
+
+        self._transact(apply)
+
+    async def release_probe_async(self):
+        """``release_probe`` for async callers; the store transaction runs in a worker thread."""
+        if self.store is None or self._probe_claimed_at is None:
+            self.release_probe()
+        else:
+            await asyncio.to_thread(self.release_probe)
+
+    def snapshot(self):
+        self._sync()
+        calls = self.window["calls"]
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.failures,
+            "window_calls": calls,
+            "failure_rate": round(self.window["failures"] / calls, 3) if calls else None,
+            "slow_call_rate": round(self.window["slow"] / calls, 3) if calls and self.slow_call_ms else None,
+            "probe_in_flight": self.state == State.HALF_OPEN and time.time() - self.probe_started <= self.probe_timeout,
+            "last_failure_time": self.last_failure_time or None,
+            "shared": self.store is not None,
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions),
+        }
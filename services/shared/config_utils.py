@@ -1,6 +1,15 @@
 import yaml
 import os
 
+# The SQLite file the services share, unless DATABASE_PATH points elsewhere
+DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "copilot.db"))
+
+
+def database_path() -> str:
+    """The shared SQLite database: ``DATABASE_PATH`` when set, else data/copilot.db at the repository root."""
+    return os.getenv("DATABASE_PATH") or DEFAULT_DB_PATH
+
+
 def load_config(config_path="config.yaml"):
     # Adjust path if running from a service subdirectory
     if not os.path.exists(config_path):
@@ -8,8 +8,10 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import os
 
+from services.shared.config_utils import database_path
+
 class ConversationMemory:
-    def __init__(self, db_path: str = "data/copilot.db"):
+    def __init__(self, db_path: str = database_path()):
         self.db_path = db_path
         self._init_db()
     
@@ -0,0 +1,97 @@
+"""Request deadlines propagated between services and consumed stage by stage.
+
+The gateway fixes an absolute deadline for each request and forwards it in the
+``X-Request-Deadline`` header (Unix epoch milliseconds). Downstream services
+enter a :func:`deadline_scope` for it. Every outbound call then sizes its
+timeout with :func:`timeout_for`, so a stage can never outlive the caller.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+DEADLINE_HEADER = "X-Request-Deadline"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class ClientDisconnected(Exception):
+    """The caller went away before the response was ready."""
+
+
+def parse_deadline_header(value: Optional[str]) -> Optional[float]:
+    """Epoch-milliseconds header value to epoch seconds; None when absent or malformed."""
+    if not value:
+        return None
+    try:
+        return float(value) / 1000
+    except (TypeError, ValueError):
+        return None
+
+
+def format_deadline(deadline: float) -> str:
+    return str(int(deadline * 1000))
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[Optional[float]]:
+    """Run the block under ``deadline``; an enclosing earlier deadline still wins."""
+    outer = _deadline.get()
+    effective = deadline if outer is None else (outer if deadline is None else min(outer, deadline))
+    token = _deadline.set(effective)
+    try:
+        yield effective
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def timeout_for(default: float, reserve: float = 0.0) -> float:
+    """The stage's own timeout, shortened to the budget left after holding back ``reserve`` seconds."""
+    left = remaining()
+    return default if left is None else max(0.0, min(default, left - reserve))
+
+
+def has_budget(min_seconds: float = 0.0) -> bool:
+    left = remaining()
+    return left is None or left > min_seconds
+
+
+def propagation_headers() -> Dict[str, str]:
+    """Headers that carry the current deadline to a downstream service."""
+    deadline = _deadline.get()
+    return {DEADLINE_HEADER: format_deadline(deadline)} if deadline is not None else {}
+
+
+async def cancel_on_disconnect(
+    awaitable: Awaitable[Any],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: float = 0.25,
+) -> Any:
+    """Await ``awaitable`` but cancel it, raising ClientDisconnected, once the client has gone."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
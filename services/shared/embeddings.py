@@ -0,0 +1,70 @@
+"""Sentence-embedding settings and a shared, lazily loaded encoder.
+
+The indexer and the FAQ matcher must embed with the same model. With a
+multilingual model (e.g. ``paraphrase-multilingual-MiniLM-L12-v2``) questions
+can be searched in the user's language, skipping the translate-first hop.
+Vectors are L2-normalised so distance thresholds mean the same thing across
+models.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from services.shared.structured_logging import get_logger
+
+log = get_logger("embeddings")
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+
+@dataclass
+class EmbeddingSettings:
+    model: str = DEFAULT_MODEL
+    multilingual: bool = False
+    faq_min_similarity: float = 0.8
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "EmbeddingSettings":
+        section = ((config or {}).get("rag", {}) or {}).get("embedding") or {}
+        defaults = cls()
+        return cls(
+            model=str(section.get("model", defaults.model)),
+            multilingual=bool(section.get("multilingual", defaults.multilingual)),
+            faq_min_similarity=float(section.get("faq_min_similarity", defaults.faq_min_similarity)),
+        )
+
+
+class Embedder:
+    """Thin wrapper so callers get normalised float32 vectors regardless of the model."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str]):
+        return self.model.encode(texts, normalize_embeddings=True).astype("float32")
+
+
+_embedders: Dict[str, Optional[Embedder]] = {}
+_embedders_lock = Lock()
+
+
+def get_embedder(model_name: str) -> Optional[Embedder]:
+    """The shared encoder for ``model_name``, or None when it cannot be loaded here."""
+    with _embedders_lock:
+        if model_name not in _embedders:
+            try:
+                _embedders[model_name] = Embedder(model_name)
+                log.info("embedder_loaded", model=model_name)
+            except ImportError:
+                log.warning("embedder_unavailable", model=model_name, reason="sentence-transformers not installed")
+                _embedders[model_name] = None
+            except Exception as exc:
+                log.warning("embedder_unavailable", model=model_name, reason=str(exc))
+                _embedders[model_name] = None
+        return _embedders[model_name]
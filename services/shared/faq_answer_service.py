@@ -1,6 +1,7 @@
 import re
+import threading
 from difflib import SequenceMatcher
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from .faq_repository import FAQRepository
 
@@ -14,16 +15,33 @@ class FAQAnswerService:
         *,
         min_score: float = 0.72,
         max_candidates: int = 50,
+        embedder: Optional[Any] = None,
+        semantic_min_score: float = 0.8,
     ) -> None:
         self.repository = repository or FAQRepository()
         self.min_score = max(0.1, min(0.95, min_score))
         self.max_candidates = max(10, min(max_candidates, 100))
-
-    def find_best_match(self, question: str, *, status: str = "active") -> Optional[Dict[str, Any]]:
+        # Optional multilingual sentence encoder (services.shared.embeddings.Embedder)
+        self.embedder = embedder
+        self.semantic_min_score = semantic_min_score
+        self._question_vectors: Dict[str, Tuple[str, Any]] = {}
+        # (status, repository version) -> FAQs and their stacked question embeddings.
+        # Replaced as a whole, never mutated, so lookups in other threads read it without the lock.
+        self._semantic_index: Optional[Tuple[Tuple[str, int], Tuple[Dict[str, Any], ...], Any]] = None
+        self._semantic_index_lock = threading.Lock()
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.embedder is not None
+
+    def find_best_match(self, question: str, *, status: str = "active", language: str = "en") -> Optional[Dict[str, Any]]:
         if not question:
             return None
 
         normalized_question = question.strip()
+        # Lexical scoring only works against the English FAQ text
+        if language != "en" and self.semantic_enabled:
+            return self._find_semantic_match(normalized_question, status)
         keywords = self._extract_keywords(normalized_question)
 
         candidates = self._fetch_candidates(normalized_question, status)
@@ -53,6 +71,65 @@ class FAQAnswerService:
             return best_match
         return None
 
+    def _find_semantic_match(self, question: str, status: str) -> Optional[Dict[str, Any]]:
+        # numpy comes with the sentence encoder that enables semantic matching
+        import numpy as np
+
+        candidates, matrix = self._semantic_candidates(status)
+        if not candidates:
+            return None
+
+        query_vector = np.asarray(self.embedder.encode([question])[0], dtype=np.float32)
+        scores = matrix @ query_vector  # cosine: vectors are normalised
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < self.semantic_min_score:
+            return None
+        return {"faq": candidates[best], "score": round(score, 4), "matched_tags": [], "method": "semantic"}
+
+    def _semantic_candidates(self, status: str) -> Tuple[Tuple[Dict[str, Any], ...], Any]:
+        """FAQs with ``status`` and their question embeddings stacked into one matrix, rebuilt only when the FAQs change."""
+        import numpy as np
+
+        key = (status, self.repository.version())
+        index = self._semantic_index
+        if index is None or index[0] != key:
+            # Lookups run in worker threads; one of them rebuilds while the others wait for its result
+            with self._semantic_index_lock:
+                index = self._semantic_index
+                if index is None or index[0] != key:
+                    candidates = tuple(self._all_candidates(status))
+                    matrix = None
+                    if candidates:
+                        matrix = np.vstack([
+                            np.asarray(vector, dtype=np.float32) for vector in self._candidate_vectors(candidates)
+                        ])
+                        matrix.flags.writeable = False
+                    index = self._semantic_index = (key, candidates, matrix)
+        return index[1], index[2]
+
+    def _all_candidates(self, status: str) -> List[Dict[str, Any]]:
+        candidates: List[Dict[str, Any]] = []
+        page = 1
+        while True:
+            rows, total = self.repository.list(page=page, page_size=100, status=status)
+            candidates.extend(rows)
+            if not rows or len(candidates) >= total:
+                return candidates
+            page += 1
+
+    def _candidate_vectors(self, candidates: Sequence[Dict[str, Any]]) -> List[Any]:
+        """Question embeddings, re-encoded only for FAQs whose question changed."""
+        stale = [
+            candidate for candidate in candidates
+            if self._question_vectors.get(candidate["id"], (None, None))[0] != candidate.get("question")
+        ]
+        if stale:
+            vectors = self.embedder.encode([candidate.get("question") or "" for candidate in stale])
+            for candidate, vector in zip(stale, vectors):
+                self._question_vectors[candidate["id"]] = (candidate.get("question"), vector)
+        return [self._question_vectors[candidate["id"]][1] for candidate in candidates]
+
     def _fetch_candidates(self, search_term: str, status: str) -> List[Dict[str, Any]]:
         results, _ = self.repository.list(
             search=search_term,
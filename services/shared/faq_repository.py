@@ -6,9 +6,18 @@ import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
-_DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "copilot.db"))
+from services.shared.config_utils import database_path
+
+_DEFAULT_DB_PATH = database_path()
 _ALLOWED_STATUSES = {"active", "draft", "archived"}
 
+# Bumped in the same transaction as every write, so readers in any process can
+# cache FAQs and rebuild derived data only when this changes.
+_BUMP_VERSION_SQL = """
+    INSERT INTO faq_version (id, version) VALUES (1, 1)
+    ON CONFLICT(id) DO UPDATE SET version = version + 1
+"""
+
 
 def _normalize_tags(tags: Optional[List[str]]) -> List[str]:
     if not tags:
@@ -49,6 +58,14 @@ class FAQRepository:
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS faq_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL
+                )
+                """
+            )
 
     def list(
         self,
@@ -96,6 +113,12 @@ class FAQRepository:
 
         return rows, total
 
+    def version(self) -> int:
+        """Counter bumped by every create, update and delete; one primary-key read, cheap enough to check per lookup."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT version FROM faq_version WHERE id = 1").fetchone()
+        return row["version"] if row else 0
+
     def get(self, faq_id: str) -> Optional[Dict[str, Any]]:
         with self._connect() as conn:
             cursor = conn.execute("SELECT * FROM faqs WHERE id = ?", (faq_id,))
@@ -137,6 +160,7 @@ class FAQRepository:
                     now,
                 ),
             )
+            conn.execute(_BUMP_VERSION_SQL)
 
         return self.get(faq_id)
 
@@ -180,13 +204,17 @@ class FAQRepository:
             )
             if cursor.rowcount == 0:
                 return None
+            conn.execute(_BUMP_VERSION_SQL)
 
         return self.get(faq_id)
 
     def delete(self, faq_id: str) -> bool:
         with self._connect() as conn:
             cursor = conn.execute("DELETE FROM faqs WHERE id = ?", (faq_id,))
-            return cursor.rowcount > 0
+            if cursor.rowcount == 0:
+                return False
+            conn.execute(_BUMP_VERSION_SQL)
+            return True
 
     @staticmethod
     def _row_to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
@@ -1,7 +1,8 @@
 import sqlite3
 import os
 
-DB_PATH = "data/copilot.db"
+# Same override as services.shared.config_utils.database_path; this script runs without the package on sys.path
+DB_PATH = os.getenv("DATABASE_PATH") or "data/copilot.db"
 
 
 def init_db():
@@ -13,6 +14,9 @@ def init_db():
     
     # Enable foreign keys
     c.execute("PRAGMA foreign_keys = ON;")
+
+    # WAL lets concurrent orchestrator workers read while another one writes
+    c.execute("PRAGMA journal_mode = WAL;")
     
     # 1. Users
     c.execute('''CREATE TABLE IF NOT EXISTS users (
@@ -8,7 +8,9 @@ import sqlite3
 import threading
 from typing import Any, Dict, List, Optional
 
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "copilot.db"))
+from services.shared.config_utils import database_path
+
+DB_PATH = database_path()
 
 DEFAULT_INTEGRATIONS: List[Dict[str, Any]] = [
     {
@@ -0,0 +1,199 @@
+"""Fast local intent classifier for messages that need neither retrieval nor an LLM.
+
+Chit-chat (greetings, thanks, goodbyes) only matches when the message is
+nothing *but* chit-chat: "hi!" matches, "hi, how do I reset my password?" does
+not. Routing intents such as asking for a human match anywhere in the message,
+unless the phrase is negated ("I don't need to talk to a human").
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+# Words that do not change what a short chit-chat message is asking for
+FILLER_WORDS = {
+    "a", "again", "all", "an", "and", "assistant", "bot", "dear", "everyone", "folks", "guys",
+    "i", "just", "me", "much", "my", "oh", "ok", "okay", "please", "pls", "really", "so",
+    "team", "the", "there", "to", "very", "well", "you", "your",
+}
+
+# A routing phrase preceded by one of these within NEGATION_WINDOW words does not count
+NEGATION_WORDS = {
+    "no", "not", "never", "without", "dont", "don't", "doesnt", "doesn't", "didnt", "didn't",
+    "wont", "won't", "cant", "can't", "shouldnt", "shouldn't", "nor",
+}
+NEGATION_WINDOW = 4
+
+
+@dataclass
+class IntentDefinition:
+    name: str
+    patterns: List[str]
+    response: str
+    standalone: bool = True  # must make up the whole message (chit-chat)
+    escalate: bool = False
+    _regex: Optional["re.Pattern[str]"] = field(default=None, repr=False)
+
+    @property
+    def regex(self) -> "re.Pattern[str]":
+        if self._regex is None:
+            alternatives = "|".join(sorted((re.escape(p) for p in self.patterns), key=len, reverse=True))
+            self._regex = re.compile(rf"\b(?:{alternatives})\b")
+        return self._regex
+
+
+# Earlier entries win when several intents match the same message.
+DEFAULT_INTENTS: List[IntentDefinition] = [
+    IntentDefinition(
+        name="human_agent",
+        patterns=[
+            "talk to a human", "speak to a human", "talk to a person", "speak to a person",
+            "talk to someone", "speak to someone", "real person", "human agent", "live agent",
+            "talk to an agent", "speak to an agent", "customer service representative",
+            "speak with a representative", "talk to a representative", "connect me to support",
+        ],
+        response=(
+            "I'll connect you with a member of our support team. "
+            "Someone will pick up this conversation as soon as possible."
+        ),
+        standalone=False,
+        escalate=True,
+    ),
+    IntentDefinition(
+        name="thanks",
+        patterns=["thank you", "thanks", "thx", "ty", "cheers", "much appreciated", "appreciate it", "that helps", "that helped"],
+        response="You're welcome! Is there anything else I can help you with?",
+    ),
+    IntentDefinition(
+        name="goodbye",
+        patterns=["goodbye", "bye", "bye bye", "see you", "see ya", "have a nice day", "have a good day", "that's all", "that is all"],
+        response="Thanks for chatting with us. Have a great day!",
+    ),
+    IntentDefinition(
+        name="greeting",
+        patterns=["hi", "hello", "hey", "hiya", "howdy", "greetings", "good morning", "good afternoon", "good evening", "how are you"],
+        response="Hello! How can I help you today?",
+    ),
+]
+
+
+@dataclass
+class IntentMatch:
+    intent: str
+    response: str
+    escalate: bool
+    confidence: float
+
+    def report(self) -> Dict[str, Any]:
+        return {"intent": self.intent, "escalate": self.escalate, "confidence": round(self.confidence, 3)}
+
+
+class IntentClassifier:
+    """Keyword classifier with a residual check so real questions are never short-circuited."""
+
+    def __init__(
+        self,
+        intents: Optional[List[IntentDefinition]] = None,
+        enabled: bool = True,
+        max_residual_tokens: int = 0,
+    ):
+        self.intents = intents if intents is not None else DEFAULT_INTENTS
+        self.enabled = enabled
+        self.max_residual_tokens = max_residual_tokens
+        self._stats_lock = Lock()
+        self.evaluated = 0
+        self.matched: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]]) -> "IntentClassifier":
+        section = section or {}
+        responses = section.get("responses") or {}
+        intents = [
+            IntentDefinition(
+                name=intent.name,
+                patterns=intent.patterns,
+                response=responses.get(intent.name, intent.response),
+                standalone=intent.standalone,
+                escalate=intent.escalate,
+            )
+            for intent in DEFAULT_INTENTS
+        ]
+        return cls(
+            intents=intents,
+            enabled=bool(section.get("enabled", True)),
+            max_residual_tokens=int(section.get("max_residual_tokens", 0)),
+        )
+
+    @staticmethod
+    def _negated(text: str, start: int) -> bool:
+        preceding = text[:start].split()[-NEGATION_WINDOW:]
+        return any(token in NEGATION_WORDS for token in preceding)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        text = re.sub(r"[^\w\s']", " ", (text or "").lower())
+        return " ".join(text.split())
+
+    def classify(self, text: str) -> Optional[IntentMatch]:
+        match = self._classify(text) if self.enabled else None
+        with self._stats_lock:
+            self.evaluated += 1
+            if match:
+                self.matched[match.intent] = self.matched.get(match.intent, 0) + 1
+        return match
+
+    def _classify(self, text: str) -> Optional[IntentMatch]:
+        normalized = self._normalize(text)
+        if not normalized:
+            return None
+
+        for intent in self.intents:
+            if intent.standalone:
+                continue
+            if any(not self._negated(normalized, m.start()) for m in intent.regex.finditer(normalized)):
+                return IntentMatch(intent.name, intent.response, intent.escalate, confidence=1.0)
+
+        # Chit-chat: strip every chit-chat phrase, then require nothing meaningful to remain
+        matched: List[IntentDefinition] = []
+        residual = normalized
+        for intent in self.intents:
+            if intent.standalone and intent.regex.search(residual):
+                matched.append(intent)
+                residual = intent.regex.sub(" ", residual)
+        if not matched:
+            return None
+        leftover = [token for token in residual.split() if token not in FILLER_WORDS]
+        if len(leftover) > self.max_residual_tokens:
+            return None
+        best = matched[0]
+        confidence = 1.0 - len(leftover) / max(len(normalized.split()), 1)
+        return IntentMatch(best.name, best.response, best.escalate, confidence=confidence)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            short_circuited = sum(self.matched.values())
+            return {
+                "enabled": self.enabled,
+                "evaluated": self.evaluated,
+                "short_circuited": short_circuited,
+                "short_circuit_rate": round(short_circuited / self.evaluated, 3) if self.evaluated else 0.0,
+                "by_intent": dict(self.matched),
+            }
+
+
+_intent_classifier: Optional[IntentClassifier] = None
+
+
+def get_intent_classifier() -> IntentClassifier:
+    global _intent_classifier
+    if _intent_classifier is None:
+        try:
+            from services.shared.config_utils import load_config
+            section = (load_config().get("chat", {}) or {}).get("intents")
+        except Exception:
+            section = None
+        _intent_classifier = IntentClassifier.from_config(section)
+    return _intent_classifier
@@ -10,6 +10,8 @@ from collections import Counter
 import os
 import json
 
+from services.shared.config_utils import database_path
+
 class KnowledgeGapAnalyzer:
     """
     Analyzes conversation patterns to identify knowledge base gaps:
@@ -19,7 +21,7 @@ class KnowledgeGapAnalyzer:
     - Similar questions with different answers
     """
     
-    def __init__(self, db_path: str = "data/copilot.db", confidence_threshold: float = 0.6):
+    def __init__(self, db_path: str = database_path(), confidence_threshold: float = 0.6):
         self.db_path = db_path
         self.confidence_threshold = confidence_threshold
         self._init_db()
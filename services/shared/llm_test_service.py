@@ -17,9 +17,9 @@ if CHAT_ORCHESTRATOR_PATH not in sys.path:
     sys.path.append(CHAT_ORCHESTRATOR_PATH)
 
 from llm_provider import LLMRouter
-from services.shared.config_utils import load_config
+from services.shared.config_utils import database_path, load_config
 
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "copilot.db"))
+DB_PATH = database_path()
 DEFAULT_TEST_PROMPT = "Health check ping. Respond with the word 'pong'."
 DEFAULT_SYSTEM_PROMPT = (
     "You are a fast LLM diagnostics agent. Respond succinctly with \"pong\" if you can read the prompt."
@@ -4,8 +4,13 @@ import os
 import datetime
 import uuid
 
+from services.shared.structured_logging import get_logger
+from services.shared.config_utils import database_path
+
+log = get_logger("interaction_logger")
+
 class InteractionLogger:
-    def __init__(self, db_path="data/copilot.db"):
+    def __init__(self, db_path=database_path()):
         self.db_path = db_path
         # DB init is handled by init_db.py now, but we ensure dir exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
@@ -25,7 +30,7 @@ class InteractionLogger:
         
         conn.commit()
         conn.close()
-        print(f"Logged interaction {log_id} to DB")
+        log.debug("interaction_logged", log_id=log_id, provider=provider)
 
 # Singleton
 logger = InteractionLogger()
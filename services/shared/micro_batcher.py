@@ -0,0 +1,101 @@
+"""Micro-batching of concurrent async calls into one handler call per batch."""
+
+from __future__ import annotations
+
+import asyncio
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+class MicroBatcher:
+    """
+    Groups items submitted around the same time and hands them to ``handler`` together.
+
+    A batch is dispatched once it holds ``max_batch_size`` items, or
+    ``max_wait_ms`` after its first item arrived, whichever comes first.
+    ``handler`` receives the list of items and returns one entry per item,
+    in the same order. An entry that is an exception is raised to that caller
+    alone; if the handler itself raises, every caller in the batch gets the
+    error. A caller that gives up before its batch is dispatched is left out
+    of it.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 20.0,
+    ):
+        self.handler = handler
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, max_wait_ms / 1000)
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats_lock = Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.full = 0  # batches dispatched because they reached max_batch_size
+        self.abandoned = 0  # callers gone before their batch was dispatched
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_s, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            live = [(item, future) for item, future in batch if not future.done()]
+            with self._stats_lock:
+                self.abandoned += len(batch) - len(live)
+            if not live:
+                continue
+            task = asyncio.ensure_future(self._dispatch(live))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest = max(self.largest, len(batch))
+            if len(batch) >= self.max_batch_size:
+                self.full += 1
+        try:
+            results = await self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch handler returned {len(results)} results for {len(batch)} items")
+        except Exception as exc:
+            results = [exc] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait_s * 1000, 1),
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest,
+                "full_batches": self.full,
+                "abandoned": self.abandoned,
+                "pending": len(self._pending),
+                "dispatching": len(self._tasks),
+            }
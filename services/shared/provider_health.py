@@ -0,0 +1,130 @@
+"""Live per-provider health for adaptive LLM routing.
+
+Fed by the same events ProviderMetrics writes to ``llm_provider_events`` (as a
+listener), kept in memory over a sliding window: EWMA latency of successful
+calls, error rate and average cost. ``rank`` orders providers by a score in
+seconds, lower is better:
+
+    static position * preference_s          (configured order as a quality prior)
+  + EWMA latency                            (or prior_latency_ms without enough samples)
+  + error_weight * error rate
+  + cost_weight * USD per 1k calls
+
+so a degrading provider drops behind its fallbacks before its breaker opens,
+and one that stops receiving traffic falls back to the prior once its window
+empties and gets retried.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from threading import Lock
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class AdaptiveRoutingSettings:
+    enabled: bool = False
+    window_s: float = 300.0
+    min_samples: int = 5
+    ewma_alpha: float = 0.3
+    prior_latency_ms: float = 1500.0
+    preference_s: float = 0.5
+    error_weight: float = 5.0
+    cost_weight: float = 0.0
+
+    @classmethod
+    def from_config(cls, section: Optional[Dict[str, Any]]) -> "AdaptiveRoutingSettings":
+        section = section or {}
+        defaults = cls()
+        return cls(**{
+            name: type(getattr(defaults, name))(section.get(name, getattr(defaults, name)))
+            for name in cls.__dataclass_fields__
+        })
+
+
+class _Window:
+    def __init__(self):
+        self.events: deque = deque()  # (timestamp, success, cost_usd)
+        self.ewma_latency_ms: Optional[float] = None
+
+
+class ProviderHealth:
+    """Sliding-window error rate and cost plus EWMA latency, per provider."""
+
+    def __init__(self, settings: AdaptiveRoutingSettings, clock: Callable[[], float] = time.monotonic):
+        self.settings = settings
+        self._clock = clock
+        self._lock = Lock()
+        self._windows: Dict[str, _Window] = {}
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        """ProviderMetrics listener: one finished provider attempt."""
+        provider = event.get("provider")
+        if not provider:
+            return
+        with self._lock:
+            window = self._windows.setdefault(provider, _Window())
+            now = self._clock()
+            window.events.append((now, bool(event.get("success")), event.get("cost_usd") or 0.0))
+            self._trim(window, now)
+            latency_ms = event.get("latency_ms")
+            if event.get("success") and latency_ms is not None:
+                alpha = self.settings.ewma_alpha
+                previous = window.ewma_latency_ms
+                window.ewma_latency_ms = latency_ms if previous is None else alpha * latency_ms + (1 - alpha) * previous
+
+    def _trim(self, window: _Window, now: float) -> None:
+        while window.events and now - window.events[0][0] > self.settings.window_s:
+            window.events.popleft()
+        if not window.events:
+            window.ewma_latency_ms = None
+
+    def stats(self, provider: str) -> Dict[str, Any]:
+        with self._lock:
+            window = self._windows.get(provider)
+            if window is None:
+                return {"samples": 0, "error_rate": None, "ewma_latency_ms": None, "avg_cost_usd": None}
+            self._trim(window, self._clock())
+            samples = len(window.events)
+            failures = sum(1 for _, success, _ in window.events if not success)
+            return {
+                "samples": samples,
+                "error_rate": failures / samples if samples else None,
+                "ewma_latency_ms": window.ewma_latency_ms,
+                "avg_cost_usd": sum(cost for _, _, cost in window.events) / samples if samples else None,
+            }
+
+    def score(self, provider: str, position: int) -> float:
+        settings = self.settings
+        stats = self.stats(provider)
+        score = position * settings.preference_s
+        if stats["samples"] < settings.min_samples:
+            return score + settings.prior_latency_ms / 1000
+        latency_ms = stats["ewma_latency_ms"] if stats["ewma_latency_ms"] is not None else settings.prior_latency_ms
+        return (
+            score
+            + latency_ms / 1000
+            + settings.error_weight * stats["error_rate"]
+            + settings.cost_weight * stats["avg_cost_usd"] * 1000
+        )
+
+    def rank(self, providers: List[str]) -> List[str]:
+        """``providers`` (in configured order) re-ordered best score first."""
+        scores = {provider: self.score(provider, position) for position, provider in enumerate(providers)}
+        return sorted(providers, key=lambda provider: scores[provider])
+
+    def snapshot(self, providers: List[str]) -> Dict[str, Any]:
+        report = {}
+        for position, provider in enumerate(providers):
+            stats = self.stats(provider)
+            report[provider] = {
+                "samples": stats["samples"],
+                "error_rate": round(stats["error_rate"], 3) if stats["error_rate"] is not None else None,
+                "ewma_latency_ms": round(stats["ewma_latency_ms"], 1) if stats["ewma_latency_ms"] is not None else None,
+                "avg_cost_usd": stats["avg_cost_usd"],
+                "score": round(self.score(provider, position), 3),
+            }
+        return report
@@ -0,0 +1,218 @@
+"""Per-provider pacing for LLM calls: an in-flight cap plus request and token buckets.
+
+Every call takes a slot from its provider's ``ProviderLimiter`` first, so a
+burst is paced below the provider's own 429 limits instead of tripping its
+breaker. A call may wait up to ``queue_timeout_ms`` for a free slot and for the
+RPM and TPM buckets to refill. When the wait would be longer than that,
+``ProviderSaturated`` is raised so the router can overflow to the next
+provider. Saturation is not a provider failure, so it is never recorded
+against the breaker.
+
+Limits live in ``llm.limits`` and can be overridden per provider in
+``llm.providers.<name>.limits``. A zero value means unlimited.
+
+The limiter lives in one process. Configured limits are for the whole
+deployment, so under gunicorn each worker paces itself with its share
+(``per_worker``): the limits divided by ``CHAT_WORKERS``, which
+gunicorn.conf.py exports. Shares are not rebalanced, so an idle worker's
+unused share is not lent to a busy one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, replace
+from threading import Lock
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class ProviderSaturated(Exception):
+    """No capacity within the allowed wait; ``reason`` is ``concurrency``, ``requests`` or ``tokens``."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class ProviderLimitSettings:
+    max_concurrent: int = 0
+    requests_per_minute: float = 0.0
+    tokens_per_minute: float = 0.0
+    queue_timeout_ms: float = 250.0
+
+    @classmethod
+    def from_config(cls, llm_config: Dict[str, Any], provider_name: str) -> "ProviderLimitSettings":
+        section = dict(llm_config.get('limits', {}) or {})
+        section.update((llm_config.get('providers', {}).get(provider_name, {}) or {}).get('limits', {}) or {})
+        defaults = cls()
+        return cls(**{
+            name: type(getattr(defaults, name))(section.get(name, getattr(defaults, name)))
+            for name in cls.__dataclass_fields__
+        })
+
+    @property
+    def queue_timeout_s(self) -> float:
+        return max(0.0, self.queue_timeout_ms / 1000)
+
+    def per_worker(self, workers: int) -> "ProviderLimitSettings":
+        """This process's share when ``workers`` processes call the provider under the same account."""
+        workers = max(1, int(workers))
+        if workers == 1:
+            return self
+        return replace(
+            self,
+            max_concurrent=-(-self.max_concurrent // workers),  # rounded up, so every worker can make a call
+            requests_per_minute=self.requests_per_minute / workers,
+            tokens_per_minute=self.tokens_per_minute / workers,
+        )
+
+
+def serving_workers() -> int:
+    """Worker processes serving the app, as exported by gunicorn.conf.py; 1 when run without it."""
+    try:
+        return max(1, int(os.getenv("CHAT_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+class TokenBucket:
+    """``rate_per_minute`` units refilled continuously; bursts up to one minute's worth."""
+
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.rate_per_s = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.level = rate_per_minute
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate_per_s)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 when it is now)."""
+        self._refill()
+        # A request bigger than the bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate_per_s
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+class ProviderLimiter:
+    """In-flight cap plus RPM/TPM buckets for one provider, with queue-wait statistics."""
+
+    def __init__(self, name: str, settings: ProviderLimitSettings, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.settings = settings
+        self._clock = clock
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._requests = TokenBucket(settings.requests_per_minute, clock) if settings.requests_per_minute > 0 else None
+        self._tokens = TokenBucket(settings.tokens_per_minute, clock) if settings.tokens_per_minute > 0 else None
+        self._stats_lock = Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.acquired = 0
+        self.queued = 0  # acquisitions that had to wait
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.saturated: Dict[str, int] = {"concurrency": 0, "requests": 0, "tokens": 0}
+
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        # Created lazily so the semaphore binds to the serving event loop.
+        if self._semaphore is None and self.settings.max_concurrent > 0:
+            self._semaphore = asyncio.Semaphore(self.settings.max_concurrent)
+        return self._semaphore
+
+    async def acquire(self, tokens: float = 0.0, timeout: Optional[float] = None) -> float:
+        """Take a slot and the bucket capacity for one call; returns seconds spent waiting.
+
+        ``timeout`` can shorten the queue wait (e.g. to a request deadline).
+        Raises ``ProviderSaturated`` when nothing frees up in time. Pair every
+        successful call with ``release``.
+        """
+        max_wait = self.settings.queue_timeout_s if timeout is None else min(self.settings.queue_timeout_s, max(0.0, timeout))
+        started = self._clock()
+        queued = False
+        semaphore = self._get_semaphore()
+        if semaphore is not None:
+            if semaphore.locked():
+                queued = True
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(semaphore.acquire(), timeout=max_wait)
+                except asyncio.TimeoutError:
+                    self._saturated("concurrency")
+                finally:
+                    self.waiting -= 1
+            else:
+                await semaphore.acquire()
+
+        try:
+            while True:
+                waits = [
+                    (bucket.wait_time(amount), reason)
+                    for bucket, amount, reason in ((self._requests, 1, "requests"), (self._tokens, tokens, "tokens"))
+                    if bucket is not None
+                ]
+                wait_s, reason = max(waits, default=(0.0, None))
+                if wait_s <= 0:
+                    break
+                if self._clock() - started + wait_s > max_wait:
+                    self._saturated(reason)
+                queued = True
+                self.waiting += 1
+                try:
+                    await asyncio.sleep(wait_s)
+                finally:
+                    self.waiting -= 1
+            if self._requests is not None:
+                self._requests.take(1)
+            if self._tokens is not None:
+                self._tokens.take(tokens)
+        except BaseException:
+            if semaphore is not None:
+                semaphore.release()
+            raise
+
+        waited = self._clock() - started if queued else 0.0
+        self.in_flight += 1
+        with self._stats_lock:
+            self.acquired += 1
+            if queued:
+                self.queued += 1
+                self.wait_ms_total += waited * 1000
+                self.wait_ms_max = max(self.wait_ms_max, waited * 1000)
+        return waited
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def _saturated(self, reason: str) -> None:
+        with self._stats_lock:
+            self.saturated[reason] += 1
+        raise ProviderSaturated(reason)
+
+    def snapshot(self) -> Dict[str, Any]:
+        settings = self.settings
+        with self._stats_lock:
+            return {
+                "max_concurrent": settings.max_concurrent or None,
+                "requests_per_minute": settings.requests_per_minute or None,
+                "tokens_per_minute": settings.tokens_per_minute or None,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "acquired": self.acquired,
+                "queued": self.queued,
+                "avg_wait_ms": round(self.wait_ms_total / self.acquired, 1) if self.acquired else 0.0,
+                "max_wait_ms": round(self.wait_ms_max, 1),
+                "saturated": dict(self.saturated),
+            }
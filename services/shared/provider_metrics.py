@@ -5,10 +5,13 @@ from __future__ import annotations
 import os
 import sqlite3
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from threading import Lock
 
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "copilot.db"))
+from services.shared.token_usage import TokenUsage
+from services.shared.config_utils import database_path
+
+DB_PATH = database_path()
 
 
 class ProviderMetrics:
@@ -17,6 +20,7 @@ class ProviderMetrics:
 	def __init__(self, db_path: Optional[str] = None):
 		self.db_path = db_path or DB_PATH
 		self._lock = Lock()
+		self._listeners: List[Callable[[Dict[str, Any]], None]] = []
 		os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 		self._ensure_table()
 
@@ -42,8 +46,36 @@ class ProviderMetrics:
 				)
 				"""
 			)
+			# Which tier and model ran, the tokens it used and what they cost
+			existing = {row["name"] for row in conn.execute("PRAGMA table_info(llm_provider_events)").fetchall()}
+			for column, definition in (
+				("model", "TEXT"), ("tier", "TEXT"), ("cost_usd", "REAL"), ("hedge", "INTEGER DEFAULT 0"),
+				("prompt_tokens", "INTEGER"), ("completion_tokens", "INTEGER"), ("cached_tokens", "INTEGER"),
+				("usage_estimated", "INTEGER DEFAULT 0"),
+			):
+				if column not in existing:
+					conn.execute(f"ALTER TABLE llm_provider_events ADD COLUMN {column} {definition}")
 			conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_provider_events_provider ON llm_provider_events(provider)")
 			conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_provider_events_created_at ON llm_provider_events(created_at)")
+			# One row per hedged request: which call was raced against which, and who won
+			conn.execute(
+				"""
+				CREATE TABLE IF NOT EXISTS llm_hedge_events (
+					id INTEGER PRIMARY KEY AUTOINCREMENT,
+					primary_provider TEXT NOT NULL,
+					hedge_provider TEXT NOT NULL,
+					delay_ms REAL,
+					winner TEXT NOT NULL,
+					latency_ms REAL,
+					created_at REAL NOT NULL
+				)
+				"""
+			)
+			conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_hedge_events_created_at ON llm_hedge_events(created_at)")
+
+	def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+		"""Also hand every recorded attempt to ``listener`` (e.g. in-memory routing stats)."""
+		self._listeners.append(listener)
 
 	def record_event(
 		self,
@@ -54,8 +86,16 @@ class ProviderMetrics:
 		fallback_depth: int = 0,
 		request_id: Optional[str] = None,
 		session_id: Optional[str] = None,
+		model: Optional[str] = None,
+		tier: Optional[str] = None,
+		cost_usd: Optional[float] = None,
+		hedge: bool = False,
+		usage: Optional[TokenUsage] = None,
 	) -> None:
-		"""Record a single provider attempt."""
+		"""Record a single provider attempt (``hedge`` marks a call fired to race a slow one).
+
+		``usage`` is what the provider reported, or an estimate when it reported nothing.
+		"""
 		payload = (
 			request_id,
 			session_id,
@@ -65,14 +105,38 @@ class ProviderMetrics:
 			error_message[:500] if error_message else None,
 			fallback_depth,
 			time.time(),
+			model,
+			tier,
+			float(cost_usd) if cost_usd is not None else None,
+			1 if hedge else 0,
+			usage.prompt_tokens if usage else None,
+			usage.completion_tokens if usage else None,
+			usage.cached_tokens if usage else None,
+			1 if usage and usage.estimated else 0,
 		)
+		event = {
+			"provider": provider,
+			"success": success,
+			"latency_ms": latency_ms,
+			"model": model,
+			"tier": tier,
+			"cost_usd": cost_usd,
+			"hedge": hedge,
+			"usage": usage,
+		}
+		for listener in self._listeners:
+			try:
+				listener(event)
+			except Exception:
+				pass
 		with self._lock:
 			with self._connect() as conn:
 				conn.execute(
 					"""
 					INSERT INTO llm_provider_events
-					(request_id, session_id, provider, success, latency_ms, error_message, fallback_depth, created_at)
-					VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+					(request_id, session_id, provider, success, latency_ms, error_message, fallback_depth, created_at, model, tier, cost_usd, hedge,
+					 prompt_tokens, completion_tokens, cached_tokens, usage_estimated)
+					VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 					""",
 					payload,
 				)
@@ -124,6 +188,143 @@ class ProviderMetrics:
 			}
 		}
 
+	def get_tier_summary(self, days: int = 7) -> List[Dict[str, Any]]:
+		"""Attempts, latency and estimated spend per cascade tier."""
+		cutoff = time.time() - (days * 86400)
+		with self._connect() as conn:
+			rows = conn.execute(
+				"""
+				SELECT tier,
+				       provider,
+				       model,
+				       COUNT(*) as attempts,
+				       SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successes,
+				       AVG(latency_ms) as avg_latency,
+				       SUM(COALESCE(cost_usd, 0)) as total_cost
+				FROM llm_provider_events
+				WHERE created_at >= ? AND tier IS NOT NULL
+				GROUP BY tier, provider, model
+				ORDER BY attempts DESC
+				""",
+				(cutoff,),
+			).fetchall()
+		return [
+			{
+				"tier": row["tier"],
+				"provider": row["provider"],
+				"model": row["model"],
+				"attempts": int(row["attempts"] or 0),
+				"successes": int(row["successes"] or 0),
+				"avg_latency_ms": round(row["avg_latency"], 2) if row["avg_latency"] else None,
+				"total_cost_usd": round(row["total_cost"] or 0.0, 6),
+			}
+			for row in rows
+		]
+
+	def get_usage_summary(self, days: int = 7) -> List[Dict[str, Any]]:
+		"""Tokens, generation speed and spend per provider and model.
+
+		``completion_tokens_per_s`` is over successful calls, whole-call latency
+		included. ``cost_per_answer_usd`` spreads the spend on failed attempts
+		over the answers that were delivered.
+		"""
+		cutoff = time.time() - (days * 86400)
+		with self._connect() as conn:
+			rows = conn.execute(
+				"""
+				SELECT provider,
+				       model,
+				       COUNT(*) as attempts,
+				       SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as answers,
+				       SUM(COALESCE(prompt_tokens, 0)) as prompt_tokens,
+				       SUM(COALESCE(completion_tokens, 0)) as completion_tokens,
+				       SUM(COALESCE(cached_tokens, 0)) as cached_tokens,
+				       SUM(CASE WHEN success = 1 THEN COALESCE(completion_tokens, 0) ELSE 0 END) as answer_tokens,
+				       SUM(CASE WHEN success = 1 AND completion_tokens IS NOT NULL THEN latency_ms ELSE 0 END) as answer_ms,
+				       SUM(CASE WHEN prompt_tokens IS NOT NULL AND usage_estimated = 0 THEN 1 ELSE 0 END) as reported,
+				       SUM(COALESCE(cost_usd, 0)) as total_cost
+				FROM llm_provider_events
+				WHERE created_at >= ?
+				GROUP BY provider, model
+				ORDER BY attempts DESC
+				""",
+				(cutoff,),
+			).fetchall()
+
+		usage = []
+		for row in rows:
+			attempts = int(row["attempts"] or 0)
+			answers = int(row["answers"] or 0)
+			prompt_tokens = int(row["prompt_tokens"] or 0)
+			total_cost = row["total_cost"] or 0.0
+			usage.append({
+				"provider": row["provider"],
+				"model": row["model"],
+				"attempts": attempts,
+				"answers": answers,
+				"prompt_tokens": prompt_tokens,
+				"completion_tokens": int(row["completion_tokens"] or 0),
+				"cached_tokens": int(row["cached_tokens"] or 0),
+				"cached_share": round((row["cached_tokens"] or 0) / prompt_tokens, 3) if prompt_tokens else 0.0,
+				"avg_prompt_tokens": round(prompt_tokens / attempts, 1) if attempts else None,
+				"completion_tokens_per_s": round((row["answer_tokens"] or 0) / (row["answer_ms"] / 1000), 1) if row["answer_ms"] else None,
+				"total_cost_usd": round(total_cost, 6),
+				"cost_per_answer_usd": round(total_cost / answers, 6) if answers else None,
+				"reported_share": round((row["reported"] or 0) / attempts, 3) if attempts else 0.0,
+			})
+		return usage
+
+	def record_hedge(
+		self,
+		primary_provider: str,
+		hedge_provider: str,
+		delay_ms: float,
+		winner: str,
+		latency_ms: Optional[float] = None,
+	) -> None:
+		"""Record one hedged request; ``winner`` is "primary", "hedge" or "none"."""
+		with self._lock:
+			with self._connect() as conn:
+				conn.execute(
+					"""
+					INSERT INTO llm_hedge_events (primary_provider, hedge_provider, delay_ms, winner, latency_ms, created_at)
+					VALUES (?, ?, ?, ?, ?, ?)
+					""",
+					(primary_provider, hedge_provider, float(delay_ms), winner, latency_ms, time.time()),
+				)
+
+	def get_hedge_summary(self, days: int = 7) -> List[Dict[str, Any]]:
+		"""Hedges fired and won per primary/hedge pair."""
+		cutoff = time.time() - (days * 86400)
+		with self._connect() as conn:
+			rows = conn.execute(
+				"""
+				SELECT primary_provider,
+				       hedge_provider,
+				       COUNT(*) as hedges,
+				       SUM(CASE WHEN winner = 'hedge' THEN 1 ELSE 0 END) as hedge_wins,
+				       AVG(delay_ms) as avg_delay,
+				       AVG(latency_ms) as avg_latency
+				FROM llm_hedge_events
+				WHERE created_at >= ?
+				GROUP BY primary_provider, hedge_provider
+				ORDER BY hedges DESC
+				""",
+				(cutoff,),
+			).fetchall()
+		return [
+			{
+				"primary_provider": row["primary_provider"],
+				"hedge_provider": row["hedge_provider"],
+				"hedges": int(row["hedges"] or 0),
+				"hedge_wins": int(row["hedge_wins"] or 0),
+				"win_rate": round((row["hedge_wins"] or 0) / row["hedges"], 3) if row["hedges"] else 0.0,
+				"avg_delay_ms": round(row["avg_delay"], 2) if row["avg_delay"] else None,
+				"avg_latency_ms": round(row["avg_latency"], 2) if row["avg_latency"] else None,
+			}
+			for row in rows
+		]
+
 	def get_fallback_distribution(self, days: int = 7) -> List[Dict[str, Any]]:
 		cutoff = time.time() - (days * 86400)
 		with self._connect() as conn:
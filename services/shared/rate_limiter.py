@@ -10,6 +10,11 @@ from collections import defaultdict
 import hashlib
 import os
 
+from services.shared.structured_logging import get_logger
+from services.shared.config_utils import database_path
+
+log = get_logger("rate_limiter")
+
 class RateLimiter:
     """
     Sliding window rate limiter with multiple strategies:
@@ -19,7 +24,7 @@ class RateLimiter:
     - Burst protection
     """
     
-    def __init__(self, db_path: str = "data/copilot.db"):
+    def __init__(self, db_path: str = database_path()):
         self.db_path = db_path
         
         # In-memory cache for performance
@@ -196,7 +201,7 @@ class RateLimiter:
                 ))
                 conn.commit()
         except Exception as e:
-            print(f"Error recording request: {e}")
+            log.error("request_record_failed", error=str(e))
     
     def _cleanup_history(self, api_key: str, now: float):
         """Remove requests older than 24 hours from memory"""
@@ -230,7 +235,7 @@ class RateLimiter:
                 ))
                 conn.commit()
         except Exception as e:
-            print(f"Error logging abuse: {e}")
+            log.error("abuse_log_failed", error=str(e))
     
     def block_entity(
         self,
@@ -268,9 +273,9 @@ class RateLimiter:
                 ))
                 conn.commit()
                 
-                print(f"🚫 Blocked {entity_type}: {entity_value} for {duration_seconds}s - Reason: {reason}")
+                log.warning("entity_blocked", entity_type=entity_type, entity=entity_value, duration_seconds=duration_seconds, reason=reason)
         except Exception as e:
-            print(f"Error blocking entity: {e}")
+            log.error("entity_block_failed", entity_type=entity_type, error=str(e))
     
     def unblock_entity(self, entity_type: str, entity_value: str):
         """Manually unblock an entity"""
@@ -279,7 +284,7 @@ class RateLimiter:
         elif entity_type == "ip" and entity_value in self.blocked_ips:
             del self.blocked_ips[entity_value]
         
-        print(f"✅ Unblocked {entity_type}: {entity_value}")
+        log.info("entity_unblocked", entity_type=entity_type, entity=entity_value)
     
     def get_usage_stats(self, api_key: str, hours: int = 24) -> Dict:
         """Get usage statistics for an API key"""
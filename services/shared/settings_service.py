@@ -8,7 +8,13 @@ import sqlite3
 import threading
 from typing import Any, Dict, Optional
 
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "copilot.db"))
+from services.shared.config_utils import database_path
+
+DB_PATH = database_path()
+
+# Bumped in the same transaction as every write, so readers in any process can
+# cache settings and re-read them only when this changes.
+VERSION_KEY = "_settings_version"
 
 
 class SettingsService:
@@ -61,6 +67,21 @@ class SettingsService:
 					""",
 					(key, stored_value),
 				)
+				conn.execute(
+					"""
+					INSERT INTO system_settings (key, value, updated_at)
+					VALUES (?, '1', CURRENT_TIMESTAMP)
+					ON CONFLICT(key)
+					DO UPDATE SET value = CAST(value AS INTEGER) + 1, updated_at = CURRENT_TIMESTAMP
+					""",
+					(VERSION_KEY,),
+				)
+
+	def version(self) -> int:
+		"""Counter bumped by every ``set``; one indexed read, cheap enough to poll."""
+		with self._connect() as conn:
+			row = conn.execute("SELECT value FROM system_settings WHERE key = ?", (VERSION_KEY,)).fetchone()
+			return int(row["value"]) if row else 0
 
 	def get_many(self, keys: Dict[str, Any]) -> Dict[str, Any]:
 		"""Return multiple settings, falling back to provided defaults."""
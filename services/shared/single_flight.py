@@ -0,0 +1,85 @@
+"""Single-flight coalescing of identical concurrent async computations."""
+
+from __future__ import annotations
+
+import asyncio
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time.
+
+    Callers that arrive while a computation for the same key is in flight wait
+    for it and share its result instead of starting their own. The computation
+    runs in its own task, so one caller giving up does not fail the others; it
+    is only cancelled once every waiter has gone.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._stats_lock = Lock()
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True when another caller's run was reused."""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, k=key, f=flight: self._forget(k, f))
+        self._count(shared)
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+        return result, shared
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved even if every waiter has gone.
+            flight.task.exception()
+
+    def _count(self, shared: bool) -> None:
+        with self._stats_lock:
+            if shared:
+                self.coalesced += 1
+            else:
+                self.started += 1
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            total = self.started + self.coalesced
+            return {
+                "computations": self.started,
+                "coalesced_requests": self.coalesced,
+                "coalesced_rate": round(self.coalesced / total, 3) if total else 0.0,
+                "in_flight": len(self._flights),
+            }
+
+
+def normalize_key(text: Optional[str]) -> str:
+    """Case- and whitespace-insensitive key for question text."""
+    return " ".join((text or "").lower().split())
@@ -0,0 +1,192 @@
+"""Per-request stage timing, in-memory latency histograms and recent-latency windows."""
+
+from __future__ import annotations
+
+import bisect
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Upper bucket bounds in milliseconds; the final bucket is open ended.
+DEFAULT_BUCKETS_MS: List[float] = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+class StageTimer:
+    """Collects how long each stage of a single request took."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stage_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - stage_start) * 1000)
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        # Stages that run more than once (e.g. two translations) accumulate.
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def breakdown(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round(self.total_ms(), 2),
+            "stages": {name: round(value, 2) for name, value in self.stages.items()},
+        }
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram with approximate percentiles."""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.bounds = list(buckets_ms or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.min = value_ms if self.min is None else min(self.min, value_ms)
+        self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        """Estimate a percentile by interpolating inside the matching bucket."""
+        if not self.count:
+            return None
+        target = quantile * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            if cumulative + bucket_count >= target:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else (self.max or lower)
+                fraction = (target - cumulative) / bucket_count
+                estimate = lower + (upper - lower) * fraction
+                return max(self.min or 0.0, min(estimate, self.max or estimate))
+            cumulative += bucket_count
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {f"le_{int(bound)}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else None,
+            "min_ms": round(self.min, 2) if self.min is not None else None,
+            "max_ms": round(self.max, 2) if self.max is not None else None,
+            "p50_ms": _round(self.percentile(0.5)),
+            "p90_ms": _round(self.percentile(0.9)),
+            "p99_ms": _round(self.percentile(0.99)),
+            "buckets": buckets,
+        }
+
+
+class LatencyHistograms:
+    """Thread-safe registry of histograms keyed by stage or provider name."""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.buckets_ms = buckets_ms
+        self._lock = Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram(self.buckets_ms)
+            histogram.observe(value_ms)
+
+    def observe_timer(self, timer: StageTimer, prefix: str = "stage") -> None:
+        for name, value in timer.stages.items():
+            self.observe(f"{prefix}:{name}", value)
+        self.observe(f"{prefix}:total", timer.total_ms())
+
+    def percentile(self, name: str, quantile: float) -> Optional[float]:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return histogram.percentile(quantile) if histogram else None
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return histogram.count if histogram else 0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            grouped: Dict[str, Dict[str, Any]] = {}
+            for name, histogram in sorted(self._histograms.items()):
+                group, _, label = name.partition(":")
+                grouped.setdefault(group, {})[label or group] = histogram.snapshot()
+            return grouped
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+class RecentLatencies:
+    """Latencies of the last ``window_s`` seconds per name, at most ``max_samples`` each.
+
+    Unlike the lifetime histograms, percentiles here follow a provider that
+    slows down or recovers within one window.
+    """
+
+    def __init__(self, window_s: float = 300.0, max_samples: int = 1000, clock: Callable[[], float] = time.monotonic):
+        self.window_s = window_s
+        self.max_samples = max(1, int(max_samples))
+        self._clock = clock
+        self._lock = Lock()
+        self._samples: Dict[str, Deque[Tuple[float, float]]] = {}
+
+    def _trimmed(self, name: str) -> Deque[Tuple[float, float]]:
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.max_samples)
+        cutoff = self._clock() - self.window_s
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return samples
+
+    def observe(self, name: str, value_ms: float) -> None:
+        with self._lock:
+            self._trimmed(name).append((self._clock(), value_ms))
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            return len(self._trimmed(name))
+
+    def percentile(self, name: str, quantile: float) -> Optional[float]:
+        """Nearest-rank percentile of the samples still in the window."""
+        with self._lock:
+            values = sorted(value for _, value in self._trimmed(name))
+        if not values:
+            return None
+        rank = min(len(values), max(1, math.ceil(quantile * len(values))))
+        return values[rank - 1]
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+_latency_histograms: Optional[LatencyHistograms] = None
+
+
+def get_latency_histograms() -> LatencyHistograms:
+    global _latency_histograms
+    if _latency_histograms is None:
+        _latency_histograms = LatencyHistograms()
+    return _latency_histograms
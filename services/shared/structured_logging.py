@@ -0,0 +1,221 @@
+"""Non-blocking structured logging for request hot paths.
+
+Request code logs through :func:`get_logger`, which only puts a record on an
+in-memory queue; a background listener thread formats it as one JSON line and
+writes it to stdout. Levels are configurable per module and high-volume events
+can be sampled so that they do not dominate the output.
+
+Configuration (``system`` section of config.yaml)::
+
+    log_level: "INFO"            # default for every module
+    log_format: "json"           # json | text
+    log_levels:                  # per-module overrides
+      cache: "DEBUG"
+    log_sampling:                # keep this fraction of the named events
+      cache_lookup: 0.1
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
+from typing import Any, Dict, Optional
+
+ROOT_LOGGER = "copilot"
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class JsonFormatter(logging.Formatter):
+    """Renders a record as a single JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + ".") else record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable ``event key=value`` lines for local development."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        rendered = " ".join(f"{key}={value}" for key, value in fields.items())
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if rendered:
+            line = f"{line} {rendered}"
+        if record.exc_info:
+            line = f"{line}\n{self.formatException(record.exc_info)}"
+        return line
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread; only resolve %-args here so
+        # the record no longer references mutable request objects.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredLogger:
+    """Thin wrapper that turns keyword arguments into structured fields.
+
+    ``log.info("cache_lookup", hit=True, sample_rate=0.1)`` emits the event
+    with ``hit`` as a field, keeping roughly one in ten of them. A rate
+    configured under ``system.log_sampling`` for the event takes precedence.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def _log(self, level: int, event: str, exc_info: Any = None, sample_rate: Optional[float] = None, **fields: Any) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        rate = _sampling.get(event, sample_rate)
+        if rate is not None and rate < 1.0:
+            if random.random() >= rate:
+                return
+            fields["sample_rate"] = rate
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self._log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self._log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self._log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self._log(logging.ERROR, event, **fields)
+
+    def exception(self, event: str, **fields: Any) -> None:
+        self._log(logging.ERROR, event, exc_info=True, **fields)
+
+    def is_enabled_for(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+
+class LoggingPipeline:
+    """Owns the queue, the listener thread and the per-module settings."""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, stream=None, queue_size: int = DEFAULT_QUEUE_SIZE):
+        settings = settings or {}
+        self.default_level = _parse_level(settings.get("log_level"), logging.INFO)
+        self.module_levels = {name: _parse_level(level, self.default_level) for name, level in (settings.get("log_levels") or {}).items()}
+        # Loggers handed out earlier keep working after a reconfigure, so
+        # levels live on the logging registry and sampling in a shared dict.
+        for name, level in self.module_levels.items():
+            logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(level)
+        _sampling.clear()
+        _sampling.update({event: float(rate) for event, rate in (settings.get("log_sampling") or {}).items()})
+
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(TextFormatter() if settings.get("log_format") == "text" else JsonFormatter())
+        self.listener = QueueListener(self.queue, output, respect_handler_level=False)
+
+        self.root = logging.getLogger(ROOT_LOGGER)
+        self.root.handlers = [self.handler]
+        self.root.setLevel(self.default_level)
+        self.root.propagate = False
+        self.listener.start()
+        self._running = True
+
+    def get_logger(self, name: str) -> StructuredLogger:
+        return StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{name}"))
+
+    def stop(self) -> None:
+        """Flush queued records and stop the listener thread."""
+        if self._running:
+            self._running = False
+            self.listener.stop()
+        for name in self.module_levels:
+            logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(logging.NOTSET)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "default_level": logging.getLevelName(self.default_level),
+        }
+
+
+def _parse_level(value: Any, default: int) -> int:
+    if value is None:
+        return default
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).upper())
+    return level if isinstance(level, int) else default
+
+
+_sampling: Dict[str, float] = {}
+_pipeline: Optional[LoggingPipeline] = None
+_pipeline_lock = Lock()
+
+
+def configure_logging(settings: Optional[Dict[str, Any]] = None, stream=None) -> LoggingPipeline:
+    """(Re)build the pipeline; ``settings`` is the ``system`` config section."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+        if settings is None:
+            settings = _load_system_settings()
+        _pipeline = LoggingPipeline(settings, stream=stream)
+        return _pipeline
+
+
+def get_logging_pipeline() -> LoggingPipeline:
+    if _pipeline is None:
+        configure_logging()
+    return _pipeline
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Return the structured logger for a module, e.g. ``get_logger("cache")``."""
+    return get_logging_pipeline().get_logger(name)
+
+
+def _load_system_settings() -> Dict[str, Any]:
+    try:
+        from services.shared.config_utils import load_config
+        return (load_config() or {}).get("system", {}) or {}
+    except Exception:
+        return {}
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _pipeline is not None:
+        _pipeline.stop()
@@ -14,12 +14,14 @@ from uuid import uuid4
 
 import requests
 
+from services.shared.config_utils import database_path
+
 try:  # Optional dependency
     from twilio.rest import Client as TwilioClient  # type: ignore
 except Exception:  # pragma: no cover - fallback when Twilio SDK missing
     TwilioClient = None
 
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "copilot.db"))
+DB_PATH = database_path()
 DEFAULT_VOICE_BASE_URL = os.environ.get("VOICE_BASE_URL") or os.environ.get("VOICE_SERVICE_URL") or "http://localhost:8004"
 DEFAULT_TIMEOUT = float(os.environ.get("TELEPHONY_TEST_TIMEOUT", "6"))
 REQUIRED_TWILIO_ENVS = ["TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER"]
@@ -0,0 +1,145 @@
+"""Token usage of LLM calls, and what it costs.
+
+Providers parse the usage their API reports (prompt, completion and cached
+prompt tokens) and hand it to :func:`report_usage`. The router collects it
+with :func:`capture_usage` around each call, so ``generate_response`` can keep
+returning plain text. When a provider reports nothing, the router estimates
+from text length at ``CHARS_PER_TOKEN``, and the usage is marked
+``estimated``.
+
+Prices come from ``llm.pricing`` in USD per million tokens, keyed by model
+name, with a provider name as the catch-all for its models.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# Rough average for English text with the BPE tokenizers the hosted models use
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(*texts: Optional[str]) -> float:
+    """Tokens in ``texts`` at ~``CHARS_PER_TOKEN`` characters each, for budgets made before a call."""
+    return sum(len(text or "") for text in texts) / CHARS_PER_TOKEN
+
+
+@dataclass
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # the part of prompt_tokens served from the provider's prompt cache
+    estimated: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @classmethod
+    def estimate(cls, prompt_texts: Iterable[Optional[str]], completion_texts: Iterable[Optional[str]] = ()) -> "TokenUsage":
+        return cls(
+            prompt_tokens=round(estimate_tokens(*prompt_texts)),
+            completion_tokens=round(estimate_tokens(*completion_texts)),
+            estimated=True,
+        )
+
+
+def openai_usage(body: Dict[str, Any]) -> Optional[TokenUsage]:
+    """``usage`` of an OpenAI-compatible response or final stream chunk (Groq streams put it under ``x_groq``)."""
+    usage = body.get('usage') or (body.get('x_groq') or {}).get('usage')
+    if not usage:
+        return None
+    details = usage.get('prompt_tokens_details') or {}
+    return TokenUsage(
+        prompt_tokens=int(usage.get('prompt_tokens') or 0),
+        completion_tokens=int(usage.get('completion_tokens') or 0),
+        cached_tokens=int(details.get('cached_tokens') or 0),
+    )
+
+
+def gemini_usage(body: Dict[str, Any]) -> Optional[TokenUsage]:
+    """``usageMetadata`` of a Gemini response; thinking tokens are billed as output, so they count as completion."""
+    usage = body.get('usageMetadata')
+    if not usage:
+        return None
+    return TokenUsage(
+        prompt_tokens=int(usage.get('promptTokenCount') or 0),
+        completion_tokens=int(usage.get('candidatesTokenCount') or 0) + int(usage.get('thoughtsTokenCount') or 0),
+        cached_tokens=int(usage.get('cachedContentTokenCount') or 0),
+    )
+
+
+class UsageCapture:
+    """Receives the usage reported by the provider call it was opened around."""
+
+    def __init__(self):
+        self.usage: Optional[TokenUsage] = None
+
+
+_capture: ContextVar[Optional[UsageCapture]] = ContextVar("token_usage_capture", default=None)
+
+
+@contextmanager
+def capture_usage(capture: Optional[UsageCapture] = None) -> Iterator[UsageCapture]:
+    """Collect usage reported inside the block; pass ``capture`` to keep adding to an earlier one (e.g. per stream chunk)."""
+    capture = capture or UsageCapture()
+    token = _capture.set(capture)
+    try:
+        yield capture
+    finally:
+        _capture.reset(token)
+
+
+def report_usage(usage: Optional[TokenUsage]) -> None:
+    """Called by providers once they know a call's usage; a no-op outside ``capture_usage``."""
+    capture = _capture.get()
+    if capture is not None and usage is not None:
+        capture.usage = usage
+
+
+@dataclass
+class ModelPrice:
+    """USD per million tokens."""
+    input: float = 0.0
+    output: float = 0.0
+    cached_input: Optional[float] = None  # defaults to the input price
+
+    def cost(self, usage: TokenUsage) -> float:
+        cached = min(usage.cached_tokens, usage.prompt_tokens)
+        cached_price = self.input if self.cached_input is None else self.cached_input
+        return (
+            (usage.prompt_tokens - cached) * self.input
+            + cached * cached_price
+            + usage.completion_tokens * self.output
+        ) / 1_000_000
+
+
+class PriceTable:
+    """``llm.pricing``: prices by model name, or by provider name for all of its models."""
+
+    def __init__(self, prices: Optional[Dict[str, ModelPrice]] = None):
+        self.prices = prices or {}
+
+    @classmethod
+    def from_config(cls, llm_config: Dict[str, Any]) -> "PriceTable":
+        prices = {}
+        for key, section in (llm_config.get('pricing', {}) or {}).items():
+            section = section or {}
+            cached = section.get('cached_input')
+            prices[str(key)] = ModelPrice(
+                input=float(section.get('input', 0.0)),
+                output=float(section.get('output', 0.0)),
+                cached_input=float(cached) if cached is not None else None,
+            )
+        return cls(prices)
+
+    def price_for(self, provider: str, model: Optional[str]) -> Optional[ModelPrice]:
+        return self.prices.get(model or "") or self.prices.get(provider)
+
+    def cost(self, provider: str, model: Optional[str], usage: TokenUsage) -> Optional[float]:
+        """USD for ``usage``, or None when neither the model nor the provider has a price."""
+        price = self.price_for(provider, model)
+        return price.cost(usage) if price is not None else None
@@ -15,6 +15,11 @@ import sqlite3
 from datetime import datetime, timedelta
 import hashlib
 
+from services.shared.config_utils import database_path
+from services.shared.structured_logging import get_logger
+
+log = get_logger("translation_service")
+
 class TranslationService:
     """
     Handles language detection and translation for customer service interactions.
@@ -49,7 +54,7 @@ class TranslationService:
         'el': 'Greek'
     }
     
-    def __init__(self, db_path: str = "data/copilot.db", api_key: Optional[str] = None):
+    def __init__(self, db_path: str = database_path(), api_key: Optional[str] = None):
         """
         Initialize translation service.
         
@@ -224,7 +229,9 @@ class TranslationService:
                 - translated_text: Translated text
                 - source_lang: Detected/specified source language
                 - target_lang: Target language
-                - method: Translation method used
+                - method: Translation method used ('none' when no translation
+                  was needed, 'error' when the backend failed and
+                  translated_text is the original text with an error marker)
                 - cached: Whether result was from cache
         """
         if not text or not text.strip():
@@ -262,7 +269,16 @@ class TranslationService:
             }
         
         # Perform translation
-        translated_text = self._perform_translation(text, source_lang, target_lang)
+        translated_text, translated = self._perform_translation(text, source_lang, target_lang)
+        if not translated:
+            # Never cache the fallback text; the next request retries the backend
+            return {
+                'translated_text': translated_text,
+                'source_lang': source_lang,
+                'target_lang': target_lang,
+                'method': 'error',
+                'cached': False
+            }
         
         # Cache the result
         self._cache_translation(text, source_lang, target_lang, translated_text)
@@ -279,7 +295,95 @@ class TranslationService:
             'cached': False
         }
     
-    def _perform_translation(self, text: str, source_lang: str, target_lang: str) -> str:
+    def translate_batch(
+        self,
+        texts: List[str],
+        target_lang: str,
+        source_lang: str
+    ) -> List[Dict[str, any]]:
+        """
+        Translate many texts sharing one language pair.
+        
+        Cached texts are served from the translation cache; the remainder go to
+        the backend in a single batched call where the backend supports it.
+        
+        Args:
+            texts: Texts to translate
+            target_lang: Target language code
+            source_lang: Source language code
+            
+        Returns:
+            One result dict per input text, in order (same shape as translate())
+        """
+        results: List[Optional[Dict[str, any]]] = [None] * len(texts)
+        pending: List[int] = []
+        
+        for index, text in enumerate(texts):
+            if not text or not text.strip() or source_lang == target_lang:
+                results[index] = {
+                    'translated_text': text,
+                    'source_lang': source_lang,
+                    'target_lang': target_lang,
+                    'method': 'none',
+                    'cached': False
+                }
+                continue
+            cached_result = self._get_cached_translation(text, source_lang, target_lang)
+            if cached_result:
+                results[index] = {
+                    'translated_text': cached_result,
+                    'source_lang': source_lang,
+                    'target_lang': target_lang,
+                    'method': self.translation_method,
+                    'cached': True
+                }
+            else:
+                pending.append(index)
+        
+        if pending:
+            translations = self._perform_batch_translation(
+                [texts[index] for index in pending], source_lang, target_lang
+            )
+            succeeded = 0
+            for index, (translated_text, translated) in zip(pending, translations):
+                if translated:
+                    self._cache_translation(texts[index], source_lang, target_lang, translated_text)
+                    succeeded += 1
+                results[index] = {
+                    'translated_text': translated_text,
+                    'source_lang': source_lang,
+                    'target_lang': target_lang,
+                    'method': self.translation_method if translated else 'error',
+                    'cached': False
+                }
+            if succeeded:
+                self._update_language_stats(source_lang, translation_count=succeeded)
+                self._update_language_stats(target_lang, translation_count=succeeded)
+        
+        return results
+    
+    def _perform_batch_translation(
+        self, texts: List[str], source_lang: str, target_lang: str
+    ) -> List[Tuple[str, bool]]:
+        """Translate several texts in one backend call, falling back to one call per text.
+        
+        Returns one ``(text, translated)`` pair per input, like _perform_translation().
+        """
+        try:
+            if self.translation_method == 'googletrans':
+                results = self.translator.translate(texts, src=source_lang, dest=target_lang)
+                return [(result.text, True) for result in results]
+            
+            elif self.translation_method == 'deep_translator':
+                translator = self.translator(source=source_lang, target=target_lang)
+                return [(text, True) for text in translator.translate_batch(texts)]
+        
+        except Exception as e:
+            log.warning("batch_translation_failed", source_lang=source_lang, target_lang=target_lang, error=str(e))
+        
+        return [self._perform_translation(text, source_lang, target_lang) for text in texts]
+    
+    def _perform_translation(self, text: str, source_lang: str, target_lang: str) -> Tuple[str, bool]:
         """
         Perform actual translation using available backend.
         
@@ -289,26 +393,28 @@ class TranslationService:
             target_lang: Target language code
             
         Returns:
-            Translated text
+            (text, translated): the translated text, or the original text with
+            a warning marker and ``translated=False`` when no backend could
+            translate it
         """
         if not self.translator:
             # No translator available, return original text with warning
-            return f"[Translation unavailable: {source_lang} → {target_lang}] {text}"
+            return f"[Translation unavailable: {source_lang} → {target_lang}] {text}", False
         
         try:
             if self.translation_method == 'googletrans':
                 result = self.translator.translate(text, src=source_lang, dest=target_lang)
-                return result.text
+                return result.text, True
             
             elif self.translation_method == 'deep_translator':
                 translator = self.translator(source=source_lang, target=target_lang)
-                return translator.translate(text)
+                return translator.translate(text), True
             
         except Exception as e:
             print(f"Translation error ({source_lang} → {target_lang}): {e}")
-            return f"[Translation error] {text}"
+            return f"[Translation error] {text}", False
         
-        return text
+        return text, False
     
     def _get_cached_translation(
         self,
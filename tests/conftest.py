@@ -0,0 +1,22 @@
+"""Point the services' shared SQLite database at a scratch file, so test runs never write to data/."""
+
+import atexit
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="copilot-tests-")
+atexit.register(shutil.rmtree, _db_dir, ignore_errors=True)
+os.environ["DATABASE_PATH"] = os.path.join(_db_dir, "copilot.db")
+
+# Create the schema init_db.py sets up for a deployment (interaction and RAG logs, users, ...)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from services.shared import init_db  # noqa: E402
+from services.shared.knowledge_gap_analyzer import KnowledgeGapAnalyzer  # noqa: E402
+
+KnowledgeGapAnalyzer()  # creates unanswered_questions, which init_db only migrates
+with contextlib.redirect_stdout(io.StringIO()):
+    init_db.init_db()
@@ -0,0 +1,869 @@
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import httpx
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CHAT_ORCHESTRATOR_PATH = os.path.join(PROJECT_ROOT, 'services', 'chat-orchestrator')
+for path in (PROJECT_ROOT, CHAT_ORCHESTRATOR_PATH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import llm_provider
+from extractive import ExtractiveAnswerer, ExtractiveSettings
+from llm_provider import HedgeBudget, LLMProvider, LLMRouter, LocalBatchSettings, batch_generation
+from services.shared.circuit_breaker import CircuitBreaker
+from services.shared.settings_service import SettingsService
+from services.shared.stage_timing import LatencyHistograms
+from services.shared.translation_service import TranslationService
+from services.shared.token_usage import ModelPrice, PriceTable, TokenUsage, capture_usage, report_usage
+from prompt_builder import PromptBuilder, TokenCounter
+from speculation import SpeculationStats, SpeculativeTask
+
+
+class SpeculativeTaskTestCase(unittest.TestCase):
+    def test_reused_result_credits_saved_time(self):
+        stats = SpeculationStats()
+
+        async def scenario():
+            async def search():
+                await asyncio.sleep(0.01)
+                return ["chunk"]
+
+            task = SpeculativeTask(search(), stats)
+            await asyncio.sleep(0.02)  # simulated FAQ lookup
+            return await task.result()
+
+        self.assertEqual(asyncio.run(scenario()), ["chunk"])
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["reused"], 1)
+        self.assertEqual(snapshot["cancelled"], 0)
+        self.assertGreater(snapshot["saved_ms_total"], 5)
+
+    def test_cancel_records_wasted_work(self):
+        stats = SpeculationStats()
+
+        async def scenario():
+            task = SpeculativeTask(asyncio.sleep(1), stats)
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.sleep(0)
+            return task.task.cancelled()
+
+        self.assertTrue(asyncio.run(scenario()))
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["launched"], 1)
+        self.assertEqual(snapshot["cancelled"], 1)
+        self.assertGreater(snapshot["wasted_ms_total"], 0)
+
+    def test_cancel_after_use_is_a_no_op(self):
+        stats = SpeculationStats()
+
+        async def scenario():
+            task = SpeculativeTask(asyncio.sleep(0, result=["chunk"]), stats)
+            result = await task.result()
+            task.cancel()
+            return result
+
+        self.assertEqual(asyncio.run(scenario()), ["chunk"])
+        self.assertEqual((stats.snapshot()["reused"], stats.snapshot()["cancelled"]), (1, 0))
+
+
+def _rag_result(doc_id, text, score):
+    return {
+        "chunk": {"text": text, "metadata": {"id": doc_id, "title": doc_id, "section": "FAQ"}},
+        "score": score,
+    }
+
+
+class PromptBuilderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.builder = PromptBuilder(TokenCounter())
+        self.history = [
+            {"role": "user", "content": "old question " * 40},
+            {"role": "assistant", "content": "old answer " * 40},
+            {"role": "user", "content": "recent question"},
+        ]
+        self.results = [
+            _rag_result("weak", "loosely related text " * 60, 0.9),
+            _rag_result("best", "exact answer text " * 10, 0.1),
+        ]
+
+    def test_everything_fits_in_generous_budget(self):
+        built = self.builder.build("How?", "Be helpful.", self.history, self.results, budget_tokens=10000)
+        self.assertEqual(built.history_used, 3)
+        self.assertEqual([r["chunk"]["metadata"]["id"] for r in built.rag_results], ["best", "weak"])
+        self.assertIn("Previous conversation:", built.prompt)
+        self.assertLessEqual(built.prompt_tokens, 10000)
+
+    def test_tight_budget_trims_history_then_weak_chunks(self):
+        built = self.builder.build("How?", "Be helpful.", self.history, self.results, budget_tokens=200)
+        self.assertLessEqual(built.prompt_tokens, 200)
+        self.assertEqual(built.history_used, 0)
+        self.assertEqual(built.rag_results[0]["chunk"]["metadata"]["id"], "best")
+        self.assertGreaterEqual(built.chunks_dropped + built.chunks_truncated, 1)
+        self.assertTrue(built.prompt.endswith("User Question: How?"))
+
+    def test_oldest_history_goes_first(self):
+        built = self.builder.build("How?", "Be helpful.", self.history, self.results[1:], budget_tokens=150)
+        self.assertEqual(built.history_dropped, 2)
+        self.assertIn("recent question", built.prompt)
+        self.assertNotIn("old question", built.prompt)
+
+
+def _faq_result(doc_id, title, content, score, section="Returns & Refunds"):
+    return {
+        "chunk": {
+            "text": f"{title}\n{content}",
+            "metadata": {"id": doc_id, "title": title, "section": section, "content": content},
+        },
+        "score": score,
+    }
+
+
+class ExtractiveAnswererTestCase(unittest.TestCase):
+    def setUp(self):
+        self.answerer = ExtractiveAnswerer(ExtractiveSettings(enabled=True, max_score=0.2, min_margin=0.1))
+        self.returns = _faq_result(
+            "faq-003", "Can I return an item?",
+            "Yes, items can be returned within 30 days of delivery for a full refund.", 0.05,
+        )
+        self.shipping = _faq_result(
+            "faq-002", "What are the shipping costs?",
+            "Shipping is free for orders over $50.", 0.6, section="Shipping & Delivery",
+        )
+
+    def test_clear_faq_match_is_returned_verbatim(self):
+        decision = self.answerer.evaluate([self.shipping, self.returns])
+        self.assertTrue(decision.accepted)
+        self.assertEqual(decision.result["chunk"]["metadata"]["id"], "faq-003")
+        self.assertTrue(decision.answer_text.startswith("Yes, items can be returned"))
+
+    def test_weak_or_ambiguous_retrieval_goes_to_the_llm(self):
+        weak = dict(self.returns, score=0.3)
+        self.assertEqual(self.answerer.evaluate([weak]).reason, "score_above_threshold")
+        close = dict(self.shipping, score=0.1)
+        self.assertEqual(self.answerer.evaluate([self.returns, close]).reason, "ambiguous")
+        self.assertEqual(self.answerer.evaluate([self.returns], has_history=True).reason, "follow_up")
+
+    def test_document_excerpts_are_not_self_contained(self):
+        excerpt = _faq_result(
+            "manual.pdf-4", "Excerpt from manual.pdf",
+            "This applies to all orders placed through the web store.", 0.01, section="Document",
+        )
+        self.assertEqual(self.answerer.evaluate([excerpt]).reason, "not_self_contained")
+        snapshot = self.answerer.snapshot()
+        self.assertEqual(snapshot["accepted"], 0)
+        self.assertEqual(snapshot["decisions"]["not_self_contained"], 1)
+
+
+class _ScriptedProvider(LLMProvider):
+    def __init__(self, answer=None, error=None, delay=0.0):
+        self.answer = answer
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_response(self, prompt, system_instruction):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+class _MeteredProvider(_ScriptedProvider):
+    def __init__(self, answer, usage):
+        super().__init__(answer)
+        self.usage = usage
+
+    async def generate_response(self, prompt, system_instruction):
+        answer = await super().generate_response(prompt, system_instruction)
+        report_usage(self.usage)
+        return answer
+
+
+class CascadeRouterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.router = LLMRouter.__new__(LLMRouter)
+        self.router.config = {
+            "llm": {
+                "providers": {
+                    "groq": {"api_key_env": "GROQ_API_KEY", "model": "llama-3.1-8b-instant"},
+                    "gemini": {"api_key_env": "GEMINI_KEY", "model": "gemini-2.5-flash"},
+                },
+                "cascade": {
+                    "enabled": True,
+                    "min_retrieval_confidence": 0.5,
+                    "tiers": [
+                        {"name": "fast", "provider": "groq", "model": "llama-3.1-8b-instant", "cost_per_1k_tokens": 0.0001},
+                        {"name": "strong", "provider": "gemini", "cost_per_1k_tokens": 0.001},
+                    ],
+                },
+            }
+        }
+        self.router.providers = {"groq": _ScriptedProvider("x"), "gemini": _ScriptedProvider("x")}
+        self.router.breakers = {name: CircuitBreaker(name=name) for name in self.router.providers}
+        self.router.limiters = {}
+        self.router._init_pricing()
+        self.router.http_clients = {}
+        self.router._init_cascade()
+        self.router._init_hedging()
+        self.router._refresh_runtime_preferences = lambda: None
+        self.router.routing_plan = ["groq", "gemini"]
+        self.fast = self.router.cascade_tiers[0].provider = _ScriptedProvider("Returns are accepted for 30 days.")
+        self.strong = self.router.cascade_tiers[1].provider = _ScriptedProvider("Strong answer.")
+        patcher = mock.patch.object(llm_provider, "provider_metrics")
+        self.metrics = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router._init_adaptive_routing()
+
+    def _generate(self, retrieval_confidence=1.0):
+        return asyncio.run(self.router.generate_answer("prompt", "system", retrieval_confidence=retrieval_confidence))
+
+    def test_confident_cheap_answer_is_served_by_first_tier(self):
+        result = self._generate()
+        self.assertEqual((result["tier"], result["model"]), ("fast", "llama-3.1-8b-instant"))
+        self.assertEqual(self.strong.calls, 0)
+        recorded = self.metrics.record_event.call_args.kwargs
+        self.assertEqual(recorded["tier"], "fast")
+        self.assertGreater(recorded["cost_usd"], 0)
+
+    def test_reported_usage_is_recorded_and_priced_per_model(self):
+        self.router.prices = PriceTable({"llama-3.1-8b-instant": ModelPrice(input=0.05, output=0.08)})
+        self.router.cascade_tiers[0].provider = _MeteredProvider("Returns are accepted for 30 days.", TokenUsage(2000, 500, 1000))
+        self._generate()
+        recorded = self.metrics.record_event.call_args.kwargs
+        self.assertEqual(recorded["usage"], TokenUsage(2000, 500, 1000))
+        self.assertAlmostEqual(recorded["cost_usd"], (2000 * 0.05 + 500 * 0.08) / 1_000_000)
+
+    def test_unreported_usage_is_estimated(self):
+        self._generate()
+        usage = self.metrics.record_event.call_args.kwargs["usage"]
+        self.assertTrue(usage.estimated)
+        self.assertEqual(usage.completion_tokens, round(len("Returns are accepted for 30 days.") / 4))
+
+    def test_uncertain_answer_escalates(self):
+        self.fast.answer = "I don't have enough information to answer that."
+        result = self._generate()
+        self.assertEqual((result["tier"], result["escalation"]), ("strong", "uncertain_answer"))
+        self.assertEqual(self.router.cascade_snapshot()["escalations"], {"uncertain_answer": 1})
+
+    def test_low_retrieval_confidence_skips_cheap_tier(self):
+        result = self._generate(retrieval_confidence=0.2)
+        self.assertEqual(result["tier"], "strong")
+        self.assertEqual(self.fast.calls, 0)
+
+    def test_failed_tiers_fall_back_to_routing_plan(self):
+        self.fast.error = self.strong.error = RuntimeError("down")
+        self.router.providers["groq"].answer = "Routed answer."
+        result = self._generate()
+        self.assertEqual(result["provider"], "groq")
+        self.assertEqual(result["answer"], "Routed answer.")
+        self.assertNotIn("tier", result)
+
+
+class HedgedRouterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.router = LLMRouter.__new__(LLMRouter)
+        self.router.config = {
+            "llm": {
+                "providers": {"groq": {"model": "llama"}, "gemini": {"model": "flash"}},
+                "hedging": {"enabled": True, "min_samples": 5, "min_delay_ms": 20, "max_ratio": 1.0},
+            }
+        }
+        self.router.providers = {"groq": _ScriptedProvider("primary"), "gemini": _ScriptedProvider("backup", delay=0.01)}
+        self.router.breakers = {name: CircuitBreaker(name=name) for name in self.router.providers}
+        self.router.limiters = {}
+        self.router._init_pricing()
+        self.router.cascade_enabled = False
+        self.router.cascade_tiers = []
+        self.router._init_hedging()
+        self.router._refresh_runtime_preferences = lambda: None
+        self.router.routing_plan = ["groq", "gemini"]
+
+        for _ in range(10):
+            self.router.hedge_latencies.observe("provider:groq", 25)
+        for name, value in (("provider_metrics", mock.MagicMock()), ("latency_histograms", LatencyHistograms())):
+            patcher = mock.patch.object(llm_provider, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.metrics = llm_provider.provider_metrics
+        self.router._init_adaptive_routing()
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        self.router.providers["groq"].delay = 1.0
+        result = asyncio.run(self.router.generate_answer("prompt", "system"))
+
+        self.assertEqual(result["provider"], "gemini")
+        self.assertTrue(result["hedged"])
+        self.assertEqual(self.router.providers["groq"].cancelled, 1)
+        self.assertEqual(self.router.hedging_snapshot()["won"], 1)
+        self.metrics.record_hedge.assert_called_once()
+        self.assertEqual(self.metrics.record_hedge.call_args.kwargs["winner"], "hedge")
+        # The cancelled call is neither a success nor a failure of the primary
+        self.assertEqual([c.kwargs["provider"] for c in self.metrics.record_event.call_args_list], ["gemini"])
+        self.assertEqual(self.router.breakers["groq"].failures, 0)
+
+    def test_fast_primary_is_not_hedged(self):
+        result = asyncio.run(self.router.generate_answer("prompt", "system"))
+        self.assertEqual(result["provider"], "groq")
+        self.assertNotIn("hedged", result)
+        self.assertEqual(self.router.providers["gemini"].calls, 0)
+        self.assertEqual(self.router.hedging_snapshot()["fired"], 0)
+
+    def test_plan_resumes_after_a_hedge_that_skipped_an_open_provider(self):
+        self.router.providers = {
+            "groq": _ScriptedProvider(error=RuntimeError("503"), delay=0.1),
+            "gemini": _ScriptedProvider("unused"),
+            "openai": _ScriptedProvider(error=RuntimeError("503")),
+        }
+        self.router.breakers = {name: CircuitBreaker(name=name, failure_threshold=1) for name in self.router.providers}
+        self.router.breakers["gemini"].record_failure()
+        self.router.routing_plan = ["groq", "gemini", "openai"]
+        self.router._init_adaptive_routing()
+
+        result = asyncio.run(self.router.generate_answer("prompt", "system"))
+
+        self.assertFalse(result["success"])
+        self.assertEqual(self.router.hedging_snapshot()["both_failed"], 1)
+        # openai was the hedge; it must not be called a second time as the "next" provider
+        self.assertEqual(self.router.providers["openai"].calls, 1)
+        self.assertEqual(self.router.providers["gemini"].calls, 0)
+
+    def test_probe_is_returned_when_cancelled_while_queued_for_a_slot(self):
+        self.router.config["llm"]["limits"] = {"max_concurrent": 1, "queue_timeout_ms": 5000}
+        breaker = self.router.breakers["groq"] = CircuitBreaker(name="groq", failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure()
+
+        async def scenario():
+            await self.router._limiter("groq").acquire()  # the only slot is busy
+            attempt = asyncio.ensure_future(self.router._attempt(
+                "groq", self.router.providers["groq"], "prompt", "system", attempt_index=0, reserve_s=0,
+            ))
+            await asyncio.sleep(0.01)
+            self.assertTrue(breaker.holds_probe())
+            attempt.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await attempt
+
+        asyncio.run(scenario())
+        self.assertFalse(breaker.holds_probe())
+        self.assertTrue(breaker.allow_request())  # the next caller can probe
+
+    def test_hedge_threshold_follows_recent_latency(self):
+        now = [0.0]
+        self.router.hedge_latencies = llm_provider.RecentLatencies(window_s=60, clock=lambda: now[0])
+        for _ in range(10):
+            self.router.hedge_latencies.observe("provider:groq", 2000)
+        candidate = llm_provider._Candidate("groq", self.router.providers["groq"], attempt_index=0)
+        self.assertEqual(self.router.hedge_delay(candidate), 2.0)
+
+        # The slow spell has left the window; the provider is fast again
+        now[0] = 120.0
+        self.assertIsNone(self.router.hedge_delay(candidate))
+        for _ in range(10):
+            self.router.hedge_latencies.observe("provider:groq", 40)
+        self.assertEqual(self.router.hedge_delay(candidate), 0.04)
+
+    def test_hedge_budget_caps_the_hedge_rate(self):
+        now = [0.0]
+        budget = HedgeBudget(max_ratio=0.25, window_s=10, clock=lambda: now[0])
+        for _ in range(4):
+            budget.record_request()
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+        now[0] = 11.0  # the window slides past the earlier requests
+        for _ in range(4):
+            budget.record_request()
+        self.assertTrue(budget.try_acquire())
+
+
+class AdaptiveRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.router = LLMRouter.__new__(LLMRouter)
+        self.router.config = {"llm": {"providers": {"groq": {}, "gemini": {}}, "adaptive_routing": {"enabled": True}}}
+        self.router.providers = {"groq": _ScriptedProvider("groq answer"), "gemini": _ScriptedProvider("gemini answer")}
+        self.router.breakers = {name: CircuitBreaker(name=name, failure_threshold=100) for name in self.router.providers}
+        self.router.limiters = {}
+        self.router._init_pricing()
+        self.router.cascade_enabled = False
+        self.router.cascade_tiers = []
+        self.router._init_hedging()
+        self.router._refresh_runtime_preferences = lambda: None
+        self.router.routing_plan = ["groq", "gemini"]
+        self.router.auto_fallback_enabled = True
+        # Route the router's metric events into its health tracker, as ProviderMetrics does
+        self.metrics = mock.MagicMock()
+        self.metrics.record_event.side_effect = lambda **event: self.router.provider_health.observe(event)
+        patcher = mock.patch.object(llm_provider, "provider_metrics", self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router._init_adaptive_routing()
+
+    def test_traffic_moves_off_a_failing_primary_before_its_breaker_opens(self):
+        groq = self.router.providers["groq"]
+        self.assertEqual(self.router.current_routing_plan(), ["groq", "gemini"])
+
+        groq.error = RuntimeError("503")
+        for _ in range(5):
+            self.assertEqual(asyncio.run(self.router.generate_answer("p", "s"))["provider"], "gemini")
+
+        self.assertEqual(self.router.current_routing_plan(), ["gemini", "groq"])
+        calls_before = groq.calls
+        self.assertEqual(asyncio.run(self.router.generate_answer("p", "s"))["provider"], "gemini")
+        self.assertEqual(groq.calls, calls_before)
+        self.assertEqual(self.router.breakers["groq"].state.value, "CLOSED")
+
+    def test_static_mode_keeps_configured_order(self):
+        self.router.routing_mode = "static"
+        self.router.providers["groq"].error = RuntimeError("503")
+        for _ in range(5):
+            asyncio.run(self.router.generate_answer("p", "s"))
+        self.assertEqual(self.router.current_routing_plan(), ["groq", "gemini"])
+
+
+class RuntimePreferencesCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, self.db_path)
+        self.settings = SettingsService(self.db_path)
+        patcher = mock.patch.object(llm_provider, "settings_service", self.settings)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.router = LLMRouter.__new__(LLMRouter)
+        self.router.config = {"llm": {"providers": {"groq": {}, "gemini": {}}, "fallback_order": ["groq", "gemini"]}}
+        self.router.providers = {"groq": _ScriptedProvider("groq"), "gemini": _ScriptedProvider("gemini")}
+        self.router.adaptive_routing = mock.Mock(enabled=False)
+        self.router.preferences_refresh_s = 1.0
+        self.router._preferences_version = None
+        self.router._preferences_checked_at = 0.0
+        self.now = 100.0
+        patcher = mock.patch.object(llm_provider.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_settings_are_reread_only_after_a_version_bump(self):
+        self.router._refresh_runtime_preferences(force=True)
+        self.assertEqual(self.router.routing_plan, ["groq", "gemini"])
+
+        with mock.patch.object(self.settings, "get_many", wraps=self.settings.get_many) as get_many, \
+                mock.patch.object(self.settings, "version", wraps=self.settings.version) as version:
+            for _ in range(50):
+                self.router._refresh_runtime_preferences()
+            self.assertEqual(version.call_count, 0)
+
+            self.now += 1.5
+            self.router._refresh_runtime_preferences()
+            self.assertEqual((version.call_count, get_many.call_count), (1, 0))
+
+            # An admin POST /settings/llm from another process
+            SettingsService(self.db_path).set("llm_primary_provider", "gemini")
+            self.router._refresh_runtime_preferences()
+            self.assertEqual(self.router.routing_plan, ["groq", "gemini"])
+
+            self.now += 1.0
+            self.router._refresh_runtime_preferences()
+            self.assertEqual(get_many.call_count, 1)
+            self.assertEqual(self.router.routing_plan, ["gemini", "groq"])
+
+
+class ProviderConnectionPoolTestCase(unittest.TestCase):
+    def test_tiers_share_one_pool_per_provider_and_close_on_shutdown(self):
+        router = LLMRouter.__new__(LLMRouter)
+        router.config = {
+            "llm": {
+                "http": {"max_connections": 8},
+                "providers": {
+                    "groq": {"api_key_env": "GROQ_API_KEY", "model": "llama-3.1-8b-instant", "http": {"max_connections": 4}},
+                    "local": {"base_url": "http://localhost:11434/v1", "model": "llama3"},
+                },
+            }
+        }
+        router.http_clients = {}
+
+        fast = router._build_provider("groq", model="llama-3.1-8b-instant")
+        strong = router._build_provider("groq", model="llama-3.3-70b-versatile")
+        local = router._build_provider("local")
+        self.assertIs(fast.client, strong.client)
+        self.assertIsNot(fast.client, local.client)
+        self.assertEqual(llm_provider.HTTPPoolSettings.from_config(router.config["llm"], "groq").max_connections, 4)
+        self.assertEqual(llm_provider.HTTPPoolSettings.from_config(router.config["llm"], "local").max_connections, 8)
+
+        asyncio.run(router.aclose())
+        self.assertTrue(fast.client.is_closed)
+        self.assertTrue(local.client.is_closed)
+        self.assertEqual(router.http_clients, {})
+
+
+
+class _StreamingProvider(LLMProvider):
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error  # raised once the chunks run out
+        self.closed = False
+
+    async def generate_response(self, prompt, system_instruction):
+        raise AssertionError("the streaming path must not buffer")
+
+    async def generate_stream(self, prompt, system_instruction):
+        try:
+            for chunk in self.chunks:
+                await asyncio.sleep(0)
+                yield chunk
+            if self.error:
+                raise self.error
+        finally:
+            self.closed = True
+
+
+class ProviderLimitRouterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.router = LLMRouter.__new__(LLMRouter)
+        self.router.config = {"llm": {
+            "limits": {"max_concurrent": 1, "queue_timeout_ms": 50},
+            "providers": {"groq": {}, "gemini": {"limits": {"max_concurrent": 0}}},
+        }}
+        self.router.providers = {"groq": _ScriptedProvider("groq answer", delay=0.2), "gemini": _ScriptedProvider("gemini answer")}
+        self.router.breakers = {name: CircuitBreaker(name=name) for name in self.router.providers}
+        self.router.limiters = {}
+        self.router._init_pricing()
+        self.router.cascade_enabled = False
+        self.router.cascade_tiers = []
+        self.router._init_hedging()
+        self.router._refresh_runtime_preferences = lambda: None
+        self.router.routing_plan = ["groq", "gemini"]
+        self.router.auto_fallback_enabled = True
+        patcher = mock.patch.object(llm_provider, "provider_metrics")
+        self.metrics = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router._init_adaptive_routing()
+
+    def test_burst_overflows_to_the_next_provider_without_tripping_the_breaker(self):
+        async def burst():
+            return await asyncio.gather(*(self.router.generate_answer("p", "s") for _ in range(3)))
+
+        providers = sorted(result["provider"] for result in asyncio.run(burst()))
+        self.assertEqual(providers, ["gemini", "gemini", "groq"])
+        self.assertEqual(self.router.providers["groq"].calls, 1)
+        self.assertEqual(self.router.breakers["groq"].failures, 0)
+        self.metrics.record_event.assert_called()
+        self.assertTrue(all(call.kwargs["success"] for call in self.metrics.record_event.call_args_list))
+
+        limits = self.router.limits_snapshot()
+        self.assertEqual(limits["groq"]["saturated"]["concurrency"], 2)
+        self.assertEqual(limits["groq"]["in_flight"], 0)
+        self.assertIsNone(limits["gemini"]["max_concurrent"])
+
+
+class StreamingRouterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.router = LLMRouter.__new__(LLMRouter)
+        self.router.config = {"llm": {"providers": {"groq": {"model": "fast"}, "gemini": {}, "huggingface": {}}}}
+        self.router.breakers = {name: CircuitBreaker(name=name) for name in self.router.config["llm"]["providers"]}
+        self.router.limiters = {}
+        self.router._init_pricing()
+        self.router._refresh_runtime_preferences = lambda: None
+        self.router.routing_plan = ["groq", "gemini", "huggingface"]
+        self.router.routing_mode = "static"
+        self.router.auto_fallback_enabled = True
+        patcher = mock.patch.object(llm_provider, "provider_metrics")
+        self.metrics = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _collect(self, limit=None):
+        async def collect():
+            events = []
+            stream = self.router.generate_stream("p", "s")
+            async for event in stream:
+                events.append(event)
+                if limit and len(events) == limit:
+                    await stream.aclose()
+            return events
+        return asyncio.run(collect())
+
+    def test_fails_over_before_the_first_token(self):
+        self.router.providers = {
+            "groq": _StreamingProvider([], error=RuntimeError("503")),
+            "gemini": _StreamingProvider(["Hel", "lo"]),
+            "huggingface": _StreamingProvider(["unused"]),
+        }
+        events = self._collect()
+        self.assertEqual([e["text"] for e in events if e["type"] == "delta"], ["Hel", "lo"])
+        self.assertEqual(events[-1], {"type": "done", "provider": "gemini", "model": None, "success": True, "answer": "Hello"})
+        self.assertEqual(self.router.breakers["groq"].failures, 1)
+        self.assertFalse(self.router.providers["huggingface"].closed)
+
+    def test_error_after_first_token_ends_the_stream_without_failover(self):
+        self.router.providers = {
+            "groq": _StreamingProvider(["Partial"], error=RuntimeError("reset")),
+            "gemini": _StreamingProvider(["unused"]),
+            "huggingface": _StreamingProvider(["unused"]),
+        }
+        done = self._collect()[-1]
+        self.assertEqual((done["provider"], done["success"], done["answer"]), ("groq", False, "Partial"))
+        self.assertIn("reset", done["error"])
+        self.assertFalse(self.router.providers["gemini"].closed)
+
+    def test_buffered_fallback_and_early_close(self):
+        self.router.providers = {
+            "groq": _StreamingProvider(["a", "b", "c"]),
+            "gemini": _ScriptedProvider(error=RuntimeError("down")),
+            "huggingface": _ScriptedProvider("whole answer"),
+        }
+        self.assertEqual(len(self._collect(limit=1)), 1)
+        self.assertTrue(self.router.providers["groq"].closed)
+
+        self.router.routing_plan = ["gemini", "huggingface"]
+        events = self._collect()
+        self.assertEqual(events, [
+            {"type": "delta", "text": "whole answer"},
+            {"type": "done", "provider": "huggingface", "model": None, "success": True, "answer": "whole answer"},
+        ])
+
+
+class LocalBatchingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.in_flight = self.peak_in_flight = 0
+
+    def _provider(self, **settings):
+        async def handler(request):
+            body = json.loads(request.content)
+            self.requests.append((request.url.path, body))
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            if request.url.path.endswith("/chat/completions"):
+                return httpx.Response(200, json={"choices": [{"message": {"content": f"re: {body['messages'][1]['content']}"}}]})
+            # Out of order, and nothing for a prompt asking for it
+            choices = [{"index": i, "text": f" re: {prompt.split('User: ')[1].split(chr(10))[0]}"}
+                       for i, prompt in enumerate(body["prompt"]) if "skip" not in prompt]
+            return httpx.Response(200, json={"choices": list(reversed(choices))})
+
+        batching = LocalBatchSettings(enabled=True, **settings)
+        return llm_provider.LocalLLMProvider("http://local/v1", "llama3", client=httpx.AsyncClient(transport=httpx.MockTransport(handler)), batching=batching)
+
+    def _run(self, provider, prompts, batched=True):
+        async def scenario():
+            try:
+                calls = (provider.generate_response(prompt, "sys") for prompt in prompts)
+                if not batched:
+                    return await asyncio.gather(*calls, return_exceptions=True)
+                with batch_generation():
+                    return await asyncio.gather(*calls, return_exceptions=True)
+            finally:
+                await provider.client.aclose()
+        return asyncio.run(scenario())
+
+    def test_settings_from_config(self):
+        settings = LocalBatchSettings.from_config({"enabled": True, "mode": "bogus", "max_in_flight": "4"})
+        self.assertEqual((settings.enabled, settings.mode, settings.max_in_flight), (True, "concurrent", 4))
+        self.assertFalse(LocalBatchSettings.from_config(None).enabled)
+
+    def test_concurrent_mode_caps_requests_in_flight(self):
+        provider = self._provider(max_batch_size=4, max_in_flight=2)
+        prompts = [f"q{i}" for i in range(6)]
+        self.assertEqual(self._run(provider, prompts), [f"re: {prompt}" for prompt in prompts])
+        self.assertEqual(len(self.requests), 6)
+        self.assertEqual(self.peak_in_flight, 2)
+        self.assertEqual((provider.batcher.batches, provider.batcher.largest), (2, 4))
+
+    def test_completions_mode_sends_one_request_per_batch(self):
+        provider = self._provider(mode="completions", max_batch_size=8)
+        results = self._run(provider, ["q0", "skip", "q2"])
+        self.assertEqual((results[0], results[2]), ("re: q0", "re: q2"))
+        self.assertIsInstance(results[1], ValueError)
+        [(path, body)] = self.requests
+        self.assertEqual(path, "/v1/completions")
+        self.assertEqual(body["prompt"][0], "sys\n\nUser: q0\nAssistant:")
+        self.assertEqual(body["max_tokens"], 512)
+
+    def test_interactive_calls_are_not_batched(self):
+        provider = self._provider(mode="completions")
+        self.assertEqual(self._run(provider, ["q0", "q1"], batched=False), ["re: q0", "re: q1"])
+        self.assertEqual([path for path, _ in self.requests], ["/v1/chat/completions"] * 2)
+        self.assertEqual(provider.batcher.batches, 0)
+
+    def test_router_sends_offline_work_to_the_batching_provider_first(self):
+        router = LLMRouter.__new__(LLMRouter)
+        router.config = {"llm": {"providers": {"groq": {}, "local": {}}}}
+        local = _ScriptedProvider("local answer")
+        local.batcher = object()
+        router.providers = {"groq": _ScriptedProvider("groq answer"), "local": local}
+        router.breakers = {name: CircuitBreaker(name=name) for name in router.providers}
+        router.limiters = {}
+        router._init_pricing()
+        router.cascade_enabled = True
+        router.cascade_tiers = [llm_provider.CascadeTier("fast", "groq", "m", _ScriptedProvider("tier answer"))]
+        router.cascade_min_retrieval_confidence = 0.5
+        router.uncertainty_markers = []
+        router.cascade_stats = {"served": {}, "escalations": {}}
+        router._init_hedging()
+        router._refresh_runtime_preferences = lambda: None
+        router.routing_plan = ["groq", "local"]
+        router.auto_fallback_enabled = True
+        router.routing_mode = "static"
+
+        async def scenario():
+            with batch_generation():
+                offline = await router.generate_answer("p", "s")
+            return offline, await router.generate_answer("p", "s")
+
+        with mock.patch.object(llm_provider, "provider_metrics"):
+            offline, interactive = asyncio.run(scenario())
+        self.assertEqual(offline["provider"], "local")
+        self.assertEqual(interactive["tier"], "fast")
+        self.assertEqual(router.current_routing_plan(), ["groq", "local"])
+
+
+class ProviderStreamParsingTestCase(unittest.TestCase):
+    def _client(self, body):
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+        self.requests = []
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def _deltas(self, provider):
+        async def collect():
+            try:
+                return [delta async for delta in provider.generate_stream("q", "s")]
+            finally:
+                await provider.client.aclose()
+        return asyncio.run(collect())
+
+    def test_openai_compatible_sse(self):
+        body = (
+            'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+            'data: {"choices":[{"delta":{"content":"Reset it "}}]}\n\n'
+            ': keep-alive\n\n'
+            'data: {"choices":[{"delta":{"content":"from settings."}}]}\n\n'
+            'data: [DONE]\n\n'
+        )
+        provider = llm_provider.LocalLLMProvider("http://local/v1", "llama3", client=self._client(body))
+        self.assertEqual(self._deltas(provider), ["Reset it ", "from settings."])
+        self.assertTrue(json.loads(self.requests[0].content)["stream"])
+
+    def test_usage_from_the_final_chunk(self):
+        body = (
+            'data: {"choices":[{"delta":{"content":"Yes."}}]}\n\n'
+            'data: {"choices":[],"usage":{"prompt_tokens":30,"completion_tokens":2}}\n\n'
+            'data: [DONE]\n\n'
+        )
+        provider = llm_provider.LocalLLMProvider("http://local/v1", "llama3", client=self._client(body))
+        with capture_usage() as captured:
+            self.assertEqual(self._deltas(provider), ["Yes."])
+        self.assertEqual(captured.usage, TokenUsage(30, 2))
+        self.assertEqual(json.loads(self.requests[0].content)["stream_options"], {"include_usage": True})
+
+    def test_gemini_sse(self):
+        body = (
+            'data: {"candidates":[{"content":{"parts":[{"text":"Reset "}]}}]}\r\n\r\n'
+            'data: {"candidates":[{"content":{"parts":[{"text":"it."}]}}]}\r\n\r\n'
+        )
+        provider = llm_provider.GeminiProvider("key", "gemini-1.5-flash", client=self._client(body))
+        self.assertEqual(self._deltas(provider), ["Reset ", "it."])
+        self.assertIn(":streamGenerateContent?alt=sse", str(self.requests[0].url))
+
+
+def _load_orchestrator_app():
+    # By path: other test modules put the simulator's main.py first on sys.path
+    module = sys.modules.get("chat_orchestrator_main")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("chat_orchestrator_main", os.path.join(CHAT_ORCHESTRATOR_PATH, "main.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules["chat_orchestrator_main"] = module
+    return module
+
+
+class AnswerCoalescingTestCase(unittest.TestCase):
+    def setUp(self):
+        main = _load_orchestrator_app()
+        self.main = main
+        self.prompts = []
+
+        async def search(query, k=3):
+            return [_rag_result("faq-009", "Returns are accepted within 30 days.", 0.2)]
+
+        async def generate_answer(prompt, system_instruction, **kwargs):
+            self.prompts.append(system_instruction)
+            await asyncio.sleep(0.05)  # long enough for the second request to arrive while this one is in flight
+            return {"provider": "groq", "answer": "Returns are accepted within 30 days.", "success": True}
+
+        languages = {"¿Cuántos días para devolver un pedido?": "es", "Combien de jours pour retourner une commande ?": "fr"}
+        patches = [
+            mock.patch.object(main.rag_client, "search", search),
+            mock.patch.object(main.llm_router, "generate_answer", generate_answer),
+            mock.patch.object(main.translation_service, "detect_language", lambda text: (languages.get(text, "en"), 0.99)),
+            mock.patch.object(main.translation_service, "translate", lambda text, target_lang, source_lang=None: {
+                "translated_text": "how many days do I have to return an order" if target_lang == "en" else f"[{target_lang}] {text}",
+                "method": "test",
+            }),
+            mock.patch.object(main, "multilingual_retrieval", False),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_same_question_in_another_language_is_not_coalesced(self):
+        async def scenario():
+            return await asyncio.gather(*(
+                self.main._handle_chat(self.main.ChatRequest(message=message))
+                for message in ("¿Cuántos días para devolver un pedido?", "Combien de jours pour retourner une commande ?")
+            ))
+
+        spanish, french = asyncio.run(scenario())
+
+        self.assertEqual(len(self.prompts), 2)
+        self.assertTrue(spanish.answer_text.startswith("[es] "))
+        self.assertTrue(french.answer_text.startswith("[fr] "))
+        for envelope in (spanish, french):
+            self.assertNotIn("Coalesced", envelope.notes or "")
+
+
+class TranslationFailureTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, self.db_path)
+        with mock.patch("builtins.print"):
+            self.service = TranslationService(self.db_path)
+        # A backend that is installed but failing (quota, network, ...)
+        self.service.translator = mock.Mock()
+        self.service.translator.translate.side_effect = RuntimeError("quota exceeded")
+        self.service.translation_method = 'googletrans'
+
+    def test_failed_translation_is_reported_and_not_cached(self):
+        with mock.patch("builtins.print"):
+            result = self.service.translate("Returns are accepted within 30 days.", "es", source_lang="en")
+        self.assertEqual(result['method'], 'error')
+        self.assertTrue(result['translated_text'].startswith("[Translation error]"))
+        self.assertIsNone(self.service._get_cached_translation("Returns are accepted within 30 days.", "en", "es"))
+        main = _load_orchestrator_app()
+        self.assertFalse(main._is_real_translation(result))
+
+    def test_failed_batch_translation_is_reported_per_item(self):
+        with mock.patch("builtins.print"):  # the per-text fallback also fails
+            results = self.service.translate_batch(["Hola", "Gracias"], "en", "es")
+        self.assertEqual([result['method'] for result in results], ['error', 'error'])
+        self.assertIsNone(self.service._get_cached_translation("Hola", "es", "en"))
+
+
+if __name__ == "__main__":
+    unittest.main()
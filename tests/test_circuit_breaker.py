@@ -0,0 +1,160 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from services.shared.breaker_store import BreakerStore
+from services.shared.circuit_breaker import CircuitBreaker, State
+
+
+class SharedCircuitBreakerTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.store = BreakerStore(db_path=self.db_path)
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def _worker_breaker(self):
+        # Each worker process builds its own breaker over the same store
+        return CircuitBreaker(failure_threshold=2, recovery_timeout=30, name="groq", store=self.store, sync_interval=0)
+
+    def _elapse_recovery_timeout(self):
+        self.store.transact("groq", lambda record, window: record.update(last_failure_time=time.time() - 60))
+
+    def test_failures_in_different_workers_open_the_breaker_everywhere(self):
+        worker_a = self._worker_breaker()
+        worker_b = self._worker_breaker()
+
+        worker_a.record_failure()
+        worker_b.record_failure()
+
+        self.assertEqual(worker_b.state, State.OPEN)
+        self.assertFalse(worker_a.allow_request())
+        self.assertEqual(self.store.snapshot()["groq"]["failures"], 2)
+
+    def test_recovery_is_shared(self):
+        worker_a = self._worker_breaker()
+        worker_b = self._worker_breaker()
+        worker_a.record_failure()
+        worker_a.record_failure()
+
+        self._elapse_recovery_timeout()
+        self.assertTrue(worker_b.allow_request())
+        worker_b.record_success()
+
+        self.assertTrue(worker_a.allow_request())
+        self.assertEqual(worker_a.state, State.CLOSED)
+        self.assertEqual(worker_a.failures, 0)
+
+    def test_async_results_reach_the_shared_store(self):
+        worker_a = self._worker_breaker()
+        worker_b = self._worker_breaker()
+
+        async def report():
+            await worker_a.record_result(True, latency_ms=120)
+            await worker_a.record_result(True)
+
+        asyncio.run(report())
+        self.assertEqual(worker_a.state, State.OPEN)
+        self.assertFalse(worker_b.allow_request())
+
+    def test_async_admission_keeps_store_io_off_the_event_loop(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0, name="groq", store=self.store, sync_interval=60)
+        store_threads = []
+        load, transact = self.store.load, self.store.transact
+        self.store.load = lambda *a, **kw: store_threads.append(threading.get_ident()) or load(*a, **kw)
+        self.store.transact = lambda *a, **kw: store_threads.append(threading.get_ident()) or transact(*a, **kw)
+
+        async def scenario():
+            self.assertTrue(await breaker.allow_request_async())  # CLOSED and freshly synced: no store access
+            self.assertEqual(store_threads, [])
+            await breaker.record_result(True)
+            self.assertTrue(await breaker.allow_request_async())  # recovery elapsed: the probe is claimed
+            self.assertTrue(breaker.holds_probe())
+            await breaker.release_probe_async()
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(scenario())
+        self.assertGreaterEqual(len(store_threads), 3)
+        self.assertNotIn(loop_thread, store_threads)
+
+    def test_breaker_without_store_stays_local(self):
+        breaker = CircuitBreaker(failure_threshold=1, name="gemini")
+        breaker.record_failure()
+        self.assertEqual(breaker.state, State.OPEN)
+        self.assertEqual(self.store.snapshot(), {})
+
+    def test_only_one_worker_gets_the_half_open_probe(self):
+        worker_a = self._worker_breaker()
+        worker_b = self._worker_breaker()
+        worker_a.record_failure()
+        worker_a.record_failure()
+        self._elapse_recovery_timeout()
+
+        self.assertTrue(worker_a.allow_request())
+        self.assertTrue(worker_a.holds_probe())
+        self.assertFalse(worker_b.allow_request())
+        worker_a.release_probe()  # e.g. the probe call was cancelled
+        self.assertTrue(worker_b.allow_request())
+        worker_b.record_failure()
+        self.assertEqual(self.store.load("groq")["state"], State.OPEN.value)
+        self.assertFalse(worker_a.allow_request())
+
+
+class RollingWindowCircuitBreakerTestCase(unittest.TestCase):
+    def _breaker(self, **overrides):
+        settings = dict(failure_threshold=5, recovery_timeout=0.05, window_s=60, min_calls=6,
+                        failure_rate_threshold=0.5, slow_call_ms=1000, slow_call_rate_threshold=0.5)
+        settings.update(overrides)
+        return CircuitBreaker(name="groq", **settings)
+
+    def test_intermittent_failures_open_on_error_rate(self):
+        breaker = self._breaker(failure_rate_threshold=0.55)
+        for _ in range(2):
+            breaker.record_failure()
+            breaker.record_success(latency_ms=200)
+        self.assertEqual(breaker.state, State.CLOSED)  # below min_calls, never 2 failures in a row
+        breaker.record_failure()
+        breaker.record_success(latency_ms=200)
+        self.assertEqual(breaker.state, State.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, State.OPEN)
+        self.assertEqual(breaker.snapshot()["failure_rate"], 0.571)
+
+    def test_slow_successes_open_on_slow_call_rate(self):
+        breaker = self._breaker()
+        for latency_ms in (300, 2500, 3000, 200, 1800, 1500):
+            breaker.record_success(latency_ms=latency_ms)
+        self.assertEqual(breaker.state, State.OPEN)
+        self.assertEqual(breaker.failures, 0)
+
+    def test_half_open_admits_a_single_probe(self):
+        breaker = self._breaker(failure_threshold=1)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+        time.sleep(0.06)
+
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, State.HALF_OPEN)
+        self.assertFalse(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_success(latency_ms=1500)  # slow: not recovered yet
+        self.assertEqual(breaker.state, State.OPEN)
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success(latency_ms=100)
+        self.assertEqual(breaker.state, State.CLOSED)
+        self.assertEqual(breaker.snapshot()["window_calls"], 0)
+        self.assertEqual(breaker.transitions, {"opened": 2, "half_open": 2, "closed": 1})
+        self.assertEqual(breaker.rejected, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
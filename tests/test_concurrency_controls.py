@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+
+from services.shared.admission import AdmissionController, AdmissionRejected
+from services.shared.single_flight import SingleFlight, normalize_key
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def test_identical_keys_share_one_computation(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        async def scenario():
+            return await asyncio.gather(*(flights.do("q", compute) for _ in range(5)))
+
+        results = asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([value for value, _ in results], ["answer"] * 5)
+        self.assertEqual(sum(1 for _, shared in results if shared), 4)
+        self.assertEqual(flights.snapshot()["coalesced_requests"], 4)
+        self.assertEqual(flights.in_flight(), 0)
+
+    def test_errors_propagate_and_key_is_released(self):
+        flights = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0)
+            raise RuntimeError("provider down")
+
+        async def scenario():
+            with self.assertRaises(RuntimeError):
+                await flights.do("q", boom)
+            value, shared = await flights.do("q", lambda: asyncio.sleep(0, result="ok"))
+            return value, shared
+
+        self.assertEqual(asyncio.run(scenario()), ("ok", False))
+
+    def test_cancelled_waiter_does_not_cancel_shared_work(self):
+        flights = SingleFlight()
+
+        async def scenario():
+            async def compute():
+                await asyncio.sleep(0.02)
+                return 42
+
+            first = asyncio.ensure_future(flights.do("q", compute))
+            second = asyncio.ensure_future(flights.do("q", compute))
+            await asyncio.sleep(0.005)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(scenario()), (42, True))
+
+    def test_normalize_key(self):
+        self.assertEqual(normalize_key("  Is the   site DOWN? "), "is the site down?")
+
+
+class AdmissionControllerTestCase(unittest.TestCase):
+    def test_queue_full_is_rejected_immediately(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout_s=1.0)
+        release = None
+
+        async def scenario():
+            nonlocal release
+            release = asyncio.Event()
+
+            async def hold():
+                async with controller.slot():
+                    await release.wait()
+                    return "ran"
+
+            first = asyncio.ensure_future(hold())
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(hold())
+            await asyncio.sleep(0)
+            self.assertEqual(controller.snapshot()["queue_depth"], 1)
+            with self.assertRaises(AdmissionRejected) as rejected:
+                async with controller.slot():
+                    pass
+            release.set()
+            return rejected.exception.reason, await first, await second
+
+        self.assertEqual(asyncio.run(scenario()), ("queue_full", "ran", "ran"))
+        snapshot = controller.snapshot()
+        self.assertEqual(snapshot["admitted"], 2)
+        self.assertEqual(snapshot["rejected"]["queue_full"], 1)
+        self.assertEqual(snapshot["active"], 0)
+
+    def test_queue_wait_times_out(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout_s=0.01)
+
+        async def scenario():
+            async with controller.slot():
+                with self.assertRaises(AdmissionRejected) as rejected:
+                    async with controller.slot():
+                        pass
+                return rejected.exception.reason
+
+        self.assertEqual(asyncio.run(scenario()), "queue_timeout")
+        self.assertEqual(controller.snapshot()["queue_depth"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
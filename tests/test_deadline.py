@@ -0,0 +1,72 @@
+import asyncio
+import time
+import unittest
+
+from services.shared.deadline import (
+    DEADLINE_HEADER,
+    ClientDisconnected,
+    cancel_on_disconnect,
+    current_deadline,
+    deadline_scope,
+    has_budget,
+    parse_deadline_header,
+    propagation_headers,
+    timeout_for,
+)
+
+
+class DeadlineTestCase(unittest.TestCase):
+    def test_no_deadline_keeps_stage_defaults(self):
+        self.assertIsNone(current_deadline())
+        self.assertEqual(timeout_for(5.0), 5.0)
+        self.assertTrue(has_budget(100))
+        self.assertEqual(propagation_headers(), {})
+
+    def test_stage_timeouts_shrink_to_remaining_budget(self):
+        with deadline_scope(time.time() + 1.0):
+            self.assertLessEqual(timeout_for(5.0), 1.0)
+            self.assertEqual(timeout_for(0.2), 0.2)
+            self.assertLessEqual(timeout_for(5.0, reserve=0.5), 0.5)
+            self.assertTrue(has_budget(0.5))
+            self.assertFalse(has_budget(2.0))
+        with deadline_scope(time.time() - 1):
+            self.assertEqual(timeout_for(5.0), 0.0)
+            self.assertFalse(has_budget())
+
+    def test_header_round_trip_and_nested_scopes(self):
+        outer = time.time() + 2.0
+        with deadline_scope(outer):
+            header = propagation_headers()[DEADLINE_HEADER]
+            self.assertAlmostEqual(parse_deadline_header(header), outer, places=2)
+            # A later inner deadline cannot extend the caller's budget
+            with deadline_scope(outer + 60) as effective:
+                self.assertEqual(effective, outer)
+        self.assertIsNone(current_deadline())
+        self.assertIsNone(parse_deadline_header("soon"))
+
+    def test_work_is_cancelled_when_client_disconnects(self):
+        async def scenario():
+            started = asyncio.Event()
+            cancelled = asyncio.Event()
+
+            async def slow_work():
+                started.set()
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+
+            async def is_disconnected():
+                return started.is_set()
+
+            with self.assertRaises(ClientDisconnected):
+                await cancel_on_disconnect(slow_work(), is_disconnected, poll_interval=0.01)
+            await asyncio.sleep(0)
+            return cancelled.is_set()
+
+        self.assertTrue(asyncio.run(scenario()))
+
+
+if __name__ == "__main__":
+    unittest.main()
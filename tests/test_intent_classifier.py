@@ -0,0 +1,65 @@
+import unittest
+
+from services.shared.intent_classifier import IntentClassifier
+
+
+class IntentClassifierTestCase(unittest.TestCase):
+    def setUp(self):
+        self.classifier = IntentClassifier()
+
+    def test_pure_chit_chat_is_matched(self):
+        self.assertEqual(self.classifier.classify("Hi there!").intent, "greeting")
+        self.assertEqual(self.classifier.classify("Thank you so much :)").intent, "thanks")
+        self.assertEqual(self.classifier.classify("ok bye").intent, "goodbye")
+        # Mixed chit-chat goes to the more specific intent
+        self.assertEqual(self.classifier.classify("hey, thanks!").intent, "thanks")
+
+    def test_real_questions_are_not_short_circuited(self):
+        for message in (
+            "Hi, how do I reset my password?",
+            "thanks, but what about refunds for digital orders?",
+            "What are your opening hours?",
+            "This thing is useless",
+        ):
+            self.assertIsNone(self.classifier.classify(message), message)
+
+    def test_handoff_request_escalates_even_inside_a_question(self):
+        match = self.classifier.classify("I want to talk to a human about my refund")
+        self.assertEqual(match.intent, "human_agent")
+        self.assertTrue(match.escalate)
+
+    def test_chit_chat_with_a_topic_word_is_not_short_circuited(self):
+        for message in ("hello refund", "hi cancel", "thanks password"):
+            self.assertIsNone(self.classifier.classify(message), message)
+
+    def test_negated_handoff_request_does_not_escalate(self):
+        for message in (
+            "I don't need to talk to a human",
+            "no need to speak to someone, just tell me the refund policy",
+            "I do not want a live agent",
+        ):
+            match = self.classifier.classify(message)
+            self.assertFalse(match and match.escalate, message)
+        # A later, un-negated request still counts
+        match = self.classifier.classify("not a bot, I want a real person")
+        self.assertEqual(match.intent, "human_agent")
+
+    def test_snapshot_reports_short_circuit_rate(self):
+        for message in ("hello", "thanks", "Where is my order?", "How do I cancel?"):
+            self.classifier.classify(message)
+        snapshot = self.classifier.snapshot()
+        self.assertEqual(snapshot["evaluated"], 4)
+        self.assertEqual(snapshot["short_circuited"], 2)
+        self.assertEqual(snapshot["short_circuit_rate"], 0.5)
+        self.assertEqual(snapshot["by_intent"], {"greeting": 1, "thanks": 1})
+
+    def test_disabled_classifier_matches_nothing_and_uses_configured_templates(self):
+        disabled = IntentClassifier.from_config({"enabled": False})
+        self.assertIsNone(disabled.classify("hello"))
+
+        custom = IntentClassifier.from_config({"responses": {"greeting": "Welcome to Acme!"}})
+        self.assertEqual(custom.classify("good morning").response, "Welcome to Acme!")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import time
+import unittest
+
+from services.shared.stage_timing import LatencyHistogram, LatencyHistograms, StageTimer
+
+
+class StageTimerTestCase(unittest.TestCase):
+    def test_repeated_stages_accumulate(self):
+        timer = StageTimer()
+        with timer.stage("translation"):
+            time.sleep(0.005)
+        with timer.stage("translation"):
+            time.sleep(0.005)
+        timer.add("llm", 12.5)
+
+        breakdown = timer.breakdown()
+        self.assertGreaterEqual(breakdown["stages"]["translation"], 10)
+        self.assertEqual(breakdown["stages"]["llm"], 12.5)
+        self.assertGreaterEqual(breakdown["total_ms"], breakdown["stages"]["translation"])
+
+
+class LatencyHistogramTestCase(unittest.TestCase):
+    def test_percentiles_follow_distribution(self):
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.observe(40)
+        for _ in range(10):
+            histogram.observe(900)
+
+        self.assertLessEqual(histogram.percentile(0.5), 50)
+        self.assertGreater(histogram.percentile(0.99), 500)
+        self.assertEqual(histogram.snapshot()["count"], 100)
+
+    def test_registry_groups_by_prefix(self):
+        registry = LatencyHistograms()
+        timer = StageTimer()
+        timer.add("retrieval", 30)
+        registry.observe_timer(timer)
+        registry.observe("provider:groq", 250)
+
+        snapshot = registry.snapshot()
+        self.assertIn("retrieval", snapshot["stage"])
+        self.assertIn("total", snapshot["stage"])
+        self.assertEqual(snapshot["provider"]["groq"]["count"], 1)
+        self.assertIsNone(registry.percentile("provider:unknown", 0.9))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import asyncio
+import importlib.util
+import os
+import sys
+import unittest
+from unittest import mock
+
+import httpx
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SIMULATOR_PATH = os.path.join(PROJECT_ROOT, 'services', 'llm-simulator')
+CHAT_ORCHESTRATOR_PATH = os.path.join(PROJECT_ROOT, 'services', 'chat-orchestrator')
+for path in (PROJECT_ROOT, SIMULATOR_PATH, CHAT_ORCHESTRATOR_PATH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import llm_provider
+from llm_provider import LLMRouter
+from simulator import Scenario, SimulatedBackend
+
+
+def _load_simulator_app():
+    # By path: the orchestrator's main.py is importable as "main" too
+    spec = importlib.util.spec_from_file_location("llm_simulator_main", os.path.join(SIMULATOR_PATH, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ScenarioTimelineTestCase(unittest.TestCase):
+    def test_phases_carry_over_and_loop(self):
+        backend = SimulatedBackend("groq", [
+            {"at_s": 0, "latency_ms": {"p50": 200, "p95": 600}, "error_rate": 0.1},
+            {"at_s": 30, "error_rate": 0.9},
+            {"at_s": 60, "latency_ms": 50},
+        ], repeat_s=90)
+        self.assertEqual(backend.behaviour_at(10).error_rate, 0.1)
+        outage = backend.behaviour_at(45)
+        self.assertEqual((outage.error_rate, outage.latency_p95_ms), (0.9, 600))
+        recovered = backend.behaviour_at(75)
+        self.assertEqual((recovered.error_rate, recovered.latency_p50_ms, recovered.latency_p95_ms), (0.9, 50, 50))
+        self.assertEqual(backend.behaviour_at(100).error_rate, 0.1)  # looped back to the start
+
+    def test_throttle_bursts_and_rate_limit(self):
+        now = [0.0]
+        scenario = Scenario({"providers": {
+            "groq": {"phases": [{"at_s": 0, "latency_ms": 1, "throttle": {"every_s": 10, "for_s": 2}}]},
+            "openai": {"phases": [{"at_s": 0, "latency_ms": 1, "rate_limit_rpm": 3}]},
+        }}, clock=lambda: now[0])
+
+        outcomes = []
+        for t in (0.5, 1.5, 3.0, 10.5, 12.5):
+            now[0] = t
+            outcomes.append(scenario.decide("groq").outcome)
+        self.assertEqual(outcomes, ["throttled", "throttled", "ok", "throttled", "ok"])
+        self.assertEqual([scenario.decide("openai").outcome for _ in range(4)], ["ok", "ok", "ok", "throttled"])
+        now[0] = 80.0
+        self.assertEqual(scenario.decide("openai").outcome, "ok")
+        self.assertIsNone(scenario.decide("unknown"))
+
+    def test_seeded_scenarios_replay(self):
+        spec = {"seed": 3, "providers": {"groq": {"phases": [{"at_s": 0, "error_rate": 0.5, "hang_rate": 0.1}]}}}
+        runs = []
+        for _ in range(2):
+            scenario = Scenario(spec)
+            runs.append([(d.outcome, round(d.first_token_s, 6)) for d in (scenario.decide("groq") for _ in range(20))])
+        self.assertEqual(runs[0], runs[1])
+        self.assertIn("error", [outcome for outcome, _ in runs[0]])
+
+
+class SimulatedRouterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.simulator = _load_simulator_app()
+        self.simulator.scenario.load({"seed": 1, "providers": {
+            "groq": {"phases": [{"at_s": 0, "latency_ms": 1, "error_rate": 1.0}]},
+            "gemini": {"phases": [{"at_s": 0, "latency_ms": 1, "tokens_per_s": 0, "answer_tokens": 4}]},
+        }})
+        config = {"llm": {
+            "simulator": {"enabled": True, "base_url": "http://simulator"},
+            "circuit_breaker": {"shared_state": False},
+            "fallback_order": ["groq", "gemini"],
+            "providers": {"groq": {"model": "llama"}, "gemini": {"model": "flash"}},
+        }}
+        self.router = LLMRouter.__new__(LLMRouter)
+        self.router.config = config
+        self.router.http_clients = {"groq": self._client(), "gemini": self._client()}
+        self.router.limiters = {}
+        self.router._init_pricing()
+        self.router.providers = {}
+        self.router.breakers = {}
+        patcher = mock.patch.object(llm_provider, "provider_metrics")
+        self.metrics = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router._init_providers()
+        self.router._init_cascade()
+        self.router._init_hedging()
+        self.router._init_adaptive_routing()
+        self.router._refresh_runtime_preferences = lambda force=False: None
+        self.router.routing_plan = ["groq", "gemini"]
+        self.router.auto_fallback_enabled = True
+
+    def _client(self):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.simulator.app))
+
+    def test_router_fails_over_between_simulated_providers(self):
+        self.assertIsInstance(self.router.providers["groq"], llm_provider.SimulatedProvider)
+        self.assertEqual(self.router.providers["gemini"].base_url, "http://simulator/gemini/v1")
+
+        result = asyncio.run(self.router.generate_answer("q", "s"))
+        self.assertEqual((result["provider"], result["answer"]), ("gemini", "thanks for reaching out"))
+
+        events = asyncio.run(self._stream())
+        self.assertEqual([e["text"] for e in events if e["type"] == "delta"], ["thanks", " for", " reaching", " out"])
+        self.assertEqual(events[-1]["provider"], "gemini")
+
+        # Token usage comes from the simulator's responses, streamed or not
+        answered = [call.kwargs["usage"] for call in self.metrics.record_event.call_args_list if call.kwargs["success"]]
+        self.assertEqual([usage.completion_tokens for usage in answered], [4, 4])
+        self.assertFalse(any(usage.estimated for usage in answered))
+
+        counts = self.simulator.scenario.snapshot()["providers"]
+        self.assertEqual(counts["groq"]["counts"]["error"], 2)
+        self.assertEqual(counts["gemini"]["counts"]["ok"], 2)
+        asyncio.run(self.router.aclose())
+
+    async def _stream(self):
+        return [event async for event in self.router.generate_stream("q", "s")]
+
+
+if __name__ == "__main__":
+    unittest.main()
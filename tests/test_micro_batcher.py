@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+
+from services.shared.micro_batcher import MicroBatcher
+
+
+class MicroBatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+
+    async def _echo(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(0)
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+    def test_full_batches_dispatch_at_once_and_the_rest_after_the_wait(self):
+        batcher = MicroBatcher(self._echo, max_batch_size=3, max_wait_ms=20)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit(item) for item in "abcde"))
+
+        self.assertEqual(asyncio.run(scenario()), ["A", "B", "C", "D", "E"])
+        self.assertEqual(self.batches, [["a", "b", "c"], ["d", "e"]])
+        stats = batcher.snapshot()
+        self.assertEqual((stats["batches"], stats["items"], stats["largest_batch"], stats["full_batches"]), (2, 5, 3, 1))
+
+    def test_item_errors_reach_only_their_caller(self):
+        batcher = MicroBatcher(self._echo, max_batch_size=8, max_wait_ms=5)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit(item) for item in ("a", "bad", "c")), return_exceptions=True)
+
+        first, failed, last = asyncio.run(scenario())
+        self.assertEqual((first, last), ("A", "C"))
+        self.assertIsInstance(failed, ValueError)
+        self.assertEqual(len(self.batches), 1)
+
+    def test_handler_failure_fails_the_whole_batch(self):
+        async def broken(items):
+            raise ConnectionError("server down")
+
+        batcher = MicroBatcher(broken, max_batch_size=2, max_wait_ms=5)
+
+        async def scenario():
+            return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in asyncio.run(scenario())))
+
+    def test_callers_that_gave_up_are_left_out(self):
+        batcher = MicroBatcher(self._echo, max_batch_size=8, max_wait_ms=50)
+
+        async def scenario():
+            impatient = asyncio.ensure_future(batcher.submit("a"))
+            patient = asyncio.ensure_future(batcher.submit("b"))
+            await asyncio.sleep(0.01)
+            impatient.cancel()
+            return await patient
+
+        self.assertEqual(asyncio.run(scenario()), "B")
+        self.assertEqual(self.batches, [["b"]])
+        self.assertEqual(batcher.snapshot()["abandoned"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
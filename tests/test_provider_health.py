@@ -0,0 +1,48 @@
+import unittest
+
+from services.shared.provider_health import AdaptiveRoutingSettings, ProviderHealth
+
+
+class ProviderHealthTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.health = ProviderHealth(
+            AdaptiveRoutingSettings(enabled=True, window_s=60, min_samples=3, ewma_alpha=0.5),
+            clock=lambda: self.now[0],
+        )
+
+    def _observe(self, provider, count, latency_ms, success=True, cost_usd=None):
+        for _ in range(count):
+            self.health.observe({"provider": provider, "success": success, "latency_ms": latency_ms, "cost_usd": cost_usd})
+
+    def test_configured_order_holds_until_there_is_evidence(self):
+        self.assertEqual(self.health.rank(["groq", "gemini", "local"]), ["groq", "gemini", "local"])
+        self._observe("groq", 2, 9000)  # too few samples to count
+        self.assertEqual(self.health.rank(["groq", "gemini"]), ["groq", "gemini"])
+
+    def test_slow_or_failing_provider_is_ranked_down(self):
+        self._observe("groq", 5, 4000)
+        self._observe("gemini", 5, 800)
+        self.assertEqual(self.health.rank(["groq", "gemini"]), ["gemini", "groq"])
+
+        self._observe("groq", 5, 300)  # EWMA recovers quickly
+        self._observe("gemini", 5, 800, success=False)
+        self.assertEqual(self.health.rank(["groq", "gemini"]), ["groq", "gemini"])
+        self.assertEqual(self.health.stats("gemini")["error_rate"], 0.5)
+
+    def test_cost_weight_prefers_cheaper_provider(self):
+        self.health.settings.cost_weight = 1.0
+        self._observe("openai", 5, 700, cost_usd=0.004)
+        self._observe("groq", 5, 900, cost_usd=0.0001)
+        self.assertEqual(self.health.rank(["openai", "groq"]), ["groq", "openai"])
+
+    def test_window_expiry_restores_the_prior(self):
+        self._observe("groq", 5, 800, success=False)
+        self.assertEqual(self.health.rank(["groq", "gemini"]), ["gemini", "groq"])
+        self.now[0] = 120.0
+        self.assertEqual(self.health.stats("groq")["samples"], 0)
+        self.assertEqual(self.health.rank(["groq", "gemini"]), ["groq", "gemini"])
+
+
+if __name__ == "__main__":
+    unittest.main()
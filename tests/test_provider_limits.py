@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from services.shared.provider_limits import ProviderLimiter, ProviderLimitSettings, ProviderSaturated, TokenBucket
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    def test_refills_continuously_up_to_one_minute(self):
+        now = [0.0]
+        bucket = TokenBucket(60, clock=lambda: now[0])
+        bucket.take(60)
+        self.assertAlmostEqual(bucket.wait_time(3), 3.0)
+        now[0] = 2.0
+        self.assertAlmostEqual(bucket.wait_time(3), 1.0)
+        now[0] = 600.0
+        self.assertEqual(bucket.level, 2.0)  # not refilled until read
+        self.assertEqual(bucket.wait_time(500), 0.0)
+        self.assertEqual(bucket.level, 60)
+
+
+class ProviderLimiterTestCase(unittest.TestCase):
+    def test_settings_merge_global_and_provider_limits(self):
+        llm_config = {
+            "limits": {"max_concurrent": 8, "queue_timeout_ms": 100},
+            "providers": {"groq": {"limits": {"requests_per_minute": 30}}},
+        }
+        groq = ProviderLimitSettings.from_config(llm_config, "groq")
+        self.assertEqual((groq.max_concurrent, groq.requests_per_minute, groq.queue_timeout_s), (8, 30.0, 0.1))
+        self.assertEqual(ProviderLimitSettings.from_config({}, "local").max_concurrent, 0)
+
+    def test_each_worker_paces_with_its_share(self):
+        settings = ProviderLimitSettings(max_concurrent=16, requests_per_minute=30, tokens_per_minute=6000)
+        share = settings.per_worker(4)
+        self.assertEqual((share.max_concurrent, share.requests_per_minute, share.tokens_per_minute), (4, 7.5, 1500.0))
+        self.assertEqual(ProviderLimitSettings(max_concurrent=3).per_worker(8).max_concurrent, 1)
+        self.assertEqual(ProviderLimitSettings().per_worker(8).max_concurrent, 0)  # unlimited stays unlimited
+        self.assertIs(settings.per_worker(1), settings)
+
+    def test_waits_briefly_for_a_slot_then_overflows(self):
+        limiter = ProviderLimiter("groq", ProviderLimitSettings(max_concurrent=1, queue_timeout_ms=200))
+
+        async def scenario():
+            await limiter.acquire()
+            asyncio.get_running_loop().call_later(0.05, limiter.release)
+            waited = await limiter.acquire()
+            with self.assertRaises(ProviderSaturated) as raised:
+                await limiter.acquire(timeout=0.02)
+            limiter.release()
+            return waited, raised.exception.reason
+
+        waited, reason = asyncio.run(scenario())
+        self.assertGreater(waited, 0.03)
+        self.assertEqual(reason, "concurrency")
+        snapshot = limiter.snapshot()
+        self.assertEqual((snapshot["acquired"], snapshot["queued"], snapshot["in_flight"]), (2, 1, 0))
+        self.assertEqual(snapshot["saturated"]["concurrency"], 1)
+
+    def test_token_bucket_overflow_releases_the_slot(self):
+        limiter = ProviderLimiter("groq", ProviderLimitSettings(max_concurrent=1, tokens_per_minute=600, queue_timeout_ms=100))
+
+        async def scenario():
+            await limiter.acquire(tokens=600)
+            limiter.release()
+            with self.assertRaises(ProviderSaturated) as raised:
+                await limiter.acquire(tokens=300)  # 30s of refill
+            # The slot was given back, so a small request still gets through after a short wait
+            waited = await limiter.acquire(tokens=0.5)
+            limiter.release()
+            return raised.exception.reason, waited
+
+        reason, waited = asyncio.run(scenario())
+        self.assertEqual(reason, "tokens")
+        self.assertLess(waited, 0.1)
+        self.assertEqual(limiter.snapshot()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import gc
+import os
+import tempfile
+import unittest
+
+from services.shared.cache import ResponseCache
+
+
+class ResponseCacheContextTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.cache = ResponseCache(db_path=self.db_path, ttl_hours=1)
+
+    def tearDown(self):
+        self.cache = None
+        gc.collect()
+        if os.path.exists(self.db_path):
+            try:
+                os.remove(self.db_path)
+            except PermissionError:
+                pass
+
+    def test_context_hash_ignores_formatting(self):
+        first = [
+            {"role": "user", "content": "How do I return an item?", "timestamp": "t1"},
+            {"role": "assistant", "content": "Use the returns portal.", "timestamp": "t2"},
+        ]
+        second = [
+            {"role": "user", "content": "  how do I RETURN an item ", "timestamp": "t9"},
+            {"role": "assistant", "content": "use the returns portal", "timestamp": "t10"},
+        ]
+        self.assertEqual(self.cache.build_context_hash(first), self.cache.build_context_hash(second))
+        self.assertEqual(self.cache.build_context_hash([]), "")
+
+    def test_follow_up_entries_are_scoped_to_context(self):
+        context_hash = self.cache.build_context_hash([{"role": "user", "content": "How do I return an item?"}])
+        self.cache.set("How long does it take?", {"answer_text": "5-7 days"}, context_hash=context_hash)
+
+        self.assertIsNone(self.cache.get("How long does it take?"))
+        cached = self.cache.get("how long does it take?", context_hash=context_hash)
+        self.assertEqual(cached["answer_text"], "5-7 days")
+
+        rates = self.cache.get_hit_rates()
+        self.assertEqual(rates["follow_up"]["hits"], 1)
+        self.assertEqual(rates["first_turn"]["misses"], 1)
+        self.assertEqual(self.cache.get_stats()["by_kind"]["follow_up"]["entries"], 1)
+
+    def test_language_renderings_are_filled_lazily_and_reset_with_the_answer(self):
+        self.cache.set("Where is my order?", {"answer_text": "Check the tracking page."})
+
+        cached = self.cache.get("Where is my order?", language="es")
+        self.assertIsNone(cached["rendered_language"])
+        self.assertEqual(cached["answer_text"], "Check the tracking page.")
+
+        self.cache.set_translation("Where is my order?", "es", "Consulta la página de seguimiento.", source_text=cached["answer_text"])
+        cached = self.cache.get("Where is my order?", language="es")
+        self.assertEqual(cached["rendered_language"], "es")
+        self.assertEqual(cached["answer_text"], "Consulta la página de seguimiento.")
+        self.assertEqual(self.cache.get("Where is my order?")["answer_text"], "Check the tracking page.")
+
+        # A new English answer drops renderings of the old one, and stale renderings are not stored
+        self.cache.set("Where is my order?", {"answer_text": "Open Orders in your account."}, translations={"de": "Öffnen Sie Bestellungen."})
+        self.cache.set_translation("Where is my order?", "es", "Consulta la página de seguimiento.", source_text="Check the tracking page.")
+        self.assertIsNone(self.cache.get("Where is my order?", language="es")["rendered_language"])
+        self.assertEqual(self.cache.get("Where is my order?", language="de")["answer_text"], "Öffnen Sie Bestellungen.")
+
+
+if __name__ == "__main__":
+    unittest.main()
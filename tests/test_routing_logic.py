@@ -1,6 +1,10 @@
 import gc
+import importlib.util
 import os
 import tempfile
+import math
+import threading
+import time
 import unittest
 
 from services.shared.faq_repository import FAQRepository
@@ -51,6 +55,79 @@ class FAQAnswerServiceTestCase(unittest.TestCase):
         result = strict_service.find_best_match("Tell me about loyalty rewards")
         self.assertIsNone(result)
 
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "semantic matching needs numpy, installed with the sentence encoder")
+    def test_non_english_question_is_matched_semantically(self):
+        embedder = _KeywordEmbedder({"password": ("password", "contraseña"), "refund": ("refund", "reembolso")})
+        service = FAQAnswerService(self.repo, embedder=embedder, semantic_min_score=0.8)
+
+        result = service.find_best_match("¿Cómo restablezco mi contraseña?", language="es")
+        self.assertEqual(result["faq"]["id"], self.password_faq["id"])
+        self.assertEqual(result["method"], "semantic")
+        self.assertIsNone(service.find_best_match("¿Dónde está mi tienda?", language="es"))
+
+        # FAQ question embeddings are computed once and reused
+        encoded = embedder.encoded
+        service.find_best_match("Quiero un reembolso", language="es")
+        self.assertEqual(embedder.encoded, encoded + 1)
+
+        # An edit changes the repository version: only the edited question is re-encoded
+        self.repo.update(self.refund_faq["id"], question="Can I get my money back?", answer="Yes.", category="Billing")
+        self.assertIsNone(service.find_best_match("Quiero un reembolso", language="es"))
+        self.assertEqual(embedder.encoded, encoded + 3)
+
+    def test_repository_version_changes_with_every_write(self):
+        seen = [self.repo.version()]
+        temporary = self.repo.create(question="Do you ship abroad?", answer="Yes.", category="Shipping")
+        seen.append(self.repo.version())
+        # An edit and a delete in the same instant still move the version, even though the row count goes back
+        self.repo.update(self.password_faq["id"], question="How do I change my password?", answer="Profile page.", category="Accounts")
+        seen.append(self.repo.version())
+        self.repo.delete(temporary["id"])
+        seen.append(self.repo.version())
+        self.assertEqual(len(set(seen)), 4)
+        # Writes that change nothing leave it alone
+        self.assertFalse(self.repo.delete(temporary["id"]))
+        self.assertEqual(self.repo.version(), seen[-1])
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "semantic matching needs numpy, installed with the sentence encoder")
+    def test_concurrent_lookups_build_the_semantic_index_once(self):
+        embedder = _KeywordEmbedder({"password": ("password", "contraseña"), "refund": ("refund", "reembolso")}, delay=0.05)
+        service = FAQAnswerService(self.repo, embedder=embedder, semantic_min_score=0.8)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(service.find_best_match("Mi contraseña", language="es")))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([result["faq"]["id"] for result in results], [self.password_faq["id"]] * 4)
+        # Two FAQ questions encoded once, plus one query per lookup
+        self.assertEqual(embedder.encoded, 2 + 4)
+
+
+class _KeywordEmbedder:
+    """Stand-in for a multilingual encoder: one dimension per concept, normalised."""
+
+    def __init__(self, concepts, delay=0.0):
+        self.concepts = list(concepts.items())
+        self.delay = delay
+        self._lock = threading.Lock()
+        self.encoded = 0
+
+    def encode(self, texts):
+        time.sleep(self.delay)
+        with self._lock:
+            self.encoded += len(texts)
+        rows = []
+        for text in texts:
+            row = [1.0 if any(word in text.lower() for word in words) else 0.0 for _, words in self.concepts] + [0.1]
+            norm = math.sqrt(sum(value * value for value in row))
+            rows.append([value / norm for value in row])
+        return rows
+
 
 class KnowledgeGapAnalyzerTestCase(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,51 @@
+import io
+import json
+import unittest
+
+from services.shared.structured_logging import configure_logging, get_logger
+
+
+class StructuredLoggingTestCase(unittest.TestCase):
+    def tearDown(self):
+        configure_logging({})
+
+    def _emit(self, settings, emit):
+        stream = io.StringIO()
+        pipeline = configure_logging(settings, stream=stream)
+        emit()
+        pipeline.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def test_records_are_json_with_fields(self):
+        log = get_logger("cache")
+        records = self._emit({"log_level": "INFO"}, lambda: log.info("cache_lookup", hit=True))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["logger"], "cache")
+        self.assertEqual(records[0]["event"], "cache_lookup")
+        self.assertTrue(records[0]["hit"])
+
+    def test_per_module_levels(self):
+        cache_log = get_logger("cache")
+        router_log = get_logger("llm_router")
+
+        def emit():
+            cache_log.debug("cache_lookup")
+            router_log.debug("provider_attempt")
+
+        records = self._emit({"log_level": "INFO", "log_levels": {"cache": "DEBUG"}}, emit)
+        self.assertEqual([record["logger"] for record in records], ["cache"])
+
+    def test_configured_sampling_rate_applies(self):
+        log = get_logger("chat_orchestrator")
+
+        def emit():
+            for _ in range(50):
+                log.info("cache_lookup")
+            log.info("escalation_needed")
+
+        records = self._emit({"log_sampling": {"cache_lookup": 0.0}}, emit)
+        self.assertEqual([record["event"] for record in records], ["escalation_needed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from services.shared.provider_metrics import ProviderMetrics
+from services.shared.token_usage import (
+    PriceTable, TokenUsage, capture_usage, estimate_tokens, gemini_usage, openai_usage, report_usage,
+)
+
+
+class UsageParsingTestCase(unittest.TestCase):
+    def test_openai_usage_with_cached_prompt_tokens(self):
+        body = {"usage": {"prompt_tokens": 1200, "completion_tokens": 80, "prompt_tokens_details": {"cached_tokens": 1024}}}
+        self.assertEqual(openai_usage(body), TokenUsage(1200, 80, 1024))
+        self.assertIsNone(openai_usage({"choices": []}))
+
+    def test_groq_stream_usage(self):
+        chunk = {"choices": [], "x_groq": {"usage": {"prompt_tokens": 40, "completion_tokens": 12}}}
+        self.assertEqual(openai_usage(chunk), TokenUsage(40, 12, 0))
+
+    def test_gemini_thinking_tokens_count_as_completion(self):
+        body = {"usageMetadata": {"promptTokenCount": 300, "candidatesTokenCount": 50, "thoughtsTokenCount": 150,
+                                  "cachedContentTokenCount": 256}}
+        self.assertEqual(gemini_usage(body), TokenUsage(300, 200, 256))
+
+    def test_estimate_is_marked(self):
+        self.assertEqual(estimate_tokens("abcd" * 10, None), 10)
+        usage = TokenUsage.estimate(("a" * 400,), ("b" * 40,))
+        self.assertEqual((usage.prompt_tokens, usage.completion_tokens, usage.estimated), (100, 10, True))
+
+    def test_reports_reach_only_an_open_capture(self):
+        report_usage(TokenUsage(1, 1))  # outside a capture: ignored
+        with capture_usage() as captured:
+            report_usage(None)
+            report_usage(TokenUsage(5, 2))
+        self.assertEqual(captured.usage, TokenUsage(5, 2))
+
+
+class PriceTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.prices = PriceTable.from_config({"pricing": {
+            "gemini-2.5-flash": {"input": 0.30, "output": 2.50, "cached_input": 0.075},
+            "local": {"input": 0, "output": 0},
+        }})
+
+    def test_cached_prompt_tokens_use_the_cached_price(self):
+        cost = self.prices.cost("gemini", "gemini-2.5-flash", TokenUsage(1_000_000, 100_000, 400_000))
+        self.assertAlmostEqual(cost, 0.6 * 0.30 + 0.4 * 0.075 + 0.1 * 2.50)
+
+    def test_provider_name_prices_all_its_models_and_unknowns_are_unpriced(self):
+        self.assertEqual(self.prices.cost("local", "llama3", TokenUsage(500, 500)), 0.0)
+        self.assertIsNone(self.prices.cost("openai", "gpt-3.5-turbo", TokenUsage(500, 500)))
+
+
+class UsageSummaryTestCase(unittest.TestCase):
+    def test_tokens_per_second_and_cost_per_answer(self):
+        with tempfile.TemporaryDirectory() as directory:
+            metrics = ProviderMetrics(db_path=os.path.join(directory, "metrics.db"))
+            metrics.record_event("groq", True, latency_ms=1000, model="llama", cost_usd=0.002, usage=TokenUsage(900, 100, 300))
+            metrics.record_event("groq", True, latency_ms=1000, model="llama", cost_usd=0.002, usage=TokenUsage(900, 300))
+            metrics.record_event("groq", False, latency_ms=500, model="llama", cost_usd=0.001,
+                                 usage=TokenUsage(900, 0, estimated=True))
+            [groq] = metrics.get_usage_summary()
+
+        self.assertEqual((groq["attempts"], groq["answers"]), (3, 2))
+        self.assertEqual((groq["prompt_tokens"], groq["completion_tokens"], groq["cached_tokens"]), (2700, 400, 300))
+        self.assertEqual(groq["completion_tokens_per_s"], 200.0)
+        self.assertAlmostEqual(groq["cost_per_answer_usd"], 0.0025)
+        self.assertAlmostEqual(groq["reported_share"], 0.667)
+
+
+if __name__ == "__main__":
+    unittest.main()